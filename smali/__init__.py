@@ -8,5 +8,9 @@ with open(os.path.join(os.path.dirname(__file__), '..', 'VERSION'), 'r') as f:
     __version__ = f.read()
 
 from smali.smali_file import SmaliFile
+from smali.project import SmaliProject
+from smali.class_hierarchy import ClassHierarchyIndex
+from smali.string_index import StringConstantIndex
+from smali.xref import CrossReferenceIndex
 
 SmaliFile.__version__ = __version__
\ No newline at end of file
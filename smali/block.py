@@ -1,20 +1,188 @@
-from typing import List, Union, Type, NewType, Generic
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, Type, NewType, Generic
 
 from smali.exceptions import FormatError
-from smali.statements import Statement, StatementType
+from smali.statements import CLASS_LEVEL_STATEMENT_TYPES, Statement, StatementType
 
 BlockItem = NewType('BlockItem', Union[Statement, 'Block'])
 BlockItemType = NewType('BlockItemType', Union[StatementType, 'Block[StatementType]'])
+BlockLoader = Callable[[Sequence[str], int, int], List[BlockItem]]
+# The source lines a block was parsed from as `(lines, start, end)`
+BlockSource = Tuple[Sequence[str], int, int]
+
+_missing = object()
+
+
+class BlockItems(list):
+    # Every change to the items of a block marks the block as modified
+    __slots__ = ('block',)
+
+    block: 'Block'
+
+    def __init__(self, block: 'Block', items: Iterable[BlockItem] = ()):
+        super().__init__(items)
+        self.block = block
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+    def append(self, item: BlockItem):
+        super().append(item)
+        self.block.adopt((item,))
+
+    def extend(self, items: Iterable[BlockItem]):
+        items = list(items)
+        super().extend(items)
+        self.block.adopt(items)
+
+    def insert(self, index: int, item: BlockItem):
+        super().insert(index, item)
+        self.block.adopt((item,))
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = list(value)
+            super().__setitem__(key, value)
+            self.block.adopt(value)
+        else:
+            super().__setitem__(key, value)
+            self.block.adopt((value,))
+
+    def __iadd__(self, items: Iterable[BlockItem]):
+        self.extend(items)
+        return self
+
+    def __imul__(self, count: int):
+        super().__imul__(count)
+        self.block.mark_modified()
+        return self
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.block.mark_modified()
+
+    def remove(self, item: BlockItem):
+        super().remove(item)
+        self.block.mark_modified()
+
+    def pop(self, index: int = -1) -> BlockItem:
+        result = super().pop(index)
+        self.block.mark_modified()
+        return result
+
+    def clear(self):
+        super().clear()
+        self.block.mark_modified()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.block.mark_modified()
+
+    def reverse(self):
+        super().reverse()
+        self.block.mark_modified()
 
 
 class Block(Generic[StatementType]):
+    __slots__ = ('_items', '_loader', 'source', 'parent', 'modified', 'revision')
+
     INDENT_SIZE = 4
     INDENT_CHAR = ' '
 
-    items: List[BlockItem]
+    _items: BlockItems
+    _loader: Optional[BlockLoader]
+    source: Optional[BlockSource]
+    parent: Optional['Block']
+    modified: bool
+    # Counts the changes to the block and its children
+    revision: int
 
     def __init__(self):
-        self.items = []
+        self._items = BlockItems(self)
+        self._loader = None
+        self.source = None
+        self.parent = None
+        self.modified = False
+        self.revision = 0
+
+    def __getstate__(self):
+        return list(self._items), self._loader, self.source, self.parent, self.modified, self.revision
+
+    def __setstate__(self, state):
+        items, self._loader, self.source, self.parent, self.modified, self.revision = state
+        self._items = BlockItems(self, items)
+
+    @classmethod
+    def lazy(cls, head: Statement, tail: Statement, source: BlockSource, loader: BlockLoader) -> 'Block':
+        # The body between head and tail is kept as source lines until the block is first accessed
+        block = cls()
+        block.append_parsed(head)
+        block.append_parsed(tail)
+        block.source = source
+        block._loader = loader
+        return block
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is None
+
+    @property
+    def source_lines(self) -> Optional[List[str]]:
+        if self.source is None:
+            return None
+        lines, start, end = self.source
+        return lines[start:end]
+
+    def load(self):
+        if self._loader is None:
+            return
+        lines, start, end = self.source
+        # The loader is stored in the block, it is timed here instead of being replaced by the profiler
+        from smali.profiling import Profiler
+        if Profiler.ACTIVE is None:
+            body = self._loader(lines, start + 1, end - 1)
+        else:
+            load_start = time.perf_counter()
+            body = self._loader(lines, start + 1, end - 1)
+            Profiler.ACTIVE.record('block.load', time.perf_counter() - load_start)
+        list.__setitem__(self._items, slice(1, -1), body)
+        self._loader = None
+        for item in body:
+            Block.set_parent(item, self)
+
+    @staticmethod
+    def set_parent(item: BlockItem, parent: Optional['Block']):
+        # Setting the parent is not a modification of the statement
+        object.__setattr__(item, 'parent', parent)
+
+    def append_parsed(self, item: BlockItem):
+        # Appends an item while parsing, without marking the block as modified
+        list.append(self._items, item)
+        Block.set_parent(item, self)
+
+    def adopt(self, items: Iterable[BlockItem]):
+        for item in items:
+            Block.set_parent(item, self)
+        self.mark_modified()
+
+    def mark_modified(self):
+        block = self
+        while block is not None:
+            block.modified = True
+            block.revision += 1
+            block = block.parent
+
+    @property
+    def items(self) -> BlockItems:
+        if self._loader is not None:
+            self.load()
+        return self._items
+
+    @items.setter
+    def items(self, items: Iterable[BlockItem]):
+        self._items = BlockItems(self, items)
+        self._loader = None
+        self.adopt(self._items)
 
     def append(self, item: BlockItem):
         self.items.append(item)
@@ -24,39 +192,79 @@ class Block(Generic[StatementType]):
 
     @property
     def head(self) -> StatementType:
-        if isinstance(self.items[0], Statement):
-            return self.items[0]
+        if isinstance(self._items[0], Statement):
+            return self._items[0]
         else:
-            return self.items[0].head
-
-    def flatten(self) -> List[Statement]:
-        result = []
-        for item in self.items:
-            if isinstance(item, Statement):
-                result.append(item)
-            elif isinstance(item, Block):
-                result.extend(item.flatten())
+            return self._items[0].head
+
+    def iter_statements(self, materialize: bool = True, reuse_source: bool = False) -> Iterator[Union[Statement, str]]:
+        # Source lines are returned instead of statements for
+        #  - blocks that were never modified, when reusing the source
+        #  - the body of blocks that were not loaded yet, when not materializing
+        stack = [iter((self,))]
+        while len(stack) > 0:
+            for item in stack[-1]:
+                if isinstance(item, Statement):
+                    yield item
+                elif isinstance(item, Block):
+                    if reuse_source and not item.modified and item.source is not None:
+                        lines, start, end = item.source
+                        yield from lines[start:end]
+                    elif not materialize and item._loader is not None:
+                        lines, start, end = item.source
+                        yield item._items[0]
+                        yield from lines[start + 1:end - 1]
+                        yield item._items[-1]
+                    else:
+                        stack.append(iter(item.items))
+                        break
+                else:
+                    raise FormatError(f'invalid item type: {type(item)}')
             else:
-                raise FormatError(f'invalid item type: {type(item)}')
-        return result
+                stack.pop()
+
+    def flatten(self, materialize: bool = True) -> List[Union[Statement, str]]:
+        return list(self.iter_statements(materialize))
+
+    def iter_matches(self, match: Callable[[Statement, BlockItem], bool], class_level: bool = False) -> Iterator[BlockItemType]:
+        # Items are matched by their statement, the head of a block, and the item itself. The body of a matching
+        #  block is not searched. The tree is walked with a stack of item iterators instead of recursion.
+        stack = [iter(self.items)]
+        while len(stack) > 0:
+            for item in stack[-1]:
+                if isinstance(item, Block):
+                    if match(item.head, item):
+                        yield item
+                    elif not class_level:
+                        # Class level statements are never inside of a block body, bodies that were not loaded yet
+                        #  are not loaded by a search for them
+                        stack.append(iter(item.items))
+                        break
+                elif match(item, item):
+                    yield item
+            else:
+                stack.pop()
 
     @staticmethod
-    def _match_item(item: Statement, **attributes) -> bool:
-        for key, value in attributes.items():
-            if not hasattr(item, key):
-                return False
-            if getattr(item, key) != value:
+    def attribute_matcher(stmt_type: Type[StatementType], **kwargs) -> Callable[[Statement, BlockItem], bool]:
+        attributes = tuple(kwargs.items())
+
+        def match(statement: Statement, _: BlockItem) -> bool:
+            if not isinstance(statement, stmt_type):
                 return False
-        return True
+            for key, value in attributes:
+                if getattr(statement, key, _missing) != value:
+                    return False
+            return True
+
+        return match
+
+    def iter_find(self, stmt_type: Type[StatementType], **kwargs) -> Iterator[BlockItemType]:
+        # Items are found lazily, the walk stops where the caller stops consuming
+        return self.iter_matches(Block.attribute_matcher(stmt_type, **kwargs), issubclass(stmt_type, CLASS_LEVEL_STATEMENT_TYPES))
 
     def find(self, stmt_type: Type[StatementType], **kwargs) -> List[BlockItemType]:
-        result = []
-        for item in self.items:
-            if isinstance(item, Block):
-                if isinstance(item.head, stmt_type) and Block._match_item(item.head, **kwargs):
-                    result.append(item)
-                else:
-                    result.extend(item.find(stmt_type, **kwargs))
-            elif isinstance(item, stmt_type) and Block._match_item(item, **kwargs):
-                result.append(item)
-        return result
+        return list(self.iter_find(stmt_type, **kwargs))
+
+    def find_first(self, stmt_type: Type[StatementType], **kwargs) -> Optional[BlockItemType]:
+        return next(self.iter_find(stmt_type, **kwargs), None)
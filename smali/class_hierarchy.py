@@ -0,0 +1,176 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+from smali.exceptions import ParseError
+from smali.lib.line_buffer import LineBuffer
+from smali.modifiers import ClassModifiers
+from smali.project_index import ProjectIndex
+from smali.statements import ClassStatement, ImplementsStatement, Statement, SuperStatement
+
+
+class ClassHeader(NamedTuple):
+    class_descriptor: str
+    super_descriptor: Optional[str]
+    interfaces: Tuple[str, ...]
+    modifiers: Optional[ClassModifiers]
+
+
+class ClassHierarchyIndex(ProjectIndex):
+    # Super classes and interfaces of every class in a project, queries are answered from the database without
+    #  parsing any smali file
+    NAME = 'class_hierarchy'
+    SCHEMA_VERSION = 1
+    SCHEMA = '''
+        CREATE TABLE classes (
+            file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+            class_descriptor TEXT NOT NULL,
+            super_descriptor TEXT,
+            modifiers INTEGER NOT NULL
+        );
+        CREATE INDEX classes_class_descriptor ON classes (class_descriptor);
+        CREATE INDEX classes_super_descriptor ON classes (super_descriptor);
+        CREATE INDEX classes_file_id ON classes (file_id);
+        CREATE TABLE interfaces (
+            file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+            class_descriptor TEXT NOT NULL,
+            interface_descriptor TEXT NOT NULL
+        );
+        CREATE INDEX interfaces_class_descriptor ON interfaces (class_descriptor);
+        CREATE INDEX interfaces_interface_descriptor ON interfaces (interface_descriptor);
+        CREATE INDEX interfaces_file_id ON interfaces (file_id);
+        CREATE VIEW hierarchy (parent_descriptor, class_descriptor) AS
+            SELECT super_descriptor, class_descriptor FROM classes WHERE super_descriptor IS NOT NULL
+            UNION ALL
+            SELECT interface_descriptor, class_descriptor FROM interfaces;
+    '''
+
+    # The class header ends at the first member
+    HEADER_END = ('.field ', '.method ')
+    HEADER_DIRECTIVES = ('.class ', '.super ', '.implements ')
+
+    @staticmethod
+    def extract(file_path: str) -> ClassHeader:
+        # Only the header directives are parsed
+        class_statement: Optional[ClassStatement] = None
+        super_descriptor: Optional[str] = None
+        interfaces: List[str] = []
+        for line in LineBuffer.read_file(file_path):
+            line = line.lstrip()
+            if line.startswith(ClassHierarchyIndex.HEADER_END):
+                break
+            if not line.startswith(ClassHierarchyIndex.HEADER_DIRECTIVES):
+                continue
+            for statement in Statement.parse_line(line):
+                if isinstance(statement, ClassStatement):
+                    class_statement = statement
+                elif isinstance(statement, SuperStatement):
+                    super_descriptor = statement.class_descriptor
+                elif isinstance(statement, ImplementsStatement):
+                    interfaces.append(statement.class_descriptor)
+        if class_statement is None:
+            raise ParseError('file does not declare a class')
+        return ClassHeader(class_statement.class_descriptor, super_descriptor, tuple(interfaces), class_statement.modifiers)
+
+    def store(self, file_id: int, data: ClassHeader):
+        modifiers = 0 if data.modifiers is None else data.modifiers.value
+        self.connection.execute(
+            'INSERT INTO classes (file_id, class_descriptor, super_descriptor, modifiers) VALUES (?, ?, ?, ?)',
+            (file_id, data.class_descriptor, data.super_descriptor, modifiers)
+        )
+        self.connection.executemany(
+            'INSERT INTO interfaces (file_id, class_descriptor, interface_descriptor) VALUES (?, ?, ?)',
+            [(file_id, data.class_descriptor, interface) for interface in data.interfaces]
+        )
+
+    def get(self, class_descriptor: str) -> Optional[ClassHeader]:
+        row = self.connection.execute(
+            'SELECT file_id, super_descriptor, modifiers FROM classes WHERE class_descriptor = ? ORDER BY file_id LIMIT 1',
+            (class_descriptor,)
+        ).fetchone()
+        if row is None:
+            return None
+        file_id, super_descriptor, modifiers = row
+        interfaces = tuple(interface for interface, in self.connection.execute(
+            'SELECT interface_descriptor FROM interfaces WHERE file_id = ? ORDER BY rowid', (file_id,)
+        ))
+        return ClassHeader(class_descriptor, super_descriptor, interfaces, ClassModifiers(modifiers) if modifiers != 0 else None)
+
+    def path(self, class_descriptor: str) -> Optional[str]:
+        row = self.connection.execute(
+            'SELECT path FROM classes JOIN files ON files.id = classes.file_id WHERE class_descriptor = ? ORDER BY file_id LIMIT 1',
+            (class_descriptor,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self.absolute_path(row[0])
+
+    def classes(self) -> List[str]:
+        return [class_descriptor for class_descriptor, in self.connection.execute('SELECT DISTINCT class_descriptor FROM classes ORDER BY class_descriptor')]
+
+    def superclasses(self, class_descriptor: str) -> List[str]:
+        # The chain of super classes, nearest first, up to the first class that is not part of the project
+        result = []
+        seen = {class_descriptor}
+        row = self.connection.execute('SELECT super_descriptor FROM classes WHERE class_descriptor = ?', (class_descriptor,)).fetchone()
+        while row is not None and row[0] is not None and row[0] not in seen:
+            result.append(row[0])
+            seen.add(row[0])
+            row = self.connection.execute('SELECT super_descriptor FROM classes WHERE class_descriptor = ?', (row[0],)).fetchone()
+        return result
+
+    def interfaces(self, class_descriptor: str, transitive: bool = False) -> List[str]:
+        if not transitive:
+            return [interface for interface, in self.connection.execute(
+                'SELECT DISTINCT interface_descriptor FROM interfaces WHERE class_descriptor = ? ORDER BY interface_descriptor', (class_descriptor,)
+            )]
+        # Interfaces of the class, its super classes and all of their super interfaces
+        return [interface for interface, in self.connection.execute('''
+            WITH RECURSIVE ancestors (descriptor) AS (
+                SELECT ?
+                UNION
+                SELECT parent_descriptor FROM hierarchy JOIN ancestors ON hierarchy.class_descriptor = ancestors.descriptor
+            )
+            SELECT DISTINCT interface_descriptor FROM interfaces JOIN ancestors ON interfaces.class_descriptor = ancestors.descriptor
+            ORDER BY interface_descriptor
+        ''', (class_descriptor,))]
+
+    def subclasses(self, class_descriptor: str, transitive: bool = False) -> List[str]:
+        if not transitive:
+            return [subclass for subclass, in self.connection.execute(
+                'SELECT DISTINCT class_descriptor FROM classes WHERE super_descriptor = ? ORDER BY class_descriptor', (class_descriptor,)
+            )]
+        return [subclass for subclass, in self.connection.execute('''
+            WITH RECURSIVE descendants (descriptor) AS (
+                SELECT class_descriptor FROM classes WHERE super_descriptor = ?
+                UNION
+                SELECT classes.class_descriptor FROM classes JOIN descendants ON classes.super_descriptor = descendants.descriptor
+            )
+            SELECT descriptor FROM descendants ORDER BY descriptor
+        ''', (class_descriptor,))]
+
+    def implementors(self, interface_descriptor: str, transitive: bool = False) -> List[str]:
+        # Transitive implementors include sub interfaces and all subclasses of implementing classes
+        if not transitive:
+            return [implementor for implementor, in self.connection.execute(
+                'SELECT DISTINCT class_descriptor FROM interfaces WHERE interface_descriptor = ? ORDER BY class_descriptor', (interface_descriptor,)
+            )]
+        return [implementor for implementor, in self.connection.execute('''
+            WITH RECURSIVE descendants (descriptor) AS (
+                SELECT class_descriptor FROM interfaces WHERE interface_descriptor = ?
+                UNION
+                SELECT hierarchy.class_descriptor FROM hierarchy JOIN descendants ON hierarchy.parent_descriptor = descendants.descriptor
+            )
+            SELECT descriptor FROM descendants ORDER BY descriptor
+        ''', (interface_descriptor,))]
+
+    def is_subtype(self, class_descriptor: str, ancestor_descriptor: str) -> bool:
+        if class_descriptor == ancestor_descriptor:
+            return True
+        row = self.connection.execute('''
+            WITH RECURSIVE ancestors (descriptor) AS (
+                SELECT ?
+                UNION
+                SELECT parent_descriptor FROM hierarchy JOIN ancestors ON hierarchy.class_descriptor = ancestors.descriptor
+            )
+            SELECT 1 FROM ancestors WHERE descriptor = ? LIMIT 1
+        ''', (class_descriptor, ancestor_descriptor)).fetchone()
+        return row is not None
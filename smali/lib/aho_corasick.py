@@ -0,0 +1,76 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, Iterator, List, Set, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class AhoCorasick(Generic[T]):
+    # Finds all occurrences of many patterns in a single pass over the text. The trie of the patterns is turned into
+    #  a deterministic automaton up front, every character of the text is one dict lookup. Transitions back to the
+    #  root state are not stored.
+    __slots__ = ('transitions', 'outputs')
+
+    transitions: List[Dict[str, int]]
+    # The values of all patterns that end in a state, including the patterns ending in its suffixes
+    outputs: List[Tuple[T, ...]]
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        goto: List[Dict[str, int]] = [{}]
+        own_outputs: List[List[T]] = [[]]
+        for pattern, value in patterns:
+            if len(pattern) == 0:
+                raise ValueError('patterns can not be empty')
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    own_outputs.append([])
+                state = next_state
+            own_outputs[state].append(value)
+
+        # States are visited in breadth first order, the failure state of a state is always shallower and done before it.
+        #  Characters without a transition continue like they would from the failure state.
+        self.transitions = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        self.outputs = [()] * len(goto)
+        failure = [0] * len(goto)
+        queue = deque([0])
+        while len(queue) > 0:
+            state = queue.popleft()
+            fail = failure[state]
+            if state != 0:
+                self.transitions[state] = {**self.transitions[fail], **goto[state]}
+                self.outputs[state] = (*own_outputs[state], *self.outputs[fail])
+            for char, next_state in goto[state].items():
+                failure[next_state] = self.transitions[fail].get(char, 0) if state != 0 else 0
+                queue.append(next_state)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, T]]:
+        # Yields the end index of every occurrence and the value of its pattern
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        for idx, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for value in outputs[state]:
+                    yield idx + 1, value
+
+    def find_values(self, text: str) -> Set[T]:
+        result = set()
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                result.update(outputs[state])
+        return result
+
+    def __getstate__(self):
+        return self.transitions, self.outputs
+
+    def __setstate__(self, state):
+        self.transitions, self.outputs = state
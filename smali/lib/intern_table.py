@@ -0,0 +1,25 @@
+from typing import Dict
+
+
+class InternTable:
+    # Maps every string to the first equal string that was interned, so equal strings share one object. Unlike
+    #  `sys.intern` the strings are released together with the table, e.g. when a project is dropped.
+    __slots__ = ('values',)
+
+    values: Dict[str, str]
+
+    def __init__(self):
+        self.values = {}
+
+    def intern(self, value: str) -> str:
+        # `setdefault` is a single dictionary operation, threads can intern into the same table
+        return self.values.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.values
+
+    def clear(self):
+        self.values.clear()
@@ -0,0 +1,123 @@
+import mmap
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import accumulate, repeat
+from operator import add
+from typing import Iterator, List, Sequence, Union, overload
+
+# Line separators of `str.splitlines` other than '\n' and '\r'
+_OTHER_SEPARATORS = ('\x0b', '\x0c', '\x1c', '\x1d', '\x1e', '\x85', ' ', ' ')
+
+
+class LineBuffer(Sequence[str]):
+    # The lines of a text as offsets into the text, equal to `text.splitlines()`.
+    # A line is only sliced out of the text when it is accessed, no list of lines is kept next to the text.
+    __slots__ = ('text', 'starts', 'ends')
+
+    ENCODING = 'utf-8'
+    OFFSET_TYPE = 'Q'
+    CHUNK_SIZE = 64 * 1024
+
+    text: str
+    starts: array
+    ends: array
+
+    def __init__(self, text: str):
+        self.text = text
+        self.starts = array(self.OFFSET_TYPE)
+        self.ends = array(self.OFFSET_TYPE)
+        if '\r' in text or any(separator in text for separator in _OTHER_SEPARATORS):
+            self.index_lines()
+        else:
+            self.index_newlines()
+
+    def index_newlines(self):
+        # Only '\n' separates lines, the common case. The text is split in chunks of whole lines so the line
+        #  lengths are summed up in C, without a copy of every line of the text at once.
+        text = self.text
+        start = 0
+        while start < len(text):
+            chunk_end = text.find('\n', start + self.CHUNK_SIZE)
+            if chunk_end == -1:
+                chunk_end = len(text)
+            lengths = list(map(len, text[start:chunk_end].split('\n')))
+            if chunk_end == len(text) and lengths[-1] == 0:
+                # A separator at the end of the text does not start another line
+                lengths.pop()
+            starts = array(self.OFFSET_TYPE, accumulate(map(add, lengths, repeat(1)), initial=start))
+            starts.pop()
+            self.ends.extend(map(add, starts, lengths))
+            self.starts.extend(starts)
+            start = chunk_end + 1
+
+    def index_lines(self):
+        start = 0
+        for line in self.text.splitlines(True):
+            self.starts.append(start)
+            # Every line ends with exactly one separator, except for the last line which might have none
+            self.ends.append(start + len(line.splitlines()[0]))
+            start += len(line)
+
+    @staticmethod
+    def decode(data: Union[bytes, bytearray, memoryview, mmap.mmap]) -> str:
+        # Decodes like a text mode `open` with UTF-8, line endings are translated to '\n'
+        text = str(data, LineBuffer.ENCODING)
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    @staticmethod
+    @contextmanager
+    def map_file(file_path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+        # The file content without reading it into memory, empty files can not be mapped
+        with open(file_path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    @classmethod
+    def read_file(cls, file_path: str) -> 'LineBuffer':
+        with cls.map_file(file_path) as data:
+            return cls(cls.decode(data))
+
+    def line_index(self, offset: int) -> int:
+        # The line that contains the character at an offset into the text
+        return bisect_right(self.starts, offset) - 1
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @overload
+    def __getitem__(self, index: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[str]:
+        ...
+
+    def __getitem__(self, index):
+        # Lines are accessed one at a time while parsing, slices are the rare case
+        try:
+            return self.text[self.starts[index]:self.ends[index]]
+        except TypeError:
+            if not isinstance(index, slice):
+                raise
+        text = self.text
+        return [text[start:end] for start, end in zip(self.starts[index], self.ends[index])]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self)} lines)'
+
+    def __getstate__(self):
+        return self.text, self.starts, self.ends
+
+    def __setstate__(self, state):
+        self.text, self.starts, self.ends = state
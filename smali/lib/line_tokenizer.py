@@ -0,0 +1,105 @@
+import re
+from typing import List, Optional, Pattern, Tuple
+
+# States of the quote scanner, the escaped states are directly after a backslash
+_OUTSIDE = 0
+_INSIDE = 1
+_OUTSIDE_ESCAPED = 2
+_INSIDE_ESCAPED = 3
+
+
+class LineTokenizer:
+    RE_SPACES = re.compile(r' +')
+    RE_SPACE_TOKENS = re.compile(r' +|["\\]')
+    RE_ASSIGNMENT_TOKENS = re.compile(r'=|["\\]')
+
+    @staticmethod
+    def unquoted_spans(line: str, pattern: Pattern) -> List[Tuple[int, int]]:
+        # A delimiter is unquoted when the rest of the line after it has balanced quotes. Instead of rescanning the
+        #  rest of the line for every delimiter, the line is walked once from right to left while tracking the state
+        #  the rest of the line ends in for every state it could be entered with.
+        # Returns the spans of unquoted delimiters from right to left.
+        outside_end, inside_end = _OUTSIDE, _INSIDE
+        outside_escaped_end, inside_escaped_end = _OUTSIDE_ESCAPED, _INSIDE_ESCAPED
+        next_start = len(line)
+        result = []
+        for match in reversed(list(pattern.finditer(line))):
+            start, end = match.span()
+            if end < next_start:
+                # Plain characters between this match and the next one, an escape consumes the first of them
+                outside_escaped_end, inside_escaped_end = outside_end, inside_end
+            char = line[start]
+            if char == '"':
+                outside_end, inside_end, outside_escaped_end, inside_escaped_end = inside_end, outside_end, outside_end, inside_end
+            elif char == '\\':
+                outside_end, inside_end, outside_escaped_end, inside_escaped_end = outside_escaped_end, inside_escaped_end, outside_end, inside_end
+            else:
+                # A trailing lone backslash outside of quotes is still balanced
+                if outside_end == _OUTSIDE or outside_end == _OUTSIDE_ESCAPED:
+                    result.append((start, end))
+                outside_escaped_end, inside_escaped_end = outside_end, inside_end
+            next_start = start
+        return result
+
+    @staticmethod
+    def unescaped_unquoted_spans(line: str, pattern: Pattern) -> List[Tuple[int, int]]:
+        # Without escapes a delimiter is unquoted when an even number of quotes follow it
+        # Returns the spans of unquoted delimiters from left to right.
+        parts = line.split('"')
+        unquoted = (len(parts) - 1) % 2
+        offset = 0
+        result = []
+        for idx, part in enumerate(parts):
+            if idx % 2 == unquoted:
+                for match in pattern.finditer(part):
+                    result.append((offset + match.start(), offset + match.end()))
+            offset += len(part) + 1
+        return result
+
+    @staticmethod
+    def split_spaces(line: str) -> List[str]:
+        if '"' not in line and '\\' not in line:
+            return LineTokenizer.RE_SPACES.split(line)
+        if '\\' not in line:
+            quote_start = line.find('"')
+            quote_end = line.rfind('"')
+            if quote_start != quote_end and line.count('"') == 2:
+                # The most common case, a single quoted literal
+                result = LineTokenizer.RE_SPACES.split(line[:quote_start])
+                tail = LineTokenizer.RE_SPACES.split(line[quote_end + 1:])
+                result[-1] = f'{result[-1]}{line[quote_start:quote_end + 1]}{tail[0]}'
+                result.extend(tail[1:])
+                return result
+            spans = LineTokenizer.unescaped_unquoted_spans(line, LineTokenizer.RE_SPACES)
+        else:
+            spans = LineTokenizer.unquoted_spans(line, LineTokenizer.RE_SPACE_TOKENS)
+            spans.reverse()
+        result = []
+        last_end = 0
+        for start, end in spans:
+            result.append(line[last_end:start])
+            last_end = end
+        result.append(line[last_end:])
+        return result
+
+    @staticmethod
+    def split_assignment(line: str) -> Optional[Tuple[str, str]]:
+        if '=' not in line:
+            return None
+        if '"' not in line and '\\' not in line:
+            lhs, rhs = line.split('=', 1)
+            return lhs, rhs
+        if '\\' not in line:
+            part_start = 0
+            unquoted = line.count('"') % 2
+            for idx, part in enumerate(line.split('"')):
+                if idx % 2 == unquoted and '=' in part:
+                    start = part_start + part.index('=')
+                    return line[:start], line[start + 1:]
+                part_start += len(part) + 1
+            return None
+        spans = LineTokenizer.unquoted_spans(line, LineTokenizer.RE_ASSIGNMENT_TOKENS)
+        if len(spans) == 0:
+            return None
+        start, end = spans[-1]
+        return line[:start], line[end:]
@@ -6,6 +6,8 @@ _default = object()
 
 
 class Peekable(Iterator[T]):
+    __slots__ = ('_it', '_top_item')
+
     _it: Iterator[T]
     _top_item: T
 
@@ -1,25 +1,77 @@
 import hashlib
 import re
+from collections import Counter
+from itertools import zip_longest
+from typing import Iterable, Iterator, List, Union
+
+Text = Union[str, Iterable[str]]
 
 
 class SmaliCompare:
-    RE_FIND_COMMENTS = re.compile(r'(#.*)$', re.MULTILINE)
-    RE_FIND_INDENTATION = re.compile(r'((^[ \t]+)|([ \t]+$))', re.MULTILINE)
     RE_FIND_OVERSIZED_WHITESPACE = re.compile(r'[\t ]{2,}')
-    RE_FIND_EXTRA_NEWLINES = re.compile(r'[\t ]{2,}')
+
+    COMMENT = '#'
+    INDENTATION = ' \t'
+
+    @staticmethod
+    def iter_text_lines(text: Text) -> Iterable[str]:
+        # Text is either a string or its lines without the line separators
+        if isinstance(text, str):
+            return text.split('\n')
+        return text
+
+    @staticmethod
+    def character_counts(text: Text) -> Counter:
+        counts = Counter()
+        for line in SmaliCompare.iter_text_lines(text):
+            counts.update(line)
+        return counts
+
+    @staticmethod
+    def order_independent_hash(text: Text) -> bytes:
+        # A digest of the multiset of non whitespace characters, equal for any reordering of them
+        counts = SmaliCompare.character_counts(text)
+        digest = hashlib.md5()
+        for char in sorted(counts):
+            if not char.isspace():
+                digest.update(f'{ord(char)}:{counts[char]};'.encode())
+        return digest.digest()
+
+    @staticmethod
+    def normalize_line(line: str) -> str:
+        # Drops comments and indentation, and collapses runs of spaces and tabs
+        comment_idx = line.find(SmaliCompare.COMMENT)
+        if comment_idx != -1:
+            line = line[:comment_idx]
+        line = line.strip(SmaliCompare.INDENTATION)
+        if '  ' in line or '\t' in line:
+            line = SmaliCompare.RE_FIND_OVERSIZED_WHITESPACE.sub(' ', line)
+        return line
 
     @staticmethod
-    def order_independent_hash(data: str) -> bytes:
-        tokens = ''.join(sorted(filter(lambda x: not x.isspace(), list(data))))
-        return hashlib.md5(tokens.encode()).digest()
+    def iter_normalized_lines(text: Text) -> Iterator[str]:
+        # Trailing whitespace of the whole text is dropped, lines are held back until a line with content follows
+        pending: List[str] = []
+        for line in SmaliCompare.iter_text_lines(text):
+            line = SmaliCompare.normalize_line(line)
+            pending.append(line)
+            if len(line) > 0 and not line.isspace():
+                yield from pending[:-1]
+                pending = [line]
+        if len(pending) > 0 and len(pending[0]) > 0 and not pending[0].isspace():
+            yield pending[0].rstrip()
+        elif len(pending) > 0:
+            # Only whitespace, the whole text normalizes to an empty string
+            yield ''
 
     @staticmethod
     def normalize_smali(smali: str) -> str:
-        smali = SmaliCompare.RE_FIND_COMMENTS.sub('', smali)
-        smali = SmaliCompare.RE_FIND_INDENTATION.sub('', smali)
-        smali = SmaliCompare.RE_FIND_OVERSIZED_WHITESPACE.sub(' ', smali)
-        return SmaliCompare.RE_FIND_EXTRA_NEWLINES.sub('\n', smali).rstrip()
+        return '\n'.join(SmaliCompare.iter_normalized_lines(smali))
 
     @staticmethod
-    def whitespace_normalized_equals(a: str, b: str) -> bool:
-        return SmaliCompare.normalize_smali(a) == SmaliCompare.normalize_smali(b)
+    def whitespace_normalized_equals(a: Text, b: Text) -> bool:
+        sentinel = object()
+        for line_a, line_b in zip_longest(SmaliCompare.iter_normalized_lines(a), SmaliCompare.iter_normalized_lines(b), fillvalue=sentinel):
+            if line_a != line_b:
+                return False
+        return True
@@ -1,11 +1,19 @@
+import re
+from typing import Match
+
+
 class IntLiteral(int):
-    base: int
+    __slots__ = ()
+
+    base: int = 10
 
     def __new__(cls, literal: str):
         base = IntLiteral.parse_base(literal)
-        i = super(IntLiteral, cls).__new__(cls, literal, base)
-        i.base = base
-        return i
+        literal_cls = HexIntLiteral if base == 16 else IntLiteral
+        return super(IntLiteral, cls).__new__(literal_cls, literal, base)
+
+    def __getnewargs__(self):
+        return str(self),
 
     def __str__(self):
         if self.base == 16:
@@ -20,3 +28,36 @@ class IntLiteral(int):
             return 16
         else:
             return 10
+
+
+class HexIntLiteral(IntLiteral):
+    __slots__ = ()
+
+    base = 16
+
+
+class StringLiteral:
+    RE_ESCAPE = re.compile(r'\\(?:u([dD][89abAB][0-9a-fA-F]{2})\\u([dD][c-fC-F][0-9a-fA-F]{2})|(u[0-9a-fA-F]{4}|.))', re.DOTALL)
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '0': '\0'}
+
+    @staticmethod
+    def unescape(match: Match) -> str:
+        high, low, escape = match.group(1, 2, 3)
+        if high is not None:
+            # A surrogate pair of UTF-16, the way characters outside of the BMP are escaped
+            return chr(0x10000 + ((int(high, 16) - 0xd800) << 10) + int(low, 16) - 0xdc00)
+        if len(escape) == 5:
+            code_point = int(escape[1:], 16)
+            # Lone surrogates are not valid text, they stay escaped
+            return match.group(0) if 0xd800 <= code_point < 0xe000 else chr(code_point)
+        return StringLiteral.ESCAPES.get(escape, escape)
+
+    @staticmethod
+    def unquote(literal: str) -> str:
+        # The value of a quoted smali string literal, with its escapes resolved
+        if len(literal) < 2 or literal[0] != '"' or literal[-1] != '"':
+            raise ValueError(f'not a string literal: {literal}')
+        value = literal[1:-1]
+        if '\\' not in value:
+            return value
+        return StringLiteral.RE_ESCAPE.sub(StringLiteral.unescape, value)
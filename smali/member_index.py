@@ -0,0 +1,45 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from smali.block import Block, BlockItem
+from smali.statements import FieldStatement, MethodStatement
+
+MethodSignature = Tuple[str, str, str]
+
+
+class MemberIndex:
+    # Methods and fields are class level statements, only the items of the root block are indexed.
+    # The index is bound to a revision of the root block and has to be rebuilt once the root block changed.
+    root: Block
+    revision: int
+    methods: Dict[str, List[Block[MethodStatement]]]
+    method_signatures: Dict[MethodSignature, Block[MethodStatement]]
+    fields: Dict[str, Union[Block[FieldStatement], FieldStatement]]
+
+    def __init__(self, root: Block):
+        self.root = root
+        self.revision = root.revision
+        self.methods = {}
+        self.method_signatures = {}
+        self.fields = {}
+        for item in root.items:
+            self.add(item)
+
+    def add(self, item: BlockItem):
+        statement = item.head if isinstance(item, Block) else item
+        if isinstance(statement, MethodStatement):
+            self.methods.setdefault(statement.member_name, []).append(item)
+            self.method_signatures.setdefault((statement.member_name, statement.method_params, statement.method_result_type), item)
+        elif isinstance(statement, FieldStatement):
+            self.fields.setdefault(statement.member_name, item)
+
+    def is_current(self, root: Block) -> bool:
+        return self.root is root and self.revision == root.revision
+
+    def find_methods(self, method_name: str) -> List[Block[MethodStatement]]:
+        return list(self.methods.get(method_name, ()))
+
+    def find_method(self, method_name: str, method_params: str, method_result_type: str) -> Optional[Block[MethodStatement]]:
+        return self.method_signatures.get((method_name, method_params, method_result_type))
+
+    def find_field(self, field_name: str) -> Optional[Union[Block[FieldStatement], FieldStatement]]:
+        return self.fields.get(field_name)
@@ -1,29 +1,34 @@
 from enum import Flag, auto
-from typing import Optional, Type
+from typing import Dict, Optional, Type
 
 
 class Modifiers(Flag):
-    def __str__(self):
-        if self.name and self.name != '':
-            return self.name.lower().replace('_', '-')
+    # The tag of every member and the rendering of every value are computed once per class, parsing looks up
+    #  every token that might be a modifier and unparsing renders the modifiers of every statement
 
-        result = []
-        for c in self.__class__:
-            if c.value & self.value == c.value:
-                result.append(c.name.lower().replace('_', '-'))
+    @classmethod
+    def tags(cls: Type['Modifiers']) -> Dict[str, 'Modifiers']:
+        if '_tag_table' not in cls.__dict__:
+            cls._tag_table = {member.name.lower().replace('_', '-'): member for member in cls}
+        return cls._tag_table
 
-        if len(result) > 0:
-            return ' '.join(result)
+    @classmethod
+    def render(cls: Type['Modifiers'], value: int) -> str:
+        if '_render_table' not in cls.__dict__:
+            cls._render_table = {}
+        result = cls._render_table.get(value)
+        if result is None:
+            # Composite values are rendered in the definition order of their members
+            result = ' '.join(tag for tag, member in cls.tags().items() if member.value & value == member.value)
+            cls._render_table[value] = result
+        return result
 
-        return ''
+    def __str__(self):
+        return self.render(self.value)
 
     @classmethod
     def find(cls: Type['Modifiers'], modifier_tag: str) -> Optional['Modifiers']:
-        for c in cls:
-            modifier_name = str(c)
-            if modifier_name is not None and modifier_name == modifier_tag:
-                return c
-        return None
+        return cls.tags().get(modifier_tag)
 
 
 class AnnotationModifiers(Modifiers):
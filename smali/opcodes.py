@@ -0,0 +1,109 @@
+from enum import Enum
+from typing import Dict, NamedTuple, Tuple
+
+
+class Operand(Enum):
+    REGISTER = 'register'
+    REGISTER_LIST = 'register list'
+    REGISTER_RANGE = 'register range'
+    LABEL = 'label'
+    LITERAL = 'literal'
+    REFERENCE = 'reference'
+
+
+class InstructionFormat(NamedTuple):
+    # A Dalvik instruction format and the smali operands it is written with
+    name: str
+    operands: Tuple[Operand, ...]
+
+    @property
+    def register_list(self) -> bool:
+        return len(self.operands) > 0 and self.operands[0] in (Operand.REGISTER_LIST, Operand.REGISTER_RANGE)
+
+
+FORMAT_10T = InstructionFormat('10t', (Operand.LABEL,))
+FORMAT_10X = InstructionFormat('10x', ())
+FORMAT_11N = InstructionFormat('11n', (Operand.REGISTER, Operand.LITERAL))
+FORMAT_11X = InstructionFormat('11x', (Operand.REGISTER,))
+FORMAT_12X = InstructionFormat('12x', (Operand.REGISTER, Operand.REGISTER))
+FORMAT_20T = InstructionFormat('20t', (Operand.LABEL,))
+FORMAT_21C = InstructionFormat('21c', (Operand.REGISTER, Operand.REFERENCE))
+FORMAT_21H = InstructionFormat('21h', (Operand.REGISTER, Operand.LITERAL))
+FORMAT_21S = InstructionFormat('21s', (Operand.REGISTER, Operand.LITERAL))
+FORMAT_21T = InstructionFormat('21t', (Operand.REGISTER, Operand.LABEL))
+FORMAT_22B = InstructionFormat('22b', (Operand.REGISTER, Operand.REGISTER, Operand.LITERAL))
+FORMAT_22C = InstructionFormat('22c', (Operand.REGISTER, Operand.REGISTER, Operand.REFERENCE))
+FORMAT_22S = InstructionFormat('22s', (Operand.REGISTER, Operand.REGISTER, Operand.LITERAL))
+FORMAT_22T = InstructionFormat('22t', (Operand.REGISTER, Operand.REGISTER, Operand.LABEL))
+FORMAT_22X = InstructionFormat('22x', (Operand.REGISTER, Operand.REGISTER))
+FORMAT_23X = InstructionFormat('23x', (Operand.REGISTER, Operand.REGISTER, Operand.REGISTER))
+FORMAT_30T = InstructionFormat('30t', (Operand.LABEL,))
+FORMAT_31C = InstructionFormat('31c', (Operand.REGISTER, Operand.REFERENCE))
+FORMAT_31I = InstructionFormat('31i', (Operand.REGISTER, Operand.LITERAL))
+FORMAT_31T = InstructionFormat('31t', (Operand.REGISTER, Operand.LABEL))
+FORMAT_32X = InstructionFormat('32x', (Operand.REGISTER, Operand.REGISTER))
+FORMAT_35C = InstructionFormat('35c', (Operand.REGISTER_LIST, Operand.REFERENCE))
+FORMAT_3RC = InstructionFormat('3rc', (Operand.REGISTER_RANGE, Operand.REFERENCE))
+FORMAT_45CC = InstructionFormat('45cc', (Operand.REGISTER_LIST, Operand.REFERENCE, Operand.REFERENCE))
+FORMAT_4RCC = InstructionFormat('4rcc', (Operand.REGISTER_RANGE, Operand.REFERENCE, Operand.REFERENCE))
+FORMAT_51L = InstructionFormat('51l', (Operand.REGISTER, Operand.LITERAL))
+
+
+def _opcodes(instruction_format: InstructionFormat, *names: str) -> Dict[str, InstructionFormat]:
+    return {name: instruction_format for name in names}
+
+
+def _typed(prefix: str) -> Tuple[str, ...]:
+    # The typed variants of the array, instance field and static field accessors
+    return tuple(f'{prefix}{variant}' for variant in ('', '-wide', '-object', '-boolean', '-byte', '-char', '-short'))
+
+
+def _arithmetic(types: Tuple[str, ...], operations: Tuple[str, ...], suffix: str = '') -> Tuple[str, ...]:
+    return tuple(f'{operation}-{value_type}{suffix}' for value_type in types for operation in operations)
+
+
+_INTEGER_OPERATIONS = ('add', 'sub', 'mul', 'div', 'rem', 'and', 'or', 'xor', 'shl', 'shr', 'ushr')
+_FLOAT_OPERATIONS = ('add', 'sub', 'mul', 'div', 'rem')
+
+# Every opcode written by smali and the format of its operands. The odex only opcodes are not included, their lines
+#  stay `BodyStatement` instances.
+OPCODES: Dict[str, InstructionFormat] = {
+    **_opcodes(FORMAT_10X, 'nop', 'return-void', 'return-void-barrier', 'return-void-no-barrier'),
+    **_opcodes(FORMAT_12X, 'move', 'move-wide', 'move-object', 'array-length',
+               'neg-int', 'not-int', 'neg-long', 'not-long', 'neg-float', 'neg-double',
+               'int-to-long', 'int-to-float', 'int-to-double', 'long-to-int', 'long-to-float', 'long-to-double',
+               'float-to-int', 'float-to-long', 'float-to-double', 'double-to-int', 'double-to-long', 'double-to-float',
+               'int-to-byte', 'int-to-char', 'int-to-short',
+               *_arithmetic(('int', 'long'), _INTEGER_OPERATIONS, '/2addr'),
+               *_arithmetic(('float', 'double'), _FLOAT_OPERATIONS, '/2addr')),
+    **_opcodes(FORMAT_22X, 'move/from16', 'move-wide/from16', 'move-object/from16'),
+    **_opcodes(FORMAT_32X, 'move/16', 'move-wide/16', 'move-object/16'),
+    **_opcodes(FORMAT_11X, 'move-result', 'move-result-wide', 'move-result-object', 'move-exception',
+               'return', 'return-wide', 'return-object', 'monitor-enter', 'monitor-exit', 'throw'),
+    **_opcodes(FORMAT_11N, 'const/4'),
+    **_opcodes(FORMAT_21S, 'const/16', 'const-wide/16'),
+    **_opcodes(FORMAT_31I, 'const', 'const-wide/32'),
+    **_opcodes(FORMAT_21H, 'const/high16', 'const-wide/high16'),
+    **_opcodes(FORMAT_51L, 'const-wide'),
+    **_opcodes(FORMAT_21C, 'const-string', 'const-class', 'check-cast', 'new-instance', 'const-method-handle', 'const-method-type',
+               *_typed('sget'), *_typed('sput')),
+    **_opcodes(FORMAT_31C, 'const-string/jumbo'),
+    **_opcodes(FORMAT_22C, 'instance-of', 'new-array', *_typed('iget'), *_typed('iput')),
+    **_opcodes(FORMAT_35C, 'filled-new-array', 'invoke-virtual', 'invoke-super', 'invoke-direct', 'invoke-static', 'invoke-interface', 'invoke-custom'),
+    **_opcodes(FORMAT_3RC, 'filled-new-array/range', 'invoke-virtual/range', 'invoke-super/range', 'invoke-direct/range', 'invoke-static/range',
+               'invoke-interface/range', 'invoke-custom/range'),
+    **_opcodes(FORMAT_45CC, 'invoke-polymorphic'),
+    **_opcodes(FORMAT_4RCC, 'invoke-polymorphic/range'),
+    **_opcodes(FORMAT_31T, 'fill-array-data', 'packed-switch', 'sparse-switch'),
+    **_opcodes(FORMAT_10T, 'goto'),
+    **_opcodes(FORMAT_20T, 'goto/16'),
+    **_opcodes(FORMAT_30T, 'goto/32'),
+    **_opcodes(FORMAT_21T, 'if-eqz', 'if-nez', 'if-ltz', 'if-gez', 'if-gtz', 'if-lez'),
+    **_opcodes(FORMAT_22T, 'if-eq', 'if-ne', 'if-lt', 'if-ge', 'if-gt', 'if-le'),
+    **_opcodes(FORMAT_23X, 'cmpl-float', 'cmpg-float', 'cmpl-double', 'cmpg-double', 'cmp-long', *_typed('aget'), *_typed('aput'),
+               *_arithmetic(('int', 'long'), _INTEGER_OPERATIONS), *_arithmetic(('float', 'double'), _FLOAT_OPERATIONS)),
+    **_opcodes(FORMAT_22S, 'add-int/lit16', 'rsub-int', 'mul-int/lit16', 'div-int/lit16', 'rem-int/lit16', 'and-int/lit16', 'or-int/lit16',
+               'xor-int/lit16'),
+    **_opcodes(FORMAT_22B, 'add-int/lit8', 'rsub-int/lit8', 'mul-int/lit8', 'div-int/lit8', 'rem-int/lit8', 'and-int/lit8', 'or-int/lit8',
+               'xor-int/lit8', 'shl-int/lit8', 'shr-int/lit8', 'ushr-int/lit8'),
+}
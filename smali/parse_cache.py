@@ -0,0 +1,171 @@
+import hashlib
+import mmap
+import os
+import pickle
+import tempfile
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from smali.lib.line_buffer import LineBuffer
+from smali.parse_options import ParseOptions
+from smali.smali_file import SmaliFile
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class ParseCache:
+    # Parsed files are pickled into `cache_dir`, keyed by the hash of the file content, the library version and
+    #  the parse mode. Reading an entry marks it as recently used, once the cache grows beyond `max_size` bytes
+    #  the least recently used entries are evicted.
+    # Files read from the cache go through the same file level validation as parsed files.
+    DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+    ENTRY_EXTENSION = '.pickle'
+    PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+    cache_dir: str
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.size = sum(size for _, _, size in self.entries())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cache_key(smali_code: Union[bytes, mmap.mmap], lazy: bool = False, validate_statements: bool = False) -> str:
+        # Statements can only be validated while they are parsed, files parsed with and without statement validation
+        #  are separate entries
+        file_hash = hashlib.sha256(smali_code)
+        file_hash.update(f'\0{SmaliFile.__version__}\0{int(lazy)}\0{int(validate_statements)}'.encode())
+        return file_hash.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}{self.ENTRY_EXTENSION}')
+
+    def entries(self) -> List[Tuple[str, int, int]]:
+        # Returns `(path, last use, size)` of every entry
+        result = []
+        for dir_entry in os.scandir(self.cache_dir):
+            if not dir_entry.is_dir():
+                continue
+            for entry in os.scandir(dir_entry.path):
+                if not entry.name.endswith(self.ENTRY_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                result.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        return result
+
+    def load(self, key: str) -> Optional[SmaliFile]:
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                smali_file = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or otherwise unreadable entry is dropped and parsed again
+            self.remove(entry_path)
+            return None
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+        return smali_file
+
+    def store(self, key: str, smali_file: SmaliFile):
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Entries are written to a temporary file first so that concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(smali_file, f, protocol=self.PICKLE_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.size += os.path.getsize(entry_path)
+        if self.size > self.max_size:
+            self.trim()
+
+    def remove(self, entry_path: str):
+        try:
+            size = os.path.getsize(entry_path)
+            os.unlink(entry_path)
+        except FileNotFoundError:
+            return
+        self.size -= size
+
+    def trim(self):
+        # Other processes can share the cache directory, the size is recounted from the directory
+        entries = self.entries()
+        entries.sort(key=lambda entry: entry[1])
+        self.size = sum(size for _, _, size in entries)
+        for entry_path, _, size in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.unlink(entry_path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for entry_path, _, _ in self.entries():
+            self.remove(entry_path)
+        self.size = 0
+
+    def load_or_parse(self, smali_code: Union[bytes, mmap.mmap], lazy: bool = False, options: Optional[ParseOptions] = None) -> Tuple[SmaliFile, bool]:
+        # Returns the parsed file and whether it was read from the cache, without counting it. Files read from the
+        #  cache are validated or submitted to the validation policy like parsed files.
+        if options is None:
+            options = SmaliFile.default_options()
+        key = self.cache_key(smali_code, lazy, options.validate_statements)
+        smali_file = self.load(key)
+        if smali_file is not None:
+            # The warning callback is not pickled
+            smali_file.options = options.for_statements()
+            smali_file.validate_parse(options)
+            return smali_file, True
+        # Decoded the same way as `SmaliFile.parse_file` reads files
+        smali_file = SmaliFile(LineBuffer.decode(smali_code), lazy=lazy, options=options)
+        self.store(key, smali_file)
+        return smali_file, False
+
+    def load_or_parse_file(self, file_path: str, lazy: bool = False, options: Optional[ParseOptions] = None) -> Tuple[SmaliFile, bool]:
+        with LineBuffer.map_file(file_path) as data:
+            return self.load_or_parse(data, lazy, options)
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def parse(self, smali_code: bytes, lazy: bool = False, options: Optional[ParseOptions] = None) -> SmaliFile:
+        smali_file, hit = self.load_or_parse(smali_code, lazy, options)
+        self.record(hit)
+        return smali_file
+
+    def parse_file(self, file_path: str, lazy: bool = False, options: Optional[ParseOptions] = None) -> SmaliFile:
+        smali_file, hit = self.load_or_parse_file(file_path, lazy, options)
+        self.record(hit)
+        return smali_file
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.evictions, self.size)
@@ -0,0 +1,31 @@
+import sys
+import warnings
+from typing import Callable, NamedTuple, Optional
+
+
+class ParseOptions(NamedTuple):
+    # The settings of a single parse. They are passed down the parse instead of read from class attributes, so
+    #  threads can parse with different settings at the same time. `SmaliFile.default_options` reads the class level
+    #  flags once when no options are given.
+    # Checks the reconstruction of the whole file after parsing, like `SmaliFile.VALIDATE`
+    validate: bool = False
+    # Checks the reconstruction of every statement, like `Statement.VALIDATE`
+    validate_statements: bool = False
+    # Validates a sample of the parsed files unless `validate` is set, like `SmaliFile.VALIDATION_POLICY`
+    validation_policy: Optional['ValidationPolicy'] = None
+    # Receives the validation warnings instead of the `warnings` module, whose filters are process wide
+    on_warning: Optional[Callable[[Warning], None]] = None
+    # Interns the descriptors, names and registers of the statements, e.g. `InternTable().intern` to share the
+    #  strings within a project only
+    intern: Callable[[str], str] = sys.intern
+
+    def warn(self, warning: Warning):
+        if self.on_warning is None:
+            warnings.warn(warning)
+        else:
+            self.on_warning(warning)
+
+    def for_statements(self) -> 'ParseOptions':
+        # The options needed to load lazy blocks later, the validation policy only applies to whole files. The
+        #  loaders do not keep an intern table alive, or pickle it with every file.
+        return self._replace(validate=False, validation_policy=None, intern=sys.intern)
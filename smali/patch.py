@@ -0,0 +1,188 @@
+import functools
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from smali.block import Block, BlockItem
+from smali.lib.aho_corasick import AhoCorasick
+from smali.lib.line_buffer import LineBuffer
+from smali.project import SmaliProject
+from smali.smali_file import SmaliFile
+from smali.statements import InstructionStatement, MethodStatement, Statement
+
+
+class PatchRule(NamedTuple):
+    # Statements of method bodies whose text contains `pattern` are patched, the `before` and `after` lines are
+    #  inserted around them and `replace` replaces them. An empty `replace` removes the statement.
+    name: str
+    pattern: str
+    before: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+    replace: Optional[Tuple[str, ...]] = None
+    # Only instructions whose opcode starts with the prefix are patched, e.g. 'invoke-'
+    opcode_prefix: Optional[str] = None
+
+    def matches(self, statement: Statement) -> bool:
+        return self.opcode_prefix is None or (isinstance(statement, InstructionStatement) and statement.opcode.startswith(self.opcode_prefix))
+
+
+class PatchResult(NamedTuple):
+    # Hit counts and seconds spent applying each rule, in the order of the rules
+    hits: Tuple[int, ...]
+    timings: Tuple[float, ...]
+    scan_time: float
+    modified: bool
+
+
+class PatchReport:
+    rule_names: Tuple[str, ...]
+    files: int
+    patched: List[str]
+    errors: Dict[str, Exception]
+    hits: Dict[str, int]
+    timings: Dict[str, float]
+    scan_time: float
+    elapsed: float
+
+    def __init__(self, rule_names: Iterable[str]):
+        self.rule_names = tuple(rule_names)
+        self.files = 0
+        self.patched = []
+        self.errors = {}
+        self.hits = dict.fromkeys(self.rule_names, 0)
+        self.timings = dict.fromkeys(self.rule_names, 0.0)
+        self.scan_time = 0.0
+        self.elapsed = 0.0
+
+    def add(self, file_path: str, result: PatchResult):
+        self.files += 1
+        if result.modified:
+            self.patched.append(file_path)
+        for name, hits, timing in zip(self.rule_names, result.hits, result.timings):
+            self.hits[name] += hits
+            self.timings[name] += timing
+        self.scan_time += result.scan_time
+
+    def __str__(self):
+        lines = [f'{self.files} files, {len(self.patched)} patched, {len(self.errors)} errors in {self.elapsed:.3f}s (scan {self.scan_time:.3f}s)']
+        lines.extend(f'{name}: {self.hits[name]} hits in {self.timings[name]:.3f}s' for name in self.rule_names)
+        return '\n'.join(lines)
+
+
+class PatchEngine:
+    # Applies many rules at once. All patterns are compiled into one automaton, a file is scanned once and only the
+    #  methods with a match are loaded and patched, files without any match are not parsed at all.
+    # Inserted lines are not matched again, a statement is only replaced by the first of its rules that replaces.
+    rules: Tuple[PatchRule, ...]
+    automaton: AhoCorasick[int]
+
+    def __init__(self, rules: Iterable[PatchRule]):
+        self.rules = tuple(rules)
+        names = set()
+        for rule in self.rules:
+            if rule.name in names:
+                raise ValueError(f'duplicate rule name {rule.name}')
+            names.add(rule.name)
+            # Invalid lines are reported before any file is patched
+            Statement.parse_lines((*rule.before, *rule.after, *(rule.replace or ())))
+        self.automaton = AhoCorasick((rule.pattern, idx) for idx, rule in enumerate(self.rules))
+
+    def create_report(self) -> PatchReport:
+        return PatchReport(rule.name for rule in self.rules)
+
+    def match_ends(self, text: str) -> List[int]:
+        return [end for end, _ in self.automaton.iter_matches(text)]
+
+    @staticmethod
+    def hit_lines(lines: LineBuffer, match_ends: List[int]) -> List[int]:
+        # Sorted indexes of the lines that contain a pattern
+        return sorted({lines.line_index(end - 1) for end in match_ends})
+
+    @staticmethod
+    def has_hit(hit_lines: List[int], start: int, end: int) -> bool:
+        idx = bisect_left(hit_lines, start)
+        return idx < len(hit_lines) and hit_lines[idx] < end
+
+    def statement_rules(self, statement: Statement) -> List[int]:
+        return sorted(idx for idx in self.automaton.find_values(str(statement)) if self.rules[idx].matches(statement))
+
+    def patch_method(self, method: Block, hits: List[int], timings: List[float]) -> bool:
+        # The body is rebuilt in one pass, the head and tail of the method are never patched
+        items = method.items
+        body: List[BlockItem] = []
+        modified = False
+        for item in items[1:-1]:
+            rule_indexes = self.statement_rules(item) if isinstance(item, Statement) else ()
+            if len(rule_indexes) == 0:
+                body.append(item)
+                continue
+            before: List[Statement] = []
+            after: List[Statement] = []
+            replacement: Optional[List[Statement]] = None
+            for idx in rule_indexes:
+                rule = self.rules[idx]
+                if rule.replace is not None and replacement is not None:
+                    continue
+                start = time.perf_counter()
+                before.extend(Statement.parse_lines(rule.before))
+                after.extend(Statement.parse_lines(rule.after))
+                if rule.replace is not None:
+                    replacement = Statement.parse_lines(rule.replace)
+                timings[idx] += time.perf_counter() - start
+                hits[idx] += 1
+            body.extend(before)
+            body.extend([item] if replacement is None else replacement)
+            body.extend(after)
+            modified = True
+        if modified:
+            items[1:-1] = body
+        return modified
+
+    def patch(self, smali_file: SmaliFile, match_ends: Optional[List[int]] = None, scan_time: float = 0.0) -> PatchResult:
+        # Patches the file in place. Methods that were not modified since parsing are only loaded when their source
+        #  lines contain a pattern, the others are searched statement by statement. `match_ends` are the ends of the
+        #  matches in the source of the file, when it was scanned already.
+        hits = [0] * len(self.rules)
+        timings = [0.0] * len(self.rules)
+        start = time.perf_counter()
+        lines = smali_file.lines
+        hit_lines = None
+        if isinstance(lines, LineBuffer):
+            hit_lines = self.hit_lines(lines, self.match_ends(lines.text) if match_ends is None else match_ends)
+        scan_time += time.perf_counter() - start
+        modified = False
+        if hit_lines is None or len(hit_lines) > 0 or smali_file.root.modified:
+            for method in smali_file.find(MethodStatement):
+                source = method.source
+                if hit_lines is not None and not method.modified and source is not None and source[0] is lines and \
+                        not self.has_hit(hit_lines, source[1], source[2]):
+                    continue
+                modified = self.patch_method(method, hits, timings) or modified
+        return PatchResult(tuple(hits), tuple(timings), scan_time, modified)
+
+    def patch_file(self, file_path: str, output_path: Optional[str] = None, dry_run: bool = False) -> PatchResult:
+        # Patched files are written to `output_path` or back to `file_path`, nothing is written on a dry run
+        start = time.perf_counter()
+        with LineBuffer.map_file(file_path) as data:
+            smali_code = LineBuffer.decode(data)
+        match_ends = self.match_ends(smali_code)
+        scan_time = time.perf_counter() - start
+        if len(match_ends) == 0:
+            return PatchResult((0,) * len(self.rules), (0.0,) * len(self.rules), scan_time, False)
+        smali_file = SmaliFile(smali_code, lazy=True)
+        result = self.patch(smali_file, match_ends, scan_time)
+        if result.modified and not dry_run:
+            smali_file.write_file(file_path if output_path is None else output_path)
+        return result
+
+    def patch_project(self, project: SmaliProject, file_paths: Optional[List[str]] = None, dry_run: bool = False) -> PatchReport:
+        # Files are patched in place across the workers of the project
+        report = self.create_report()
+        start = time.perf_counter()
+        for file_path, result, error in project.map(functools.partial(PatchEngine.patch_file, self, dry_run=dry_run), file_paths):
+            if error is not None:
+                report.errors[file_path] = error
+            else:
+                report.add(file_path, result)
+        report.elapsed = time.perf_counter() - start
+        return report
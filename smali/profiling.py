@@ -0,0 +1,220 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from smali.block import Block
+from smali.lib.line_tokenizer import LineTokenizer
+from smali.smali_file import SmaliFile
+from smali.statements import Statement
+
+Hook = Callable[[str, float], None]
+
+_missing = object()
+
+
+class TimingCounter:
+    __slots__ = ('count', 'total', 'max')
+
+    count: int
+    total: float
+    max: float
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'mean': self.total / self.count if self.count > 0 else 0.0}
+
+
+class Profiler:
+    # Counts the calls and the time spent in the phases of parsing and unparsing, per `Statement` subclass for
+    #  `parse` and `__str__`. While enabled the profiled functions are replaced by timing wrappers, the originals are
+    #  restored when it is disabled, so there is no cost at all while no profiler is enabled.
+    # Times are inclusive, e.g. `parse_line` contains the `parse` of its statements. Recursive calls of a phase are
+    #  only timed once, at the outermost call. Functions that are stored, like the loaders of lazy blocks, are not
+    #  replaced, `Block.load` times itself while a profiler is active.
+    # Only the current process is profiled, `SmaliProject` refuses to parse on worker processes while a profiler
+    #  is active. Worker threads are counted.
+    ACTIVE: Optional['Profiler'] = None
+
+    # Phases timed per statement type
+    STATEMENT_PHASES = ('parse', '__str__')
+    # Owner, attribute and phase of the other profiled functions, attributes of `Statement` are profiled in every
+    #  subclass that overrides them
+    PHASES = (
+        (SmaliFile, 'parse', 'file.parse'),
+        (SmaliFile, 'resolve_line_statements', 'file.resolve_statements'),
+        (SmaliFile, 'group_statements', 'file.group_statements'),
+        (SmaliFile, 'iter_lines', 'file.unparse'),
+        (SmaliFile, 'check_reconstruction', 'file.validate'),
+        (Statement, 'parse_line', 'statement.parse_line'),
+        (Statement, 'parse_eol_comment', 'statement.parse_eol_comment'),
+        (Statement, 'parse_token', 'statement.parse_token'),
+        (Statement, 'parse_modifiers', 'statement.parse_modifiers'),
+        (LineTokenizer, 'split_spaces', 'tokenizer.split_spaces'),
+        (LineTokenizer, 'split_assignment', 'tokenizer.split_assignment'),
+        (Block, 'iter_statements', 'block.iter_statements'),
+    )
+
+    counters: Dict[str, TimingCounter]
+    hooks: List[Hook]
+    _patches: List[Tuple[type, str, Any]]
+    _local: threading.local
+    _lock: threading.Lock
+
+    def __init__(self, hooks: Iterable[Hook] = ()):
+        self.counters = {}
+        self.hooks = list(hooks)
+        self._patches = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return len(self._patches) > 0
+
+    def record(self, name: str, elapsed: float):
+        # Worker threads record concurrently
+        with self._lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = TimingCounter()
+            counter.add(elapsed)
+        for hook in self.hooks:
+            hook(name, elapsed)
+
+    def running(self) -> set:
+        running = getattr(self._local, 'running', None)
+        if running is None:
+            running = self._local.running = set()
+        return running
+
+    def timed(self, function: Callable, phase: str, name: str) -> Callable:
+        record = self.record
+        running = self.running
+
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                # The time spent in the generator, not the time it is suspended
+                elapsed = 0.0
+                start = time.perf_counter()
+                try:
+                    iterator = function(*args, **kwargs)
+                    for item in iterator:
+                        elapsed += time.perf_counter() - start
+                        yield item
+                        start = time.perf_counter()
+                finally:
+                    record(name, elapsed + time.perf_counter() - start)
+
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            active = running()
+            if phase in active:
+                return function(*args, **kwargs)
+            active.add(phase)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+                active.discard(phase)
+
+        return wrapper
+
+    def wrap_attribute(self, attribute: Any, phase: str, name: str) -> Any:
+        # Static and class methods are wrapped inside of their descriptor
+        if isinstance(attribute, staticmethod):
+            return staticmethod(self.timed(attribute.__func__, phase, name))
+        if isinstance(attribute, classmethod):
+            return classmethod(self.timed(attribute.__func__, phase, name))
+        return self.timed(attribute, phase, name)
+
+    @staticmethod
+    def statement_types() -> List[type]:
+        result = []
+        stack = [Statement]
+        while len(stack) > 0:
+            statement_type = stack.pop()
+            result.append(statement_type)
+            stack.extend(statement_type.__subclasses__())
+        return result
+
+    def patch_targets(self) -> List[Tuple[type, str, str, str]]:
+        targets = []
+        statement_types = self.statement_types()
+        for statement_type in statement_types:
+            if inspect.isabstract(statement_type):
+                continue
+            for attribute in self.STATEMENT_PHASES:
+                targets.append((statement_type, attribute, f'statement.{attribute}', f'{statement_type.__name__}.{attribute}'))
+        for owner, attribute, phase in self.PHASES:
+            owners = [statement_type for statement_type in statement_types if attribute in statement_type.__dict__] if owner is Statement else [owner]
+            targets.extend((owner, attribute, phase, phase) for owner in owners)
+        return targets
+
+    def enable(self):
+        if Profiler.ACTIVE is not None:
+            raise RuntimeError('another profiler is enabled already')
+        # All originals are looked up before the first one is replaced, subclasses inherit the unwrapped functions
+        targets = [(owner, attribute, phase, name, inspect.getattr_static(owner, attribute)) for owner, attribute, phase, name in self.patch_targets()]
+        for owner, attribute, phase, name, original in targets:
+            self._patches.append((owner, attribute, owner.__dict__.get(attribute, _missing)))
+            setattr(owner, attribute, self.wrap_attribute(original, phase, name))
+        Profiler.ACTIVE = self
+
+    def disable(self):
+        for owner, attribute, original in reversed(self._patches):
+            if original is _missing:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self._patches.clear()
+        if Profiler.ACTIVE is self:
+            Profiler.ACTIVE = None
+
+    def __enter__(self) -> 'Profiler':
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        # Sorted by the total time, slowest first
+        with self._lock:
+            counters = sorted(self.counters.items(), key=lambda item: -item[1].total)
+        return {name: counter.to_dict() for name, counter in counters}
+
+    def dump(self, fp: Union[str, TextIO], indent: Optional[int] = 2):
+        if isinstance(fp, str):
+            with open(fp, 'w') as f:
+                json.dump(self.to_dict(), f, indent=indent)
+        else:
+            json.dump(self.to_dict(), fp, indent=indent)
+
+    def iter_report(self, limit: Optional[int] = None) -> Iterator[str]:
+        yield f'{"name":<48} {"count":>10} {"total s":>10} {"mean us":>10} {"max us":>10}'
+        for name, counter in list(self.to_dict().items())[:limit]:
+            yield f'{name:<48} {counter["count"]:>10} {counter["total"]:>10.3f} {counter["mean"] * 1e6:>10.1f} {counter["max"] * 1e6:>10.1f}'
+
+    def report(self, limit: Optional[int] = None) -> str:
+        return '\n'.join(self.iter_report(limit))
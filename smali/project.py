@@ -0,0 +1,169 @@
+import functools
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from smali.block import BlockItemType
+from smali.exceptions import ParseError
+from smali.parse_cache import ParseCache
+from smali.parse_options import ParseOptions
+from smali.profiling import Profiler
+from smali.smali_file import SmaliFile
+
+R = TypeVar('R')
+
+
+def _run_task(func: Callable[[str], R], file_path: str) -> Tuple[str, Optional[R], Optional[Exception]]:
+    try:
+        return file_path, func(file_path), None
+    except Exception as e:
+        return file_path, None, e
+
+
+class SmaliProject:
+    SMALI_EXTENSION = '.smali'
+    DEFAULT_CHUNK_SIZE = 16
+
+    root_path: str
+    max_workers: Optional[int]
+    chunk_size: int
+    cache: Optional[ParseCache]
+    # Parses on a thread pool instead of a process pool, the parsed files are not pickled. Threads only run in
+    #  parallel on free-threaded builds of CPython.
+    threads: bool
+    options: Optional[ParseOptions]
+    files: Dict[str, SmaliFile]
+    paths: Dict[str, str]
+    errors: Dict[str, Exception]
+
+    def __init__(self, root_path: str, max_workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, cache: Optional[ParseCache] = None,
+                 threads: bool = False, options: Optional[ParseOptions] = None):
+        if not os.path.isdir(root_path):
+            raise NotADirectoryError(root_path)
+        self.root_path = os.path.abspath(root_path)
+        self.max_workers = max_workers
+        self.chunk_size = max(1, chunk_size)
+        self.cache = cache
+        self.threads = threads
+        self.options = options
+        self.files = {}
+        self.paths = {}
+        self.errors = {}
+
+    @classmethod
+    def parse_directory(cls, root_path: str, max_workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, cache: Optional[ParseCache] = None,
+                        threads: bool = False, options: Optional[ParseOptions] = None) -> 'SmaliProject':
+        project = cls(root_path, max_workers=max_workers, chunk_size=chunk_size, cache=cache, threads=threads, options=options)
+        project.parse()
+        return project
+
+    @staticmethod
+    def discover(root_path: str) -> List[str]:
+        result = []
+        for dir_path, dir_names, file_names in os.walk(root_path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(SmaliProject.SMALI_EXTENSION):
+                    result.append(os.path.join(dir_path, file_name))
+        return result
+
+    @property
+    def worker_count(self) -> int:
+        if self.max_workers is not None:
+            return max(1, self.max_workers)
+        return os.cpu_count() or 1
+
+    def create_executor(self) -> Executor:
+        if self.threads:
+            return ThreadPoolExecutor(max_workers=self.worker_count)
+        return ProcessPoolExecutor(max_workers=self.worker_count)
+
+    def is_parallel(self, file_count: int) -> bool:
+        return self.worker_count > 1 and file_count > 1
+
+    def map(self, func: Callable[[str], R], file_paths: Optional[List[str]] = None) -> Iterator[Tuple[str, Optional[R], Optional[Exception]]]:
+        # `func` must be picklable when running on more than one worker process, exceptions are returned per file
+        #  instead of raised so that a single bad file does not abort the whole run
+        if file_paths is None:
+            file_paths = self.discover(self.root_path)
+        if not self.is_parallel(len(file_paths)):
+            for file_path in file_paths:
+                yield _run_task(func, file_path)
+            return
+        if Profiler.ACTIVE is not None and not self.threads:
+            raise RuntimeError('the profiler only counts the current process, use a single worker or threads')
+        chunk_size = min(self.chunk_size, max(1, len(file_paths) // self.worker_count))
+        with self.create_executor() as executor:
+            yield from executor.map(_run_task, [func] * len(file_paths), file_paths, chunksize=chunk_size)
+
+    def worker_policy(self, file_count: int) -> Tuple[Optional[ParseOptions], Optional['ValidationPolicy']]:
+        # Returns the options of the workers and the validation policy the parsed files are submitted to here.
+        #  Threads share the policy and submit their files themselves. Worker processes get the options without
+        #  the policy, which can not be pickled, and without the intern table, the files they return are interned
+        #  here. Without options the class level flags are read here, the workers would validate against their own
+        #  copies of `SmaliFile.VALIDATION_POLICY`.
+        options = self.options
+        if self.threads or not self.is_parallel(file_count):
+            return options, None
+        if options is None:
+            options = SmaliFile.default_options()
+        worker_options = options._replace(validation_policy=None, intern=sys.intern)
+        return worker_options, None if options.validate else options.validation_policy
+
+    def parse(self, file_paths: Optional[List[str]] = None) -> Dict[str, SmaliFile]:
+        if file_paths is None:
+            file_paths = self.discover(self.root_path)
+        options, validation_policy = self.worker_policy(len(file_paths))
+        # Unpickled files do not share their strings with the other files
+        from_processes = self.is_parallel(len(file_paths)) and not self.threads
+        intern = sys.intern if self.options is None else self.options.intern
+        if self.cache is None:
+            parse_file = SmaliFile.parse_file if options is None else functools.partial(SmaliFile.parse_file, options=options)
+        else:
+            # The workers use copies of the cache, hits and misses are counted here
+            parse_file = functools.partial(ParseCache.load_or_parse_file, self.cache, options=options)
+        for file_path, smali_file, error in self.map(parse_file, file_paths):
+            if error is not None:
+                self.errors[file_path] = error
+                continue
+            hit = False
+            if self.cache is not None:
+                smali_file, hit = smali_file
+                self.cache.record(hit)
+            if from_processes or hit:
+                smali_file.intern(intern)
+            if from_processes and self.options is not None:
+                # The warning callback of the options is not pickled with the file
+                smali_file.options = self.options.for_statements()
+            class_descriptor = smali_file.class_descriptor
+            if class_descriptor is None:
+                self.errors[file_path] = ParseError('file does not declare a class')
+            elif class_descriptor in self.files:
+                self.errors[file_path] = ParseError(f'duplicate class descriptor {class_descriptor}, first seen in {self.paths[class_descriptor]}')
+            else:
+                self.files[class_descriptor] = smali_file
+                self.paths[class_descriptor] = file_path
+                if validation_policy is not None:
+                    validation_policy.submit(smali_file)
+        if self.cache is not None:
+            self.cache.trim()
+        return self.files
+
+    def query(self, query: 'Query') -> Iterator[Tuple[str, BlockItemType]]:
+        # The query is compiled once and evaluated on every parsed file
+        for class_descriptor, smali_file in self.files.items():
+            for item in query.iter_find(smali_file.root):
+                yield class_descriptor, item
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, class_descriptor: str) -> bool:
+        return class_descriptor in self.files
+
+    def __getitem__(self, class_descriptor: str) -> SmaliFile:
+        return self.files[class_descriptor]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.files)
@@ -0,0 +1,232 @@
+import functools
+import hashlib
+import os
+import sqlite3
+from abc import ABCMeta, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from smali.exceptions import ParseError
+from smali.lib.line_buffer import LineBuffer
+from smali.project import SmaliProject
+from smali.smali_file import SmaliFile
+from smali.statements import ClassStatement, MethodStatement, Statement
+
+
+def _hash_and_extract(extract: Callable[[str], Any], file_path: str) -> Tuple[str, Any]:
+    return ProjectIndex.hash_file(file_path), extract(file_path)
+
+
+class RefreshResult(NamedTuple):
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    failed: int
+
+
+class ClassSource:
+    # The lines of a smali file with the class it declares and the method the current line is in. Only the class
+    #  and method lines are parsed.
+    METHOD_START = '.method '
+    METHOD_END = '.end method'
+    CLASS_START = '.class '
+
+    lines: LineBuffer
+    class_descriptor: Optional[str]
+    # Name and prototype of the method, e.g. `run(I)V`, None outside of methods
+    method: Optional[str]
+
+    def __init__(self, file_path: str):
+        self.lines = LineBuffer.read_file(file_path)
+        self.class_descriptor = None
+        self.method = None
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        # The line number, starting at 1, and the line without its indentation
+        for line_number, line in enumerate(self.lines, 1):
+            line = line.lstrip()
+            if line.startswith(ClassSource.METHOD_START):
+                statement = Statement.parse_line(line)[0]
+                if isinstance(statement, MethodStatement):
+                    self.method = f'{statement.member_name}{statement.prototype}'
+            elif line.startswith(ClassSource.METHOD_END):
+                self.method = None
+            elif line.startswith(ClassSource.CLASS_START) and self.class_descriptor is None:
+                statement = Statement.parse_line(line)[0]
+                if isinstance(statement, ClassStatement):
+                    self.class_descriptor = statement.class_descriptor
+            yield line_number, line
+
+    def declared_class(self) -> str:
+        if self.class_descriptor is None:
+            raise ParseError('file does not declare a class')
+        return self.class_descriptor
+
+
+class ProjectIndex(metaclass=ABCMeta):
+    # Base of the on-disk indexes of a project. Every indexed file is a row in `files`, the rows a subclass
+    #  extracts from a file reference it and are deleted along with it when the file changes or disappears.
+    # Files are only extracted again when their mtime or size changed and their content hash differs.
+    NAME: str = 'index'
+    SCHEMA_VERSION: int = 1
+    SCHEMA: str = ''
+    HASH_ALGORITHM = 'sha256'
+
+    BASE_SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            error TEXT
+        );
+    '''
+
+    db_path: str
+    project: SmaliProject
+    connection: sqlite3.Connection
+    # Ids of the values of the `(id, value)` tables, per table
+    _value_ids: Dict[str, Dict[str, int]]
+
+    def __init__(self, db_path: str, root_path: str, max_workers: Optional[int] = None, chunk_size: int = SmaliProject.DEFAULT_CHUNK_SIZE):
+        self.db_path = db_path
+        self.project = SmaliProject(root_path, max_workers=max_workers, chunk_size=chunk_size)
+        self._value_ids = {}
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.create_schema()
+
+    @classmethod
+    def open(cls, db_path: str, root_path: str, max_workers: Optional[int] = None, chunk_size: int = SmaliProject.DEFAULT_CHUNK_SIZE) -> 'ProjectIndex':
+        index = cls(db_path, root_path, max_workers=max_workers, chunk_size=chunk_size)
+        index.refresh()
+        return index
+
+    @property
+    def schema_id(self) -> str:
+        return f'{self.NAME}:{self.SCHEMA_VERSION}:{SmaliFile.__version__}'
+
+    def create_schema(self):
+        # An index written by another schema or library version is dropped and rebuilt from scratch
+        with self.connection:
+            self.connection.executescript(ProjectIndex.BASE_SCHEMA)
+            row = self.connection.execute('SELECT value FROM meta WHERE key = ?', ('schema',)).fetchone()
+            if row is not None and row[0] == self.schema_id:
+                return
+            tables = [name for name, in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN ('meta', 'files')")]
+            views = [name for name, in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'view'")]
+            for view in views:
+                self.connection.execute(f'DROP VIEW "{view}"')
+            for table in tables:
+                self.connection.execute(f'DROP TABLE "{table}"')
+            self.connection.execute('DELETE FROM files')
+            self._value_ids.clear()
+            self.connection.executescript(self.SCHEMA)
+            self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('schema', self.schema_id))
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        with open(file_path, 'rb') as f:
+            return hashlib.new(ProjectIndex.HASH_ALGORITHM, f.read()).hexdigest()
+
+    @staticmethod
+    @abstractmethod
+    def extract(file_path: str) -> Any:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def store(self, file_id: int, data: Any):
+        raise NotImplementedError()
+
+    def value_id(self, table: str, value: str) -> int:
+        # Distinct values are stored once in a `(id, value)` table of the schema, new values are inserted
+        value_ids = self._value_ids.setdefault(table, {})
+        value_id = value_ids.get(value)
+        if value_id is None:
+            row = self.connection.execute(f'SELECT id FROM "{table}" WHERE value = ?', (value,)).fetchone()
+            value_id = self.insert_value(table, value) if row is None else row[0]
+            value_ids[value] = value_id
+        return value_id
+
+    def insert_value(self, table: str, value: str) -> int:
+        return self.connection.execute(f'INSERT INTO "{table}" (value) VALUES (?)', (value,)).lastrowid
+
+    def relative_path(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.project.root_path)
+
+    def absolute_path(self, relative_path: str) -> str:
+        return os.path.join(self.project.root_path, relative_path)
+
+    def refresh(self) -> RefreshResult:
+        known: Dict[str, Tuple[int, int, int, str]] = {}
+        for file_id, path, mtime_ns, size, file_hash in self.connection.execute('SELECT id, path, mtime_ns, size, hash FROM files'):
+            known[path] = (file_id, mtime_ns, size, file_hash)
+
+        removed = set(known)
+        unchanged = 0
+        touched: List[Tuple[int, int, int]] = []
+        pending: Dict[str, Tuple[Optional[int], os.stat_result, Optional[str]]] = {}
+        for file_path in self.project.discover(self.project.root_path):
+            path = self.relative_path(file_path)
+            removed.discard(path)
+            stat = os.stat(file_path)
+            if path in known:
+                file_id, mtime_ns, size, file_hash = known[path]
+                if stat.st_mtime_ns == mtime_ns and stat.st_size == size:
+                    unchanged += 1
+                    continue
+                new_hash = self.hash_file(file_path)
+                if new_hash == file_hash:
+                    # Touched but not changed
+                    touched.append((stat.st_mtime_ns, stat.st_size, file_id))
+                    unchanged += 1
+                    continue
+                pending[file_path] = (file_id, stat, new_hash)
+            else:
+                pending[file_path] = (None, stat, None)
+
+        added = updated = failed = 0
+        with self.connection:
+            self.connection.executemany('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?', touched)
+            for path in removed:
+                self.connection.execute('DELETE FROM files WHERE id = ?', (known[path][0],))
+            # Extraction runs on the project workers, the results are written by this process only
+            extract = functools.partial(_hash_and_extract, type(self).extract)
+            for file_path, result, error in self.project.map(extract, list(pending)):
+                old_file_id, stat, file_hash = pending[file_path]
+                if old_file_id is not None:
+                    self.connection.execute('DELETE FROM files WHERE id = ?', (old_file_id,))
+                    updated += 1
+                else:
+                    added += 1
+                data = None
+                if result is not None:
+                    file_hash, data = result
+                elif file_hash is None:
+                    file_hash = self.hash_file(file_path)
+                cursor = self.connection.execute(
+                    'INSERT INTO files (path, mtime_ns, size, hash, error) VALUES (?, ?, ?, ?, ?)',
+                    (self.relative_path(file_path), stat.st_mtime_ns, stat.st_size, file_hash, None if error is None else repr(error))
+                )
+                if error is not None:
+                    failed += 1
+                else:
+                    self.store(cursor.lastrowid, data)
+        return RefreshResult(added, updated, len(removed), unchanged, failed)
+
+    def errors(self) -> Dict[str, str]:
+        return {self.absolute_path(path): error for path, error in self.connection.execute('SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path')}
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'ProjectIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
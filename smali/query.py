@@ -0,0 +1,139 @@
+import operator
+import re
+from abc import ABCMeta, abstractmethod
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Type, Union
+
+from smali.block import Block, BlockItem, BlockItemType
+from smali.modifiers import Modifiers
+from smali.statements import CLASS_LEVEL_STATEMENT_TYPES, Statement
+
+Matcher = Callable[[Statement, BlockItem], bool]
+ValueTest = Callable[[Any], bool]
+
+_missing = object()
+
+
+class Predicate(metaclass=ABCMeta):
+    # A test of a single statement attribute, compiled into a function of the attribute value
+    @abstractmethod
+    def compile(self) -> ValueTest:
+        raise NotImplementedError
+
+
+class Equals(Predicate):
+    value: Any
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def compile(self) -> ValueTest:
+        return partial(operator.eq, self.value)
+
+
+class AnyOf(Predicate):
+    values: frozenset
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = frozenset(values)
+
+    def compile(self) -> ValueTest:
+        return self.values.__contains__
+
+
+class Prefix(Predicate):
+    prefix: str
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def compile(self) -> ValueTest:
+        prefix = self.prefix
+        return lambda value: isinstance(value, str) and value.startswith(prefix)
+
+
+class Regex(Predicate):
+    # Matches anywhere in the value, anchor the pattern to match the whole value
+    pattern: Pattern
+
+    def __init__(self, pattern: Union[str, Pattern]):
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+
+    def compile(self) -> ValueTest:
+        search = self.pattern.search
+        return lambda value: isinstance(value, str) and search(value) is not None
+
+
+class HasModifiers(Predicate):
+    # All of the given modifier flags are set
+    modifiers: Modifiers
+
+    def __init__(self, modifiers: Modifiers):
+        self.modifiers = modifiers
+
+    def compile(self) -> ValueTest:
+        # Flag operators are slow, the raw values are compared instead
+        modifiers_type = type(self.modifiers)
+        value = self.modifiers.value
+        return lambda modifiers: isinstance(modifiers, modifiers_type) and modifiers.value & value == value
+
+
+class Query:
+    # Statements of a type whose attributes match the predicates. Plain values are compared for equality.
+    # Queries in `containing` match blocks that contain a match of each of them, the head of a block is matched
+    #  against the query and the block is returned.
+    stmt_type: Type[Statement]
+    predicates: Dict[str, Predicate]
+    containing: Tuple['Query', ...]
+    _matcher: Optional[Matcher]
+
+    def __init__(self, stmt_type: Type[Statement] = Statement, containing: Union['Query', Iterable['Query']] = (), **predicates: Any):
+        self.stmt_type = stmt_type
+        self.predicates = {key: value if isinstance(value, Predicate) else Equals(value) for key, value in predicates.items()}
+        self.containing = (containing,) if isinstance(containing, Query) else tuple(containing)
+        self._matcher = None
+
+    @property
+    def class_level(self) -> bool:
+        # Only class level statements are searched for, bodies that were not loaded yet are skipped
+        return issubclass(self.stmt_type, CLASS_LEVEL_STATEMENT_TYPES)
+
+    def compile(self) -> Matcher:
+        if self._matcher is None:
+            self._matcher = self.build_matcher()
+        return self._matcher
+
+    def build_matcher(self) -> Matcher:
+        stmt_type = self.stmt_type
+        tests = tuple((key, predicate.compile()) for key, predicate in self.predicates.items())
+        containing = tuple((query.compile(), query.class_level) for query in self.containing)
+
+        if len(tests) == 0 and len(containing) == 0:
+            return lambda statement, _: isinstance(statement, stmt_type)
+
+        if len(tests) == 1 and len(containing) == 0:
+            (key, test), = tests
+            return lambda statement, _: isinstance(statement, stmt_type) and (value := getattr(statement, key, _missing)) is not _missing and test(value)
+
+        def match(statement: Statement, item: BlockItem) -> bool:
+            if not isinstance(statement, stmt_type):
+                return False
+            for key, test in tests:
+                value = getattr(statement, key, _missing)
+                if value is _missing or not test(value):
+                    return False
+            for contained_match, class_level in containing:
+                if not isinstance(item, Block) or next(item.iter_matches(contained_match, class_level), None) is None:
+                    return False
+            return True
+
+        return match
+
+    def iter_find(self, root: Block) -> Iterator[BlockItemType]:
+        return root.iter_matches(self.compile(), self.class_level)
+
+    def find(self, root: Block) -> List[BlockItemType]:
+        return list(self.iter_find(root))
+
+    def find_first(self, root: Block) -> Optional[BlockItemType]:
+        return next(self.iter_find(root), None)
@@ -1,156 +1,377 @@
-import warnings
-from typing import Iterator, List, Optional, Union, Type
+import functools
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Type, Union
 
 from smali.attributes import StatementAttributes
-from smali.block import Block, BlockItemType
+from smali.block import Block, BlockItem, BlockItemType, BlockLoader
 from smali.exceptions import FormatError, ParseError, ValidationError, ValidationWarning, WhitespaceWarning
+from smali.lib.line_buffer import LineBuffer
 from smali.lib.smali_compare import SmaliCompare
-from smali.statements import Statement, MethodStatement, FieldStatement, StatementType
+from smali.member_index import MemberIndex
+from smali.modifiers import Modifiers
+from smali.parse_options import ParseOptions
+from smali.statements import Statement, ClassStatement, MethodStatement, FieldStatement, StatementType
+
+_BLOCK_START = StatementAttributes.BLOCK_START.value
+_BLOCK_END = StatementAttributes.BLOCK_END.value
+_ASSIGNMENT_LHS = StatementAttributes.ASSIGNMENT_LHS.value
+_ASSIGNMENT_RHS = StatementAttributes.ASSIGNMENT_RHS.value
+_NO_BREAK = StatementAttributes.NO_BREAK.value
+_NO_INDENT = StatementAttributes.NO_INDENT.value
 
 
 class SmaliFile:
     __version__ = None
+    # Defaults of the `ParseOptions` of files parsed without options, read once at the start of every parse
     VALIDATE: bool = False
+    # Validates a sample of the parsed files, inline or in the background, unless `VALIDATE` is set
+    VALIDATION_POLICY: Optional['ValidationPolicy'] = None
+
+    WRITE_BUFFER_SIZE = 64 * 1024
+    METHOD_START = '.method '
+    METHOD_END = '.end method'
 
     raw_code: str
-    lines: Iterator[str]
+    lines: Sequence[str]
+    lazy: bool
+    # The options the bodies of lazy blocks are parsed with when they are loaded
+    options: ParseOptions
     root: Block
+    _member_index: Optional[MemberIndex]
 
-    def __init__(self, smali_code: str):
+    def __init__(self, smali_code: str, lazy: bool = False, options: Optional[ParseOptions] = None):
         self.raw_code = smali_code
-        self.lines = smali_code.splitlines()
+        # The lines are offsets into the source, equal to `smali_code.splitlines()`
+        self.lines = LineBuffer(smali_code)
+        self.lazy = lazy
         self.root = Block()
-        self.parse()
-        if SmaliFile.VALIDATE:
-            self.validate()
+        self._member_index = None
+        if options is None:
+            options = SmaliFile.default_options()
+        self.options = options.for_statements()
+        self.parse(options)
+        self.validate_parse(options)
+
+    def __getstate__(self):
+        # The warning callback is usually a local function that can not be pickled, unpickled files emit their
+        #  warnings to the `warnings` module until their options are set again
+        state = self.__dict__.copy()
+        state['options'] = self.options._replace(on_warning=None)
+        return state
+
+    @staticmethod
+    def default_options() -> ParseOptions:
+        return ParseOptions(SmaliFile.VALIDATE, Statement.VALIDATE, SmaliFile.VALIDATION_POLICY)
 
     @classmethod
-    def parse_file(cls, file_path: str) -> 'SmaliFile':
-        with open(file_path, 'r') as f:
-            smali_code = f.read()
-        return cls(smali_code)
+    def parse_file(cls, file_path: str, lazy: bool = False, cache: Optional['ParseCache'] = None, options: Optional[ParseOptions] = None) -> 'SmaliFile':
+        if cache is not None:
+            return cache.parse_file(file_path, lazy=lazy, options=options)
+        # The file is mapped and decoded as UTF-8 once, without reading a copy of its bytes first
+        with LineBuffer.map_file(file_path) as data:
+            smali_code = LineBuffer.decode(data)
+        return cls(smali_code, lazy=lazy, options=options)
 
-    def __str__(self):
-        result = []
-        statements = self.root.flatten()
+    @property
+    def class_descriptor(self) -> Optional[str]:
+        class_statement = self.root.find_first(ClassStatement)
+        if class_statement is None:
+            return None
+        return class_statement.class_descriptor
+
+    def iter_lines(self, reuse_source: bool = True) -> Iterator[str]:
+        # Blocks that were never modified are written as their source lines, only modified blocks are rendered
+        line: Optional[List[str]] = None
+        previous_attributes = 0
         block_level = 0
-        for idx, statement in enumerate(statements):
-            if bool(statement.attributes & StatementAttributes.BLOCK_END):
+        for statement in self.root.iter_statements(materialize=False, reuse_source=reuse_source):
+            if isinstance(statement, str):
+                # Source line of a block that was never modified or loaded
+                if line is not None:
+                    yield ''.join(line)
+                line = [statement]
+                previous_attributes = 0
+                continue
+
+            # Flag operators are slow in the unparse loop, work on the raw attribute values instead
+            attributes = statement.attributes.value
+            if attributes & _BLOCK_END:
                 block_level -= 1
                 if block_level < 0:
                     raise FormatError('block level became negative in BLOCK_END')
 
-            if bool(statement.attributes & StatementAttributes.NO_INDENT):
+            if attributes & _NO_INDENT:
                 indent = ''
             else:
                 indent = (block_level * Block.INDENT_SIZE) * Block.INDENT_CHAR
 
-            if bool(statement.attributes & StatementAttributes.ASSIGNMENT_LHS):
-                result.append(f'{indent}{statement}= ')
-            elif bool(statement.attributes & StatementAttributes.ASSIGNMENT_RHS):
-                result[-1] += str(statement)
-            elif bool(statement.attributes & StatementAttributes.NO_BREAK):
-                if bool(statement.attributes & StatementAttributes.BLOCK_END) and bool(statements[idx - 1].attributes & StatementAttributes.BLOCK_START):
-                    result[-1] += str(statement)
+            if attributes & _ASSIGNMENT_LHS:
+                if line is not None:
+                    yield ''.join(line)
+                line = [indent, str(statement), '= ']
+            elif line is not None and attributes & _ASSIGNMENT_RHS:
+                line.append(str(statement))
+            elif line is not None and attributes & _NO_BREAK:
+                if attributes & _BLOCK_END and previous_attributes & _BLOCK_START:
+                    line.append(str(statement))
                 else:
-                    result[-1] += f' {statement}'
+                    line.append(f' {statement}')
             else:
-                result.append(f'{indent}{statement}')
+                if line is not None:
+                    yield ''.join(line)
+                line = [indent, str(statement)]
 
-            if bool(statement.attributes & StatementAttributes.BLOCK_START):
+            if attributes & _BLOCK_START:
                 block_level += 1
+            previous_attributes = attributes
+
+        if line is not None:
+            yield ''.join(line)
+
+    def write_to(self, fp: TextIO, buffer_size: int = WRITE_BUFFER_SIZE, reuse_source: bool = True):
+        # Lines are joined into chunks of about `buffer_size` characters, the output is identical to `str(self)`
+        chunk: List[str] = []
+        chunk_size = 0
+        separator = ''
+        for line in self.iter_lines(reuse_source):
+            chunk.append(line)
+            chunk_size += len(line) + 1
+            if chunk_size >= buffer_size:
+                fp.write(separator)
+                fp.write('\n'.join(chunk))
+                separator = '\n'
+                chunk.clear()
+                chunk_size = 0
+        if len(chunk) > 0:
+            fp.write(separator)
+            fp.write('\n'.join(chunk))
+
+    def write_file(self, file_path: str):
+        # Written with the encoding files are read with, independent of the locale. The lines drop the final
+        #  newline of the source, it is written back so unchanged files keep their bytes.
+        with open(file_path, 'w', encoding=LineBuffer.ENCODING) as f:
+            self.write_to(f)
+            if self.raw_code.endswith('\n'):
+                f.write('\n')
+
+    def __str__(self):
+        return '\n'.join(self.iter_lines())
+
+    def parse_statements(self, statements: List[BlockItem], line_indexes: Optional[List[int]] = None):
+        SmaliFile.group_statements(statements, self.root, line_indexes, self.lines)
+        self._member_index = MemberIndex(self.root)
+
+    @property
+    def member_index_current(self) -> bool:
+        # Single lookups after a change walk the class level items up to the first match instead of rebuilding the
+        #  index, lookups of all methods by name rebuild it
+        return self._member_index is not None and self._member_index.is_current(self.root)
+
+    @property
+    def member_index(self) -> MemberIndex:
+        # Rebuilt from the root items after every change to the tree
+        if not self.member_index_current:
+            self._member_index = MemberIndex(self.root)
+        return self._member_index
+
+    @staticmethod
+    def is_line_start(line_indexes: List[int], idx: int) -> bool:
+        return idx == 0 or line_indexes[idx - 1] != line_indexes[idx]
 
-        return '\n'.join(result)
+    @staticmethod
+    def is_line_end(line_indexes: List[int], idx: int) -> bool:
+        return idx == len(line_indexes) - 1 or line_indexes[idx + 1] != line_indexes[idx]
 
-    def parse_statements(self, statements: List[Statement]):
+    @staticmethod
+    def group_statements(statements: List[BlockItem], root: Block, line_indexes: Optional[List[int]] = None, lines: Optional[Sequence[str]] = None):
+        # With the source line of every statement, blocks that span complete lines remember their source lines
+        #  so they can be written verbatim as long as they are not modified
         stack: List[Block] = []
-        for statement in statements:
-            if bool(statement.attributes & StatementAttributes.BLOCK_START):
+        stack_starts: List[Optional[int]] = []
+        for idx, statement in enumerate(statements):
+            if isinstance(statement, Block):
+                # Lazy blocks are already complete
+                if len(stack) > 0:
+                    stack[-1].append_parsed(statement)
+                else:
+                    root.append_parsed(statement)
+            elif statement.attributes.value & _BLOCK_START:
                 # If a new block is starting, generate a new block on the stack
                 #  and add the block start statement
                 stack.append(Block())
-                stack[-1].append(statement)
-            elif bool(statement.attributes & StatementAttributes.BLOCK_END):
+                stack[-1].append_parsed(statement)
+                if line_indexes is not None and SmaliFile.is_line_start(line_indexes, idx):
+                    stack_starts.append(line_indexes[idx])
+                else:
+                    stack_starts.append(None)
+            elif statement.attributes.value & _BLOCK_END:
                 # A block is ending, finish it
                 finished_block = stack.pop()
+                block_start = stack_starts.pop()
                 if finished_block.head.block_ends_with != (type(statement), statement.modifiers):
                     raise ParseError('block end does not match block start')
-                finished_block.append(statement)
+                finished_block.append_parsed(statement)
+                if block_start is not None and SmaliFile.is_line_end(line_indexes, idx):
+                    finished_block.source = (lines, block_start, line_indexes[idx] + 1)
                 # If there are more blocks on the stack, this block appends to that
                 if len(stack) > 0:
-                    stack[-1].append(finished_block)
+                    stack[-1].append_parsed(finished_block)
                 else:
                     # No more blocks in the stack, we're back to root
-                    self.root.append(finished_block)
+                    root.append_parsed(finished_block)
             else:
                 # If it's not a start or end, it's a normal statement
                 # First check to see if we're in a maybe block
                 # Check to see if there is a block on the stack and append it there
                 # Otherwise it's root
                 if len(stack) > 0:
-                    stack[-1].append(statement)
+                    stack[-1].append_parsed(statement)
                 else:
-                    self.root.append(statement)
+                    root.append_parsed(statement)
         if len(stack) > 0:
             raise ParseError('file parsing complete but block stack is not empty')
 
-    def parse(self):
-        statements: List[Statement] = []
-        maybe_block_indexes: List[int] = []
+    @staticmethod
+    def find_method_end(lines: Sequence[str], method_idx: int) -> Optional[int]:
+        for idx in range(method_idx + 1, len(lines)):
+            line = lines[idx].lstrip()
+            if line.startswith(SmaliFile.METHOD_END):
+                return idx
+            elif line.startswith(SmaliFile.METHOD_START):
+                return None
+        return None
+
+    @staticmethod
+    def resolve_statements(lines: Sequence[str], lazy: bool = False, options: Optional[ParseOptions] = None) -> List[BlockItem]:
+        return SmaliFile.resolve_line_statements(lines, 0, len(lines), lazy, options)[0]
+
+    @staticmethod
+    def resolve_line_statements(lines: Sequence[str], start: int, end: int, lazy: bool = False, options: Optional[ParseOptions] = None,
+                                loader: Optional[BlockLoader] = None) -> Tuple[List[BlockItem], List[int]]:
+        # Returns the statements of `lines[start:end]` and the index of the line every statement is on. Without
+        #  options nothing is validated, the class level flags are only read by `SmaliFile.default_options`.
+        if options is None:
+            options = ParseOptions()
+        if lazy and loader is None:
+            # Lazy blocks of a file load through the file, without a file they keep the options themselves
+            loader = functools.partial(SmaliFile.parse_items, options=options.for_statements())
+        statements: List[BlockItem] = []
+        line_indexes: List[int] = []
+        maybe_block_indexes: Dict[Tuple[Type[Statement], Optional[Modifiers]], List[int]] = {}
+        line_idx = start
         # Some statements can either be a single line or multiple line blocks
         # The way we handle this is to do 2 parse passes, the first pass determines if the variable statements
         #  are a single line or multiple lines. The second pass parses into blocks.
-        for line in self.lines:
-            new_statements = Statement.parse_line(line)
+        while line_idx < end:
+            line = lines[line_idx]
+            if lazy and line.lstrip().startswith(SmaliFile.METHOD_START):
+                method_end_idx = SmaliFile.find_method_end(lines, line_idx)
+                if method_end_idx is not None and method_end_idx < end:
+                    # Only the method signature and end are parsed, the body is parsed the first time it is accessed
+                    head = Statement.parse_line(line, options)[0]
+                    tail = Statement.parse_line(lines[method_end_idx], options)[0]
+                    statements.append(Block.lazy(head, tail, (lines, line_idx, method_end_idx + 1), loader))
+                    line_indexes.append(line_idx)
+                    line_idx = method_end_idx + 1
+                    continue
+            new_statements = Statement.parse_line(line, options)
             # A line can contain multiple statements: `{}` or `statement1 = statement2`
             for new_statement in new_statements:
                 statements.append(new_statement)
+                line_indexes.append(line_idx)
                 if bool(new_statement.attributes & StatementAttributes.MAYBE_BLOCK_START):
-                    # If the statement might start a block, keep track of it
-                    maybe_block_indexes.append(len(statements) - 1)
+                    # If the statement might start a block, keep track of it on the stack of the end it is waiting for
+                    maybe_block_indexes.setdefault(new_statement.block_ends_with, []).append(len(statements) - 1)
                 elif bool(new_statement.attributes & StatementAttributes.BLOCK_END):
-                    # If we reach and end statement, check to see if it matches any possible MAYBE_BLOCK_START
-                    for maybe_block_index in reversed(maybe_block_indexes):
-                        if statements[maybe_block_index].block_ends_with == (type(new_statement), new_statement.modifiers):
-                            # If the MAYBE_BLOCK_START statement is a block start, set it's attribute to BLOCK_START
-                            statements[maybe_block_index].attributes |= StatementAttributes.BLOCK_START
-                            statements[maybe_block_index].attributes &= ~StatementAttributes.MAYBE_BLOCK_START
-                            maybe_block_indexes.remove(maybe_block_index)
-                            break
+                    # If we reach and end statement, check to see if it matches the latest possible MAYBE_BLOCK_START
+                    maybe_block_stack = maybe_block_indexes.get((type(new_statement), new_statement.modifiers))
+                    if maybe_block_stack:
+                        # If the MAYBE_BLOCK_START statement is a block start, set it's attribute to BLOCK_START
+                        maybe_block_index = maybe_block_stack.pop()
+                        statements[maybe_block_index].attributes |= StatementAttributes.BLOCK_START
+                        statements[maybe_block_index].attributes &= ~StatementAttributes.MAYBE_BLOCK_START
+            line_idx += 1
 
         # For all MAYBE_BLOCK_START statements that remain, set their attribute to SINGLE_LINE
-        for maybe_block_index in maybe_block_indexes:
-            statements[maybe_block_index].attributes |= StatementAttributes.SINGLE_LINE
-            statements[maybe_block_index].attributes &= ~StatementAttributes.MAYBE_BLOCK_START
+        for maybe_block_stack in maybe_block_indexes.values():
+            for maybe_block_index in maybe_block_stack:
+                statements[maybe_block_index].attributes |= StatementAttributes.SINGLE_LINE
+                statements[maybe_block_index].attributes &= ~StatementAttributes.MAYBE_BLOCK_START
+
+        return statements, line_indexes
+
+    @staticmethod
+    def parse_items(lines: Sequence[str], start: int, end: int, options: Optional[ParseOptions] = None) -> List[BlockItem]:
+        block = Block()
+        statements, line_indexes = SmaliFile.resolve_line_statements(lines, start, end, options=options)
+        SmaliFile.group_statements(statements, block, line_indexes, lines)
+        return list(block.items)
+
+    def load_items(self, lines: Sequence[str], start: int, end: int) -> List[BlockItem]:
+        # The loader of the lazy blocks of the file, with the options of the file at the time the block is loaded
+        return SmaliFile.parse_items(lines, start, end, self.options)
 
-        self.parse_statements(statements)
+    def parse(self, options: Optional[ParseOptions] = None):
+        self.parse_statements(*SmaliFile.resolve_line_statements(self.lines, 0, len(self.lines), self.lazy, options, self.load_items))
+        self.root.source = (self.lines, 0, len(self.lines))
 
-    def validate(self):
-        reconstruction = str(self)
+    def intern(self, intern: Callable[[str], str]):
+        # Interns the statements again, e.g. after the file was unpickled. Bodies that were not loaded yet are
+        #  interned when they are loaded.
+        for statement in self.root.iter_statements(materialize=False):
+            if isinstance(statement, Statement):
+                statement.intern(intern)
+
+    def check_reconstruction(self) -> Optional[Union[ValidationError, ValidationWarning]]:
+        # Validation checks the rendered statements, not the reused source. The reconstruction is rendered once,
+        #  the comparisons are only needed when it is not identical to the source.
+        reconstruction = list(self.iter_lines(reuse_source=False))
+        if self.raw_code.rstrip() == '\n'.join(reconstruction).rstrip():
+            return None
         if SmaliCompare.order_independent_hash(self.raw_code) != SmaliCompare.order_independent_hash(reconstruction):
-            raise ValidationError(f'not reconstructed correctly')
+            return ValidationError(f'not reconstructed correctly')
         elif not SmaliCompare.whitespace_normalized_equals(self.raw_code, reconstruction):
-            warnings.warn(ValidationWarning(f'might not be reconstructed correctly'))
-        elif self.raw_code.rstrip() != reconstruction.rstrip():
-            warnings.warn(WhitespaceWarning(f'has different whitespace'))
+            return ValidationWarning(f'might not be reconstructed correctly')
+        else:
+            return WhitespaceWarning(f'has different whitespace')
+
+    def validate_parse(self, options: ParseOptions):
+        # The file level validation of a parse, also run for files that are loaded from the `ParseCache`
+        if options.validate:
+            self.validate(options)
+        elif options.validation_policy is not None:
+            options.validation_policy.submit(self)
+
+    def validate(self, options: Optional[ParseOptions] = None):
+        failure = self.check_reconstruction()
+        if isinstance(failure, ValidationError):
+            raise failure
+        elif failure is not None:
+            (options or ParseOptions()).warn(failure)
+
+    def iter_find(self, stmt_type: Type[StatementType], **attributes) -> Iterator[BlockItemType]:
+        return self.root.iter_find(stmt_type, **attributes)
 
     def find(self, stmt_type: Type[StatementType], **attributes) -> List[BlockItemType]:
         return self.root.find(stmt_type, **attributes)
 
+    def find_first(self, stmt_type: Type[StatementType], **attributes) -> Optional[BlockItemType]:
+        return self.root.find_first(stmt_type, **attributes)
+
+    def query(self, query: 'Query') -> List[BlockItemType]:
+        return query.find(self.root)
+
     def find_methods(self, method_name: str) -> List[Block[MethodStatement]]:
-        return self.root.find(MethodStatement, member_name=method_name)
+        return self.member_index.find_methods(method_name)
 
     def find_method(self, method_name: str, method_prototype: str) -> Optional[Block[MethodStatement]]:
         method_parts = MethodStatement.RE_METHOD_PROTOTYPE.fullmatch(method_prototype)
         if method_parts is None:
             raise Exception('invalid method prototype')
-        result = self.root.find(MethodStatement, member_name=method_name, method_params=method_parts.group(1), method_result_type=method_parts.group(2))
-        if len(result) == 0:
-            return None
-        return result[0]
+        if not self.member_index_current:
+            return self.root.find_first(MethodStatement, member_name=method_name, method_params=method_parts.group(1), method_result_type=method_parts.group(2))
+        return self.member_index.find_method(method_name, method_parts.group(1), method_parts.group(2))
 
     def find_field(self, field_name: str) -> Optional[Union[Block[FieldStatement], FieldStatement]]:
-        result = self.root.find(FieldStatement, member_name=field_name)
-        if len(result) == 0:
-            return None
-        return result[0]
+        if not self.member_index_current:
+            return self.root.find_first(FieldStatement, member_name=field_name)
+        return self.member_index.find_field(field_name)
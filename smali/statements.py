@@ -1,60 +1,117 @@
 import re
+import sys
 import warnings
 from abc import ABCMeta, abstractmethod
-from typing import Dict, List, Optional, Tuple, Type, Union, Iterable, TypeVar
+from collections import deque
+from itertools import repeat
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union, Iterable, TypeVar
 
 from smali.attributes import StatementAttributes
 from smali.exceptions import ParseError, ValidationError, ValidationWarning, WhitespaceWarning
+from smali.lib.line_tokenizer import LineTokenizer
 from smali.lib.peekable import Peekable
 from smali.lib.smali_compare import SmaliCompare
 from smali.literals import IntLiteral
 from smali.modifiers import EndModifiers, Modifiers
+from smali.opcodes import InstructionFormat, OPCODES, Operand
+from smali.parse_options import ParseOptions
 from smali.qualifiers import Qualifier
 from smali.tokens import Annotation, ArrayData, Catch, CatchAll, Class, End, Enum, Field, Implements, Line, Local, Locals, Method, PackedSwitch, Param, Prologue, Registers, Restart, Source, SparseSwitch, Subannotation, Super, Token, Tokens, TokensLex
 
+_object_setattr = object.__setattr__
+
+# Enum member access is slow in the instruction parse loop
+_REGISTER = Operand.REGISTER
+_REGISTER_LIST = Operand.REGISTER_LIST
+_REGISTER_RANGE = Operand.REGISTER_RANGE
+_LABEL = Operand.LABEL
+_LITERAL = Operand.LITERAL
+_REFERENCE = Operand.REFERENCE
+
 
 class Statement(metaclass=ABCMeta):
+    __slots__ = ('parent', 'raw_line', 'clean_line', 'eol_comment', 'line_iter', 'modifiers', 'attributes')
+
+    # Default of `ParseOptions.validate_statements` when a statement is parsed without options
     VALIDATE: bool = False
+    # Statements rendered from their source text keep `clean_line` after parsing
+    RETAIN_SOURCE: bool = False
+    # Statements that parse `clean_line` themselves, or do not parse it at all, do not need the tokens of
+    #  `line_iter`. Without tokens nothing is left over for `assert_end_of_line`.
+    TOKENIZE: bool = True
+    # Attributes holding descriptors, names and registers, the same values repeat across all files of an APK. They
+    #  are interned after parsing, so equal values share one string object.
+    INTERNED: Tuple[str, ...] = ()
 
-    RE_SPACE_SPLIT = re.compile(r' +(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
-    RE_ASSIGNMENT_SPLIT = re.compile(r'=(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
     RE_EOL_COMMENT = re.compile(r'\s*(?:#.*)?$')
     RE_BRACKET_BLOCK_SPLIT = re.compile(r'(?:(?:({) ?)|(?: ?(})))')
 
-    raw_line: str
-    clean_line: str
+    # The block containing the statement, it is marked as modified when the statement changes
+    parent: Optional['Block']
+    raw_line: Optional[str]
+    clean_line: Optional[str]
     eol_comment: str
-    line_iter: Peekable[str]
+    line_iter: Optional[Peekable[str]]
     modifiers: Optional[Modifiers]
     attributes: StatementAttributes
 
-    def __init__(self, line: str):
-        self.raw_line = line.rstrip('\r\n')
-        self.clean_line = self.raw_line.lstrip()
+    def __init__(self, line: str, options: Optional[ParseOptions] = None):
+        # Parsing is not a modification, the common attributes skip the change tracking of `__setattr__`
+        _object_setattr(self, 'parent', None)
+        _object_setattr(self, 'raw_line', line.rstrip('\r\n'))
+        _object_setattr(self, 'clean_line', self.raw_line.lstrip())
         self.parse_eol_comment()
-        self.line_iter = Peekable(Statement.RE_SPACE_SPLIT.split(self.clean_line))
-        self.modifiers = None
+        _object_setattr(self, 'line_iter', Peekable(LineTokenizer.split_spaces(self.clean_line)) if self.TOKENIZE else None)
+        _object_setattr(self, 'modifiers', None)
         self.parse_token()
         self.parse_modifiers()
         self.parse()
-        if Statement.VALIDATE:
+        if self.INTERNED:
+            self.intern(sys.intern if options is None else options.intern)
+        if Statement.VALIDATE if options is None else options.validate_statements:
             self.assert_end_of_line()
-            self.validate()
+            self.validate(options)
+        self.release()
+
+    def __setattr__(self, key, value):
+        _object_setattr(self, key, value)
+        if self.parent is not None:
+            self.parent.mark_modified()
 
     @classmethod
-    def parse_line(cls, line: str) -> List['Statement']:
+    def state_slots(cls) -> Tuple[str, ...]:
+        if '_state_slots' not in cls.__dict__:
+            cls._state_slots = tuple(key for klass in reversed(cls.__mro__) for key in klass.__dict__.get('__slots__', ()))
+        return cls._state_slots
+
+    def __getstate__(self):
+        # Pickled as a plain tuple of the slot values, unless some slots were never assigned
+        slots = self.state_slots()
+        try:
+            return tuple([getattr(self, key) for key in slots])
+        except AttributeError:
+            return None, {key: getattr(self, key) for key in slots if hasattr(self, key)}
+
+    def __setstate__(self, state):
+        # Restoring a pickled statement is not a modification
+        if len(state) == 2:
+            _, slots = state
+            for key, value in slots.items():
+                _object_setattr(self, key, value)
+        else:
+            deque(map(_object_setattr, repeat(self), self.state_slots(), state), maxlen=0)
+
+    @classmethod
+    def parse_line(cls, line: str, options: Optional[ParseOptions] = None) -> List['Statement']:
         clean_line = line.strip()
         if len(clean_line) == 0:
-            return [BlankStatement(line)]
+            return [BlankStatement(line, options)]
         elif clean_line[0] == Qualifier.COMMENT:
-            return [CommentStatement(line)]
-        elif Statement.RE_ASSIGNMENT_SPLIT.search(clean_line) is not None:
-            assignment_line = Statement.RE_ASSIGNMENT_SPLIT.split(clean_line, maxsplit=1)
-            if len(assignment_line) != 2:
-                raise ParseError('assignment statement does not have correct number of sides')
-            lhs = Statement.parse_line(assignment_line[0])
+            return [CommentStatement(line, options)]
+        elif (assignment_line := LineTokenizer.split_assignment(clean_line)) is not None:
+            lhs = Statement.parse_line(assignment_line[0], options)
             lhs[0].attributes |= StatementAttributes.ASSIGNMENT_LHS
-            rhs = Statement.parse_line(assignment_line[1])
+            rhs = Statement.parse_line(assignment_line[1], options)
             rhs[0].attributes |= StatementAttributes.ASSIGNMENT_RHS
             return [*lhs, *rhs]
         elif clean_line[-1] == Qualifier.BLOCK_END:
@@ -62,21 +119,21 @@ class Statement(metaclass=ABCMeta):
                 statements = []
                 block_statement_parts = list(filter(lambda x: x and x.strip() != '', Statement.RE_BRACKET_BLOCK_SPLIT.split(clean_line)))
                 for part in block_statement_parts:
-                    statements.extend(Statement.parse_line(part))
+                    statements.extend(Statement.parse_line(part, options))
 
                 for statement in statements[1:]:
                     statement.attributes |= StatementAttributes.NO_BREAK
 
                 return statements
 
-            return [BlockEndStatement(line)]
+            return [BlockEndStatement(line, options)]
         elif clean_line[-1] == Qualifier.BLOCK_START:
-            return [BlockStartStatement(line)]
+            return [BlockStartStatement(line, options)]
         elif clean_line[0] == Qualifier.BLOCK_START:
             statements = []
             block_statement_parts = list(filter(lambda x: x and x.strip() != '', Statement.RE_BRACKET_BLOCK_SPLIT.split(clean_line)))
             for part in block_statement_parts:
-                statements.extend(Statement.parse_line(part))
+                statements.extend(Statement.parse_line(part, options))
 
             for statement in statements[1:]:
                 statement.attributes |= StatementAttributes.NO_BREAK
@@ -91,26 +148,33 @@ class Statement(metaclass=ABCMeta):
                 raise ParseError('unknown or invalid token descriptor')
             if Tokens[token_str] not in StatementTypes:
                 raise ParseError('unsupported token')
-            return [StatementTypes[Tokens[token_str]](line)]
+            return [StatementTypes[Tokens[token_str]](line, options)]
         else:
-            return [BodyStatement(line)]
+            # Dispatched on the opcode, lines that do not parse as an instruction stay body statements
+            if clean_line.split(' ', 1)[0] in OPCODES:
+                try:
+                    return [InstructionStatement(line, options)]
+                except ParseError:
+                    pass
+            return [BodyStatement(line, options)]
 
     @classmethod
-    def parse_lines(cls, lines: Union[Iterable[str]]) -> List['Statement']:
+    def parse_lines(cls, lines: Union[Iterable[str]], options: Optional[ParseOptions] = None) -> List['Statement']:
         if isinstance(lines, str):
             lines = lines.splitlines(keepends=False)
         result = []
         for line in lines:
-            result.extend(cls.parse_line(line))
+            result.extend(cls.parse_line(line, options))
         return result
 
     def parse_eol_comment(self):
-        self.eol_comment = ''
         eol_comment_match = Statement.RE_EOL_COMMENT.search(self.clean_line)
         if eol_comment_match is not None:
-            self.eol_comment = eol_comment_match.group(0)
+            _object_setattr(self, 'eol_comment', eol_comment_match.group(0))
             match_idx = eol_comment_match.span()
-            self.clean_line = self.clean_line[:match_idx[0]] + self.clean_line[match_idx[1]:]
+            _object_setattr(self, 'clean_line', self.clean_line[:match_idx[0]] + self.clean_line[match_idx[1]:])
+        else:
+            _object_setattr(self, 'eol_comment', '')
 
     def parse_token(self):
         if self.token is None:
@@ -123,37 +187,58 @@ class Statement(metaclass=ABCMeta):
             return
         if self.token.AVAILABLE_MODIFIERS is None:
             return
+        # Combining flags is slow, the values are combined and converted to a flag once
+        modifiers_type = self.token.AVAILABLE_MODIFIERS
+        modifier_tags = modifiers_type.tags()
+        value = 0
         try:
-            self.modifiers = self.token.AVAILABLE_MODIFIERS(0)  # noqa
             while True:
-                mod = self.token.AVAILABLE_MODIFIERS.find(self.line_iter.peek())
+                mod = modifier_tags.get(self.line_iter.peek())
                 if mod is None:
                     break
-                self.modifiers |= mod
+                value |= mod.value
                 next(self.line_iter)
-            if self.modifiers == self.token.AVAILABLE_MODIFIERS(0):  # noqa
-                self.modifiers = None
+            modifiers = modifiers_type(value) if value != 0 else None
         except StopIteration:
-            pass
+            modifiers = modifiers_type(value)
+        _object_setattr(self, 'modifiers', modifiers)
+
+    def intern(self, intern: Callable[[str], str]):
+        # Interning is not a modification, registers are interned inside of their tuple
+        for key in self.INTERNED:
+            value = getattr(self, key, None)
+            if type(value) is str:
+                _object_setattr(self, key, intern(value))
+            elif type(value) is tuple:
+                _object_setattr(self, key, tuple(map(intern, value)))
+
+    def release(self):
+        # Drop the parse only state, a patched APK can keep millions of statements resident
+        _object_setattr(self, 'line_iter', None)
+        _object_setattr(self, 'raw_line', None)
+        if not self.RETAIN_SOURCE:
+            _object_setattr(self, 'clean_line', None)
 
     def assert_end_of_line(self):
         if self.line_iter:
             raise ParseError(f'{type(self).__name__} line not empty after parsing: {self.raw_line}')
 
-    def finish_line(self):
-        if not self.VALIDATE:
-            return
-        while self.line_iter:
-            next(self.line_iter)
-
-    def validate(self):
+    def validate(self, options: Optional[ParseOptions] = None):
+        # Compares with the source line, which is released at the end of the parse. Parsed statements are validated
+        #  while they are parsed, with `ParseOptions(validate_statements=True)` or `Statement.VALIDATE`.
+        if self.raw_line is None:
+            raise ValidationError(f'{type(self).__name__} source line was released after parsing, it can only be validated while parsing')
+        warn = warnings.warn if options is None else options.warn
         reconstructed = str(self)
+        source = self.raw_line.lstrip()
+        if source == reconstructed:
+            return
         if SmaliCompare.order_independent_hash(self.raw_line) != SmaliCompare.order_independent_hash(reconstructed):
-            raise ValidationError(f'source line does not match reconstruction\n\t[SOURCE] {self.raw_line.lstrip()}\n\t[PARSED] {str(self)}')
+            raise ValidationError(f'source line does not match reconstruction\n\t[SOURCE] {source}\n\t[PARSED] {reconstructed}')
         elif not SmaliCompare.whitespace_normalized_equals(self.raw_line, reconstructed):
-            warnings.warn(ValidationWarning(f'source line might not match reconstruction\n\t[SOURCE] {self.raw_line.lstrip()}\n\t[PARSED] {str(self)}'))
-        elif self.raw_line.lstrip() != reconstructed:
-            warnings.warn(WhitespaceWarning(f'source line has different whitespace\n\t[SOURCE] {self.raw_line.lstrip()}\n\t[PARSED] {str(self)}'))
+            warn(ValidationWarning(f'source line might not match reconstruction\n\t[SOURCE] {source}\n\t[PARSED] {reconstructed}'))
+        else:
+            warn(WhitespaceWarning(f'source line has different whitespace\n\t[SOURCE] {source}\n\t[PARSED] {reconstructed}'))
 
     @property
     def token(self) -> Optional[Type[Token]]:
@@ -182,60 +267,200 @@ StatementType = TypeVar('StatementType', bound=Statement)
 
 
 class BlankStatement(Statement):
+    __slots__ = ()
+    TOKENIZE = False
 
     def parse(self):
         self.attributes = StatementAttributes.SINGLE_LINE | StatementAttributes.NO_INDENT
-        self.finish_line()
 
     def __str__(self):
         return ''
 
 
 class CommentStatement(Statement):
+    __slots__ = ()
+    RETAIN_SOURCE = True
+    TOKENIZE = False
 
     def parse(self):
         self.attributes = StatementAttributes.SINGLE_LINE
-        self.finish_line()
 
     def __str__(self):
-        return self.raw_line.lstrip()
+        return f'{self.clean_line}{self.eol_comment}'
 
 
 class BlockStartStatement(Statement):
+    __slots__ = ()
+    RETAIN_SOURCE = True
+    TOKENIZE = False
 
     def parse(self):
         self.attributes = StatementAttributes.BLOCK_START
-        self.finish_line()
 
     @property
     def block_ends_with(self) -> Optional[Tuple[Type['Statement'], Optional[Modifiers]]]:
         return BlockEndStatement, None
 
     def __str__(self):
-        return f'{self.raw_line.lstrip()}{self.eol_comment}'
+        return f'{self.clean_line}{self.eol_comment}'
 
 
 class BlockEndStatement(Statement):
+    __slots__ = ()
+    TOKENIZE = False
 
     def parse(self):
         self.attributes = StatementAttributes.BLOCK_END
-        self.finish_line()
 
     def __str__(self):
         return f'}}{self.eol_comment}'
 
 
 class BodyStatement(Statement):
+    __slots__ = ()
+    RETAIN_SOURCE = True
+    TOKENIZE = False
 
     def parse(self):
         self.attributes = StatementAttributes.SINGLE_LINE
-        self.finish_line()
 
     def __str__(self):
         return f'{self.clean_line}{self.eol_comment}'
 
 
+class InstructionStatement(BodyStatement):
+    # A Dalvik instruction, its operands are parsed according to the format of the opcode. Lines that are not
+    #  written the way they are rendered are kept as `BodyStatement` instances, so the output is unchanged.
+    __slots__ = ('opcode', 'registers', 'label', 'literal', 'reference', 'prototype')
+    INTERNED = __slots__
+    RETAIN_SOURCE = False
+    TOKENIZE = False
+
+    RE_COMMENT_TOKENS = re.compile(r'#|["\\]')
+    LITERAL_SUFFIXES = 'tsLl'
+
+    opcode: str
+    # The first and last register of a register range
+    registers: Tuple[str, ...]
+    label: Optional[str]
+    literal: Optional[str]
+    reference: Optional[str]
+    prototype: Optional[str]
+
+    @property
+    def instruction_format(self) -> InstructionFormat:
+        return OPCODES[self.opcode]
+
+    @property
+    def literal_value(self) -> Optional[int]:
+        if self.literal is None:
+            return None
+        # Decimal literals can have leading zeros, `int(literal, 0)` rejects them
+        return int(IntLiteral(self.literal.rstrip(self.LITERAL_SUFFIXES)))
+
+    def parse_eol_comment(self):
+        # A '#' in a string literal does not start a comment
+        if '"' not in self.clean_line:
+            super().parse_eol_comment()
+            return
+        spans = LineTokenizer.unquoted_spans(self.clean_line, InstructionStatement.RE_COMMENT_TOKENS)
+        code = self.clean_line[:spans[-1][0]] if len(spans) > 0 else self.clean_line
+        code = code.rstrip()
+        _object_setattr(self, 'eol_comment', self.clean_line[len(code):])
+        _object_setattr(self, 'clean_line', code)
+
+    def parse(self):
+        # Every operand is split off exactly the way it is rendered, so the rendering matches the source line
+        self.attributes = StatementAttributes.SINGLE_LINE
+        opcode, _, operand_text = self.clean_line.partition(' ')
+        instruction_format = OPCODES.get(opcode)
+        if instruction_format is None:
+            raise ParseError(f'unknown opcode {opcode}')
+        operands = instruction_format.operands
+        registers = []
+        if instruction_format.register_list:
+            list_end = operand_text.find('}, ')
+            if not operand_text.startswith('{') or list_end == -1:
+                raise ParseError('instruction has no register list')
+            if list_end > 1:
+                registers.extend(operand_text[1:list_end].split(' .. ' if operands[0] is _REGISTER_RANGE else ', '))
+                if any(len(register) == 0 or ' ' in register for register in registers):
+                    raise ParseError('invalid register list')
+            operands = operands[1:]
+            # The call site of `invoke-custom` can contain commas, the prototype of `invoke-polymorphic` can not
+            parts = operand_text[list_end + 3:].rsplit(', ', len(operands) - 1)
+        elif len(operands) > 0:
+            parts = operand_text.split(', ', len(operands) - 1)
+        else:
+            parts = [] if len(operand_text) == 0 else [operand_text]
+        if len(parts) != len(operands):
+            raise ParseError(f'{opcode} expects {len(operands)} operands')
+        label = literal = reference = prototype = None
+        for operand, part in zip(operands, parts):
+            # Only references can contain spaces, within string literals or call sites
+            if len(part) == 0 or part[0] == ' ' or (operand is not _REFERENCE and ' ' in part):
+                raise ParseError(f'invalid {operand.value} operand {part!r}')
+            if operand is _REGISTER:
+                registers.append(part)
+            elif operand is _LABEL:
+                if part[0] != ':':
+                    raise ParseError(f'invalid label {part}')
+                label = part[1:]
+            elif operand is _LITERAL:
+                literal = part
+            elif reference is None:
+                reference = part
+            else:
+                prototype = part
+        _object_setattr(self, 'opcode', opcode)
+        _object_setattr(self, 'registers', tuple(registers))
+        _object_setattr(self, 'label', label)
+        _object_setattr(self, 'literal', literal)
+        _object_setattr(self, 'reference', reference)
+        _object_setattr(self, 'prototype', prototype)
+
+    def intern(self, intern: Callable[[str], str]):
+        # Most statements are instructions, the generic loop over `INTERNED` is unrolled
+        _object_setattr(self, 'opcode', intern(self.opcode))
+        _object_setattr(self, 'registers', tuple(map(intern, self.registers)))
+        if self.label is not None:
+            _object_setattr(self, 'label', intern(self.label))
+        if self.literal is not None:
+            _object_setattr(self, 'literal', intern(self.literal))
+        if self.reference is not None:
+            _object_setattr(self, 'reference', intern(self.reference))
+            if self.prototype is not None:
+                _object_setattr(self, 'prototype', intern(self.prototype))
+
+    def render(self) -> str:
+        instruction_format = OPCODES[self.opcode]
+        if len(instruction_format.operands) == 0:
+            return self.opcode
+        parts = []
+        registers = iter(self.registers)
+        references = iter((self.reference, self.prototype))
+        for operand in instruction_format.operands:
+            if operand is _REGISTER:
+                parts.append(next(registers))
+            elif operand is _REGISTER_LIST:
+                parts.append(f'{{{", ".join(self.registers)}}}')
+            elif operand is _REGISTER_RANGE:
+                parts.append(f'{{{" .. ".join(self.registers)}}}')
+            elif operand is _LABEL:
+                parts.append(f':{self.label}')
+            elif operand is _LITERAL:
+                parts.append(self.literal)
+            else:
+                parts.append(next(references))
+        return f'{self.opcode} {", ".join(parts)}'
+
+    def __str__(self):
+        return f'{self.render()}{self.eol_comment}'
+
+
 class AnnotationStatement(Statement):
+    __slots__ = ('class_descriptor',)
+    INTERNED = __slots__
     class_descriptor: str
 
     @property
@@ -255,6 +480,7 @@ class AnnotationStatement(Statement):
 
 
 class ArrayDataStatement(Statement):
+    __slots__ = ('element_width',)
     element_width: IntLiteral
 
     @property
@@ -274,6 +500,8 @@ class ArrayDataStatement(Statement):
 
 
 class CatchStatement(Statement):
+    __slots__ = ('type_descriptor', 'try_start_label', 'try_end_label', 'catch_label')
+    INTERNED = __slots__
     type_descriptor: str
     try_start_label: str
     try_end_label: str
@@ -296,6 +524,8 @@ class CatchStatement(Statement):
 
 
 class CatchAllStatement(Statement):
+    __slots__ = ('try_start_label', 'try_end_label', 'catch_label')
+    INTERNED = __slots__
     try_start_label: str
     try_end_label: str
     catch_label: str
@@ -316,6 +546,8 @@ class CatchAllStatement(Statement):
 
 
 class ClassStatement(Statement):
+    __slots__ = ('class_descriptor',)
+    INTERNED = __slots__
     class_descriptor: str
 
     @property
@@ -334,6 +566,7 @@ class ClassStatement(Statement):
 
 
 class EndStatement(Statement):
+    __slots__ = ('local_register',)
     local_register: Optional[str]
 
     @property
@@ -355,6 +588,8 @@ class EndStatement(Statement):
 
 
 class EnumStatement(Statement):
+    __slots__ = ('enum_directive', 'field_reference')
+    INTERNED = ('field_reference',)
     enum_directive: str
     field_reference: str
 
@@ -371,6 +606,8 @@ class EnumStatement(Statement):
 
 
 class FieldStatement(Statement):
+    __slots__ = ('member_name', 'type_descriptor')
+    INTERNED = __slots__
     member_name: str
     type_descriptor: str
 
@@ -396,6 +633,8 @@ class FieldStatement(Statement):
 
 
 class ImplementsStatement(Statement):
+    __slots__ = ('class_descriptor',)
+    INTERNED = __slots__
     class_descriptor: str
 
     @property
@@ -411,6 +650,7 @@ class ImplementsStatement(Statement):
 
 
 class LineStatement(Statement):
+    __slots__ = ('line_no',)
     line_no: IntLiteral
 
     @property
@@ -426,6 +666,8 @@ class LineStatement(Statement):
 
 
 class LocalStatement(Statement):
+    __slots__ = ('register', 'variable_name', 'variable_type_descriptor', 'literal')
+    INTERNED = ('register', 'variable_name', 'variable_type_descriptor')
     register: str
     variable_name: Optional[str]
     variable_type_descriptor: Optional[str]
@@ -460,6 +702,7 @@ class LocalStatement(Statement):
 
 
 class LocalsStatement(Statement):
+    __slots__ = ('local_count',)
     local_count: IntLiteral
 
     @property
@@ -475,6 +718,8 @@ class LocalsStatement(Statement):
 
 
 class MethodStatement(Statement):
+    __slots__ = ('member_name', 'method_params', 'method_result_type')
+    INTERNED = __slots__
     RE_METHOD_PROTOTYPE = re.compile(r'^\((.*)\)(.*)$')
     RE_METHOD = re.compile(r'^(.*?)\((.*)\)(.*)$')
     member_name: str
@@ -508,6 +753,7 @@ class MethodStatement(Statement):
 
 
 class PackedSwitchStatement(Statement):
+    __slots__ = ('switch_literal',)
     switch_literal: IntLiteral
 
     @property
@@ -527,6 +773,8 @@ class PackedSwitchStatement(Statement):
 
 
 class ParamStatement(Statement):
+    __slots__ = ('register', 'register_literal')
+    INTERNED = ('register',)
     register: str
     register_literal: Optional[str]
 
@@ -555,6 +803,7 @@ class ParamStatement(Statement):
 
 
 class PrologueStatement(Statement):
+    __slots__ = ()
 
     @property
     def token(self) -> Optional[Type[Token]]:
@@ -568,6 +817,7 @@ class PrologueStatement(Statement):
 
 
 class RegistersStatement(Statement):
+    __slots__ = ('register_count',)
     register_count: IntLiteral
 
     @property
@@ -583,6 +833,8 @@ class RegistersStatement(Statement):
 
 
 class RestartStatement(Statement):
+    __slots__ = ('register',)
+    INTERNED = __slots__
     register: str
 
     @property
@@ -598,6 +850,7 @@ class RestartStatement(Statement):
 
 
 class SourceStatement(Statement):
+    __slots__ = ('source_target',)
     source_target: str
 
     @property
@@ -613,6 +866,7 @@ class SourceStatement(Statement):
 
 
 class SparseSwitchStatement(Statement):
+    __slots__ = ()
 
     @property
     def token(self) -> Optional[Type[Token]]:
@@ -630,6 +884,8 @@ class SparseSwitchStatement(Statement):
 
 
 class SubannotationStatement(Statement):
+    __slots__ = ('class_descriptor',)
+    INTERNED = __slots__
     class_descriptor: str
 
     @property
@@ -649,6 +905,8 @@ class SubannotationStatement(Statement):
 
 
 class SuperStatement(Statement):
+    __slots__ = ('class_descriptor',)
+    INTERNED = __slots__
     class_descriptor: str
 
     @property
@@ -687,3 +945,13 @@ StatementTypes: Dict[Type[Token], Type[Statement]] = {
     Subannotation: SubannotationStatement,
     Super: SuperStatement
 }
+
+# Statements that can only appear at the class level, never inside of a method body
+CLASS_LEVEL_STATEMENT_TYPES: Tuple[Type[Statement], ...] = (
+    ClassStatement,
+    FieldStatement,
+    ImplementsStatement,
+    MethodStatement,
+    SourceStatement,
+    SuperStatement
+)
@@ -0,0 +1,160 @@
+import re
+from enum import Enum
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from smali.literals import StringLiteral
+from smali.project_index import ClassSource, ProjectIndex
+from smali.statements import InstructionStatement, Statement
+
+
+class StringKind(Enum):
+    CONST_STRING = 1
+    ANNOTATION = 2
+
+
+class FileStrings(NamedTuple):
+    class_descriptor: str
+    # Kind value, string value, method and line number of every string literal
+    strings: List[Tuple[int, str, Optional[str], int]]
+
+
+class StringReference(NamedTuple):
+    kind: StringKind
+    value: str
+    class_descriptor: str
+    # Name and prototype of the method, None for annotations outside of methods
+    method: Optional[str]
+    path: str
+    # Starting at 1
+    line: int
+
+
+class StringConstantIndex(ProjectIndex):
+    # The `const-string` values and annotation string values of every class in a project, with the method and line
+    #  they appear in. Every distinct value is stored once with its trigrams, substring searches only check the
+    #  values that contain all trigrams of the searched text. Values of removed files are kept.
+    NAME = 'strings'
+    SCHEMA_VERSION = 1
+    SCHEMA = '''
+        CREATE TABLE strings (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE string_trigrams (
+            trigram TEXT NOT NULL,
+            string_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, string_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE string_refs (
+            file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+            kind INTEGER NOT NULL,
+            string_id INTEGER NOT NULL,
+            class_descriptor TEXT NOT NULL,
+            method TEXT,
+            line INTEGER NOT NULL
+        );
+        CREATE INDEX string_refs_string_id ON string_refs (string_id);
+        CREATE INDEX string_refs_file_id ON string_refs (file_id);
+    '''
+
+    QUERY = '''
+        SELECT kind, strings.value, class_descriptor, method, path, line FROM string_refs
+        JOIN strings ON strings.id = string_refs.string_id
+        JOIN files ON files.id = string_refs.file_id
+    '''
+    ORDER = 'ORDER BY path, line'
+
+    CONST_STRING_OPCODES = ('const-string', 'const-string/jumbo')
+    ANNOTATION_START = ('.annotation ', '.subannotation ')
+    ANNOTATION_END = ('.end annotation', '.end subannotation')
+    RE_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+    TRIGRAM_SIZE = 3
+
+    @staticmethod
+    def extract(file_path: str) -> FileStrings:
+        # Only the class, method and `const-string` lines are parsed, annotation values are found in the lines of
+        #  annotation blocks
+        source = ClassSource(file_path)
+        annotation_level = 0
+        strings = []
+        for line_number, line in source:
+            if line.startswith(StringConstantIndex.CONST_STRING_OPCODES):
+                statement = Statement.parse_line(line)[0]
+                if isinstance(statement, InstructionStatement):
+                    strings.append((StringKind.CONST_STRING.value, StringLiteral.unquote(statement.reference), source.method, line_number))
+            elif line.startswith(StringConstantIndex.ANNOTATION_START):
+                annotation_level += 1
+            elif line.startswith(StringConstantIndex.ANNOTATION_END):
+                annotation_level -= 1
+            elif annotation_level > 0:
+                for literal in StringConstantIndex.RE_STRING.findall(line):
+                    strings.append((StringKind.ANNOTATION.value, StringLiteral.unquote(literal), source.method, line_number))
+        return FileStrings(source.declared_class(), strings)
+
+    @staticmethod
+    def trigrams(value: str) -> Set[str]:
+        size = StringConstantIndex.TRIGRAM_SIZE
+        return {value[idx:idx + size] for idx in range(len(value) - size + 1)}
+
+    def insert_value(self, table: str, value: str) -> int:
+        # New strings are inserted with their trigrams
+        value_id = super().insert_value(table, value)
+        if table == 'strings':
+            self.connection.executemany('INSERT INTO string_trigrams (trigram, string_id) VALUES (?, ?)',
+                                        [(trigram, value_id) for trigram in self.trigrams(value)])
+        return value_id
+
+    def string_id(self, value: str) -> int:
+        return self.value_id('strings', value)
+
+    def store(self, file_id: int, data: FileStrings):
+        self.connection.executemany(
+            'INSERT INTO string_refs (file_id, kind, string_id, class_descriptor, method, line) VALUES (?, ?, ?, ?, ?, ?)',
+            [(file_id, kind, self.string_id(value), data.class_descriptor, method, line) for kind, value, method, line in data.strings]
+        )
+
+    @staticmethod
+    def prefix_end(prefix: str) -> Optional[str]:
+        # The smallest text after all texts starting with the prefix, text is compared by code points. The last
+        #  code point U+10FFFF can not be incremented, the surrogates can not be stored and are skipped. None if no
+        #  text is after the prefix.
+        prefix = prefix.rstrip('\U0010ffff')
+        if len(prefix) == 0:
+            return None
+        code_point = ord(prefix[-1]) + 1
+        return f'{prefix[:-1]}{chr(0xe000 if code_point == 0xd800 else code_point)}'
+
+    def substring_condition(self, substring: str) -> Tuple[str, List[str]]:
+        # Texts shorter than a trigram are searched in all values
+        trigrams = sorted(self.trigrams(substring))
+        if len(trigrams) == 0:
+            return 'instr(strings.value, ?) > 0', [substring]
+        condition = f'''strings.id IN (
+            SELECT string_id FROM string_trigrams WHERE trigram IN ({", ".join("?" * len(trigrams))})
+            GROUP BY string_id HAVING COUNT(*) = {len(trigrams)}
+        ) AND instr(strings.value, ?) > 0'''
+        return condition, [*trigrams, substring]
+
+    def search(self, condition: str, parameters: List[str]) -> List[StringReference]:
+        rows = self.connection.execute(f'{self.QUERY} WHERE {condition} {self.ORDER}', parameters)
+        return [StringReference(StringKind(kind), value, class_descriptor, method, self.absolute_path(path), line)
+                for kind, value, class_descriptor, method, path, line in rows]
+
+    def find(self, value: str) -> List[StringReference]:
+        return self.search('strings.value = ?', [value])
+
+    def find_prefix(self, prefix: str) -> List[StringReference]:
+        prefix_end = self.prefix_end(prefix)
+        if prefix_end is None:
+            return self.search('strings.value >= ?', [prefix])
+        return self.search('strings.value >= ? AND strings.value < ?', [prefix, prefix_end])
+
+    def find_substring(self, substring: str) -> List[StringReference]:
+        return self.search(*self.substring_condition(substring))
+
+    def values_containing(self, substring: str) -> List[str]:
+        # Distinct values without their locations
+        condition, parameters = self.substring_condition(substring)
+        return [value for value, in self.connection.execute(
+            f'SELECT value FROM strings WHERE {condition} AND EXISTS (SELECT 1 FROM string_refs WHERE string_id = strings.id) ORDER BY value', parameters
+        )]
@@ -0,0 +1,207 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tarfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from smali import SmaliFile
+from smali.statements import InstructionStatement, MethodStatement
+
+ARCHIVE_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'tests.tar.xz')
+
+# Name and source of every corpus file
+Corpus = List[Tuple[str, str]]
+
+
+def load_corpus(names: Optional[Set[str]] = None) -> Corpus:
+    # Decoded like the round trip tests, with universal newlines
+    result = []
+    with tarfile.open(ARCHIVE_PATH) as archive:
+        for file in archive:
+            if names is not None and file.name not in names:
+                continue
+            with io.TextIOWrapper(archive.extractfile(file)) as f:
+                result.append((file.name, f.read()))
+    return result
+
+
+def peak_rss_mb() -> Optional[float]:
+    # The peak resident set size of this process so far, kilobytes on Linux and bytes on macOS
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def parse_all(corpus: Corpus) -> List[SmaliFile]:
+    return [SmaliFile(smali_code) for _, smali_code in corpus]
+
+
+def unparse_all(smali_files: List[SmaliFile]):
+    # Rendered from the statements, the unmodified source is not reused
+    for smali_file in smali_files:
+        '\n'.join(smali_file.iter_lines(reuse_source=False))
+
+
+def find_all(smali_files: List[SmaliFile]):
+    for smali_file in smali_files:
+        smali_file.find(MethodStatement, member_name='<init>')
+        smali_file.root.find(InstructionStatement, opcode='return-void')
+
+
+def validate_all(smali_files: List[SmaliFile]):
+    for smali_file in smali_files:
+        smali_file.check_reconstruction()
+
+
+# Every phase but parsing runs on files that were parsed before the timing starts
+PHASES: Dict[str, Callable] = {
+    'parse': parse_all,
+    'unparse': unparse_all,
+    'find': find_all,
+    'validate': validate_all,
+}
+
+
+def phase_alloc_mb(phase: str, argument) -> float:
+    # The peak of the memory allocated while the phase runs, without the files parsed before it. Measured in a
+    #  separate run, tracing the allocations slows the phase down.
+    tracemalloc.start()
+    try:
+        PHASES[phase](argument)
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def run_phase(phase: str, names: Optional[Set[str]], repeat: int) -> Dict[str, Optional[float]]:
+    # Runs in a fresh process per phase. The peak RSS of the phases after parsing includes the parsed files, the
+    #  peak allocation only counts the phase itself.
+    corpus = load_corpus(names)
+    argument = corpus if phase == 'parse' else parse_all(corpus)
+    rss_before = peak_rss_mb()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        PHASES[phase](argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    file_count = len(corpus)
+    line_count = sum(smali_code.count('\n') + 1 for _, smali_code in corpus)
+    byte_count = sum(len(smali_code.encode()) for _, smali_code in corpus)
+    rss_after = peak_rss_mb()
+    # After the peak RSS, tracing the allocations has a memory overhead of its own
+    peak_alloc = phase_alloc_mb(phase, argument)
+    return {
+        'seconds': best,
+        'files_per_s': file_count / best,
+        'lines_per_s': line_count / best,
+        'mb_per_s': byte_count / 1024 ** 2 / best,
+        'peak_rss_mb': rss_after,
+        'rss_increase_mb': None if rss_after is None or rss_before is None else rss_after - rss_before,
+        'peak_alloc_mb': peak_alloc,
+    }
+
+
+def slowest_files(corpus: Corpus, count: int) -> Set[str]:
+    timings = []
+    for name, smali_code in corpus:
+        start = time.perf_counter()
+        SmaliFile(smali_code)
+        timings.append((time.perf_counter() - start, name))
+    timings.sort(reverse=True)
+    return {name for _, name in timings[:count]}
+
+
+def benchmark(phases: Sequence[str], names: Optional[Set[str]] = None, repeat: int = 1) -> Dict:
+    corpus = load_corpus(names)
+    results = {
+        'version': SmaliFile.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'files': len(corpus),
+        'lines': sum(smali_code.count('\n') + 1 for _, smali_code in corpus),
+        'megabytes': sum(len(smali_code.encode()) for _, smali_code in corpus) / 1024 ** 2,
+        # The selected files, when not using the whole corpus
+        'names': None if names is None else sorted(names),
+        'phases': {},
+    }
+    del corpus
+    context = multiprocessing.get_context('spawn')
+    for phase in phases:
+        with context.Pool(1) as pool:
+            results['phases'][phase] = pool.apply(run_phase, (phase, names, repeat))
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    # Throughput lower or peak allocation of the phase higher than the baseline by more than the threshold are
+    #  regressions. The peak RSS is not compared, it is dominated by parsing in every phase.
+    regressions = []
+    for phase, current in results['phases'].items():
+        previous = baseline.get('phases', {}).get(phase)
+        if previous is None:
+            continue
+        if current['files_per_s'] < previous['files_per_s'] * (1 - threshold):
+            regressions.append(f'{phase}: {current["files_per_s"]:,.0f} files/s, baseline {previous["files_per_s"]:,.0f} files/s')
+        if previous.get('peak_alloc_mb') is not None and current['peak_alloc_mb'] > previous['peak_alloc_mb'] * (1 + threshold):
+            regressions.append(f'{phase}: {current["peak_alloc_mb"]:,.1f}MB peak allocation, baseline {previous["peak_alloc_mb"]:,.1f}MB')
+    return regressions
+
+
+def print_results(results: Dict):
+    print(f'{results["files"]} files, {results["lines"]:,} lines, {results["megabytes"]:.1f}MB, PySmali {results["version"]}, Python {results["python"]}')
+    print(f'\t{"phase":<10} {"seconds":>8} {"files/s":>10} {"lines/s":>12} {"MB/s":>8} {"peak RSS":>10} {"phase alloc":>12}')
+    for phase, result in results['phases'].items():
+        peak_rss = 'n/a' if result['peak_rss_mb'] is None else f'{result["peak_rss_mb"]:.1f}MB'
+        peak_alloc = f'{result["peak_alloc_mb"]:.1f}MB'
+        print(f'\t{phase:<10} {result["seconds"]:8.3f} {result["files_per_s"]:10,.0f} {result["lines_per_s"]:12,.0f} {result["mb_per_s"]:8.2f} {peak_rss:>10} {peak_alloc:>12}')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks parsing, unparsing, searching and validating the tests.tar.xz corpus')
+    parser.add_argument('--phase', action='append', choices=list(PHASES), help='phases to run, all by default')
+    parser.add_argument('--slowest', type=int, help='only use the N files that take longest to parse')
+    parser.add_argument('--repeat', type=int, default=1, help='repetitions of every phase, the fastest is reported')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative regression against the baseline')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    names = None
+    if baseline is not None and baseline.get('names') is not None:
+        # Compared on the same files, the slowest files can differ between runs
+        names = set(baseline['names'])
+    elif args.slowest is not None:
+        names = slowest_files(load_corpus(), args.slowest)
+    results = benchmark(args.phase or list(PHASES), names, max(1, args.repeat))
+    print_results(results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'[REGRESSION] {regression}')
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+import tarfile
+import time
+from typing import Callable, List, Optional, Type
+
+from smali.modifiers import Modifiers
+from smali.statements import Statement
+
+
+def reference_str(modifiers: Modifiers) -> str:
+    # The rendering before the lookup tables
+    if modifiers.name and '|' not in modifiers.name:
+        return modifiers.name.lower().replace('_', '-')
+    result = []
+    for c in modifiers.__class__:
+        if c.value & modifiers.value == c.value:
+            result.append(c.name.lower().replace('_', '-'))
+    return ' '.join(result)
+
+
+def reference_find(modifiers_type: Type[Modifiers], modifier_tag: str) -> Optional[Modifiers]:
+    for c in modifiers_type:
+        if reference_str(c) == modifier_tag:
+            return c
+    return None
+
+
+def member_lines() -> List[str]:
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    result = []
+    with tarfile.open(os.path.join(cwd, 'tests.tar.xz')) as archive:
+        for file in archive:
+            for line in archive.extractfile(file).read().decode().splitlines():
+                line = line.strip()
+                if line.startswith(('.method ', '.field ', '.class ')):
+                    result.append(line)
+    return result
+
+
+def measure(name: str, count: int, func: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f'\t{name:<10} {elapsed:8.3f}s {count / elapsed:12,.0f} ops/s')
+    return elapsed
+
+
+def compare(title: str, count: int, reference: Callable[[], None], current: Callable[[], None]):
+    print(f'{title}, {count} operations')
+    reference_time = measure('reference', count, reference)
+    current_time = measure('tables', count, current)
+    print(f'\tspeedup    {reference_time / current_time:8.2f}x')
+
+
+def main():
+    lines = member_lines()
+    statements = [Statement.parse_line(line)[0] for line in lines]
+    lookups = []
+    for line, statement in zip(lines, statements):
+        if statement.token.AVAILABLE_MODIFIERS is not None:
+            # Every token after the directive is looked up until the first one that is not a modifier
+            for part in line.split(' ')[1:]:
+                lookups.append((statement.token.AVAILABLE_MODIFIERS, part))
+                if statement.token.AVAILABLE_MODIFIERS.find(part) is None:
+                    break
+    modifiers = [statement.modifiers for statement in statements if statement.modifiers is not None]
+    assert all(reference_find(modifiers_type, tag) == modifiers_type.find(tag) for modifiers_type, tag in lookups)
+    assert all(reference_str(value) == str(value) for value in modifiers)
+
+    print(f'tests.tar.xz, {len(lines)} .class/.method/.field lines')
+    compare('modifier lookup (parse)', len(lookups),
+            lambda: [reference_find(modifiers_type, tag) for modifiers_type, tag in lookups],
+            lambda: [modifiers_type.find(tag) for modifiers_type, tag in lookups])
+    compare('modifier rendering (unparse)', len(modifiers),
+            lambda: [reference_str(value) for value in modifiers],
+            lambda: [str(value) for value in modifiers])
+
+    start = time.perf_counter()
+    for line in lines:
+        str(Statement.parse_line(line)[0])
+    elapsed = time.perf_counter() - start
+    print(f'parse and unparse of the member lines\n\t{"tables":<10} {elapsed:8.3f}s {len(lines) / elapsed:12,.0f} lines/s')
+
+
+if __name__ == '__main__':
+    main()
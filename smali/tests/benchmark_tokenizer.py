@@ -0,0 +1,76 @@
+import os
+import random
+import re
+import tarfile
+import time
+from typing import Callable, List
+
+from smali.lib.line_tokenizer import LineTokenizer
+
+RE_SPACE_SPLIT = re.compile(r' +(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
+RE_ASSIGNMENT_SPLIT = re.compile(r'=(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
+
+
+def regex_tokenize(line: str):
+    if RE_ASSIGNMENT_SPLIT.search(line) is not None:
+        RE_ASSIGNMENT_SPLIT.split(line, maxsplit=1)
+    return RE_SPACE_SPLIT.split(line)
+
+
+def tokenizer_tokenize(line: str):
+    LineTokenizer.split_assignment(line)
+    return LineTokenizer.split_spaces(line)
+
+
+def obfuscated_lines(count: int, length: int) -> List[str]:
+    # Generated string decryption tables: long literals full of spaces, escapes and `=`
+    rng = random.Random(0)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789    ==\\"'
+    result = []
+    for idx in range(count):
+        value = ''.join(rng.choice(alphabet) for _ in range(length))
+        value = value.replace('\\', '\\\\').replace('"', '\\"')
+        result.append(f'const-string v{idx % 16}, "{value}"')
+    return result
+
+
+def corpus_lines() -> List[str]:
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    result = []
+    with tarfile.open(os.path.join(cwd, 'tests.tar.xz')) as archive:
+        for file in archive:
+            for line in archive.extractfile(file).read().decode().splitlines():
+                line = line.strip()
+                if '"' in line:
+                    result.append(line)
+    return result
+
+
+def measure(name: str, lines: List[str], tokenize: Callable[[str], List[str]]) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        tokenize(line)
+    elapsed = time.perf_counter() - start
+    print(f'\t{name:<10} {elapsed:8.3f}s {len(lines) / elapsed:12,.0f} lines/s')
+    return elapsed
+
+
+def main():
+    for length in (64, 512, 2048):
+        lines = obfuscated_lines(2000, length)
+        assert all(regex_tokenize(line) == tokenizer_tokenize(line) for line in lines)
+        print(f'obfuscated const-string, {len(lines)} lines of {length} chars')
+        regex_time = measure('regex', lines, regex_tokenize)
+        tokenizer_time = measure('tokenizer', lines, tokenizer_tokenize)
+        print(f'\tspeedup    {regex_time / tokenizer_time:8.2f}x')
+
+    lines = corpus_lines()
+    assert all(regex_tokenize(line) == tokenizer_tokenize(line) for line in lines)
+    print(f'tests.tar.xz, {len(lines)} lines containing quotes')
+    regex_time = measure('regex', lines, regex_tokenize)
+    tokenizer_time = measure('tokenizer', lines, tokenizer_tokenize)
+    print(f'\tspeedup    {regex_time / tokenizer_time:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
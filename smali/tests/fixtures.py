@@ -0,0 +1,65 @@
+import os
+import tarfile
+import tempfile
+from typing import Dict, List, Sequence
+
+TESTS_ARCHIVE = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'tests.tar.xz')
+
+
+class ArchiveFixture:
+    # Extracts the first `FILE_COUNT` files of `tests.tar.xz` into a temporary directory, mixed into a TestCase
+    FILE_COUNT: int = 8
+    # The archive has CRLF line endings, these can be translated like a text mode open does
+    TRANSLATE_NEWLINES: bool = False
+
+    temp_dir: tempfile.TemporaryDirectory
+    file_paths: List[str]
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_paths = []
+        with tarfile.open(TESTS_ARCHIVE) as archive:
+            for idx, file in enumerate(archive.getmembers()[:self.FILE_COUNT]):
+                file_path = os.path.join(self.temp_dir.name, self.archive_path(idx, file.name))
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                data = archive.extractfile(file).read()
+                if self.TRANSLATE_NEWLINES:
+                    data = data.replace(b'\r\n', b'\n')
+                with open(file_path, 'wb') as f:
+                    f.write(data)
+                self.file_paths.append(file_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def archive_path(self, idx: int, file_name: str) -> str:
+        # The path of an extracted file relative to the temporary directory
+        return file_name
+
+
+class ProjectFixture:
+    # Writes the classes of `CLASSES` as the smali files of a project in a temporary directory, next to the
+    #  database of an index, mixed into a TestCase
+    CLASSES: Dict[str, Sequence[str]] = {}
+    DB_NAME: str = 'index.sqlite'
+
+    temp_dir: tempfile.TemporaryDirectory
+    db_path: str
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, self.DB_NAME)
+        os.makedirs(self.root_path)
+        for class_descriptor, lines in self.CLASSES.items():
+            self.write_class(class_descriptor, lines)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @property
+    def root_path(self) -> str:
+        return os.path.join(self.temp_dir.name, 'smali')
+
+    def write_class(self, class_descriptor: str, lines: Sequence[str]):
+        with open(os.path.join(self.root_path, f'{class_descriptor[1:-1]}.smali'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join([*lines, '']))
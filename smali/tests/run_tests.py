@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from smali import SmaliFile, SmaliProject
+from smali.exceptions import ValidationError
+from smali.parse_options import ParseOptions
+
+ARCHIVE_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'tests.tar.xz')
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), 'pysmali-tests')
+MANIFEST_FILE = 'manifest.json'
+RESULTS_FILE = 'results.json'
+FILES_DIR = 'files'
+
+PASS = '[PASS]'
+WARNING = '[WARNING]'
+FAIL = '[FAIL]'
+FATAL = '[FATAL]'
+STATUSES = (PASS, WARNING, FAIL, FATAL)
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_json(file_path: str) -> Optional[Dict]:
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(file_path: str, data: Dict):
+    # Written next to the target and renamed, an interrupted run does not leave a partial file
+    temp_path = f'{file_path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(temp_path, file_path)
+
+
+def extract(archive_path: str, work_dir: str, force: bool = False) -> Dict[str, str]:
+    # The archive is only extracted again when it changed, returns the `real_path` of every file by name
+    archive_hash = hash_file(archive_path)
+    manifest_path = os.path.join(work_dir, MANIFEST_FILE)
+    manifest = read_json(manifest_path)
+    if not force and manifest is not None and manifest.get('archive_hash') == archive_hash:
+        return manifest['real_paths']
+    files_dir = os.path.join(work_dir, FILES_DIR)
+    os.makedirs(files_dir, exist_ok=True)
+    real_paths = {}
+    with tarfile.open(archive_path) as archive:
+        for file in archive:
+            real_paths[file.name] = file.pax_headers.get('real_path', file.name)
+            with open(os.path.join(files_dir, file.name), 'wb') as f:
+                f.write(archive.extractfile(file).read())
+    for name in os.listdir(files_dir):
+        if name not in real_paths:
+            os.remove(os.path.join(files_dir, name))
+    write_json(manifest_path, {'archive_hash': archive_hash, 'real_paths': real_paths})
+    return real_paths
+
+
+def check_file(file_path: str) -> Tuple[str, Optional[str]]:
+    # Round trips a file with every statement validated, like `TestSmaliFiles.test_parsing`
+    caught = []
+    try:
+        smali_file = SmaliFile.parse_file(file_path, options=ParseOptions(validate_statements=True, on_warning=caught.append))
+    except ValidationError as e:
+        return FAIL, str(e)
+    except Exception as e:
+        return FATAL, f'{type(e).__name__}: {e}'
+    error = smali_file.check_reconstruction()
+    if isinstance(error, ValidationError):
+        return FAIL, str(error)
+    if error is not None or len(caught) > 0:
+        return WARNING, '\n'.join(map(str, ([error] if error is not None else []) + caught))
+    return PASS, None
+
+
+def file_state(file_path: str) -> Tuple[int, int]:
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def select(names: Sequence[str], files_dir: str, results: Dict[str, Dict], failed: bool, changed: bool) -> List[str]:
+    # Without a filter every file is checked. Changed files are files without a result or modified since their
+    #  result, failed files are files whose last result was not a pass.
+    if not failed and not changed:
+        return list(names)
+    selected = []
+    for name in names:
+        result = results.get(name)
+        if changed and (result is None or tuple(result['state']) != file_state(os.path.join(files_dir, name))):
+            selected.append(name)
+        elif failed and result is not None and result['status'] != PASS:
+            selected.append(name)
+    return selected
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Round trips the files of tests.tar.xz across a process pool')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR, help='where the archive is extracted and the results are kept')
+    parser.add_argument('--extract', action='store_true', help='extract the archive again, reverting changes to the extracted files')
+    parser.add_argument('--workers', type=int, help='worker processes, one per CPU by default')
+    parser.add_argument('--threads', action='store_true', help='use worker threads instead of processes, for free-threaded builds of Python')
+    parser.add_argument('--failed', action='store_true', help='only check the files that did not pass on the last run')
+    parser.add_argument('--changed', action='store_true', help='only check new files and files modified since the last run')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    real_paths = extract(ARCHIVE_PATH, args.work_dir, args.extract)
+    files_dir = os.path.join(args.work_dir, FILES_DIR)
+    results_path = os.path.join(args.work_dir, RESULTS_FILE)
+    # Results of files that are no longer in the archive are dropped
+    results = {name: result for name, result in (read_json(results_path) or {}).items() if name in real_paths}
+    names = select(sorted(real_paths), files_dir, results, args.failed, args.changed)
+    print(f'Checking {len(names)} of {len(real_paths)} files, extracted to {files_dir}')
+
+    counts = dict.fromkeys(STATUSES, 0)
+    project = SmaliProject(files_dir, max_workers=args.workers, threads=args.threads)
+    for file_path, result, error in project.map(check_file, [os.path.join(files_dir, name) for name in names]):
+        name = os.path.basename(file_path)
+        status, message = result if error is None else (FATAL, f'{type(error).__name__}: {error}')
+        counts[status] += 1
+        results[name] = {'status': status, 'state': file_state(file_path)}
+        if status != PASS:
+            print(f'{status} {real_paths[name]} ({name})')
+            print(f'\t{message}'.replace('\n', '\n\t'))
+    write_json(results_path, results)
+
+    print(', '.join(f'{count} {status}' for status, count in counts.items()) + f' in {time.perf_counter() - start:.1f}s')
+    return 0 if counts[PASS] == len(names) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import pickle
+import random
+import unittest
+
+from smali.lib.aho_corasick import AhoCorasick
+
+
+class TestAhoCorasick(unittest.TestCase):
+    @staticmethod
+    def naive_matches(patterns, text):
+        return sorted((start + len(pattern), idx) for idx, pattern in enumerate(patterns)
+                      for start in range(len(text)) if text.startswith(pattern, start))
+
+    def test_overlapping(self):
+        patterns = ['he', 'she', 'his', 'hers', 'e']
+        automaton = AhoCorasick((pattern, idx) for idx, pattern in enumerate(patterns))
+        self.assertEqual(self.naive_matches(patterns, 'ushers'), sorted(automaton.iter_matches('ushers')))
+        self.assertEqual({0, 1, 3, 4}, automaton.find_values('ushers'))
+        self.assertEqual(set(), automaton.find_values('xyz'))
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            patterns = [''.join(rng.choice('ab') for _ in range(rng.randint(1, 4))) for _ in range(5)]
+            text = ''.join(rng.choice('abc') for _ in range(40))
+            automaton = AhoCorasick((pattern, idx) for idx, pattern in enumerate(patterns))
+            self.assertEqual(self.naive_matches(patterns, text), sorted(automaton.iter_matches(text)), (patterns, text))
+            automaton = pickle.loads(pickle.dumps(automaton))
+            self.assertEqual({idx for _, idx in self.naive_matches(patterns, text)}, automaton.find_values(text))
+
+    def test_empty_pattern(self):
+        with self.assertRaises(ValueError):
+            AhoCorasick([('', 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
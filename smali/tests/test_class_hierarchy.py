@@ -0,0 +1,77 @@
+import os
+import unittest
+
+from smali import ClassHierarchyIndex
+from smali.modifiers import ClassModifiers
+from smali.tests.fixtures import ProjectFixture
+
+
+class TestClassHierarchyIndex(ProjectFixture, unittest.TestCase):
+    DB_NAME = 'hierarchy.sqlite'
+
+    CLASSES = {
+        'LBase;': ('.class public abstract LBase;', '.super Ljava/lang/Object;'),
+        'LChild;': ('.class public LChild;', '.super LBase;'),
+        'LGrandChild;': ('.class public final LGrandChild;', '.super LChild;'),
+        'LListener;': ('.class public interface abstract LListener;', '.super Ljava/lang/Object;'),
+        'LClickListener;': ('.class public interface abstract LClickListener;', '.super Ljava/lang/Object;', '.implements LListener;'),
+        'LHandler;': ('.class public LHandler;', '.super LBase;', '.source "Handler.java"', '', '# interfaces', '.implements LClickListener;'),
+        'LSubHandler;': ('.class public LSubHandler;', '.super LHandler;'),
+    }
+
+    def write_class(self, class_descriptor: str, lines):
+        # Every class has a member after its header, the header extraction stops there
+        super().write_class(class_descriptor, [*lines, '', '.method public run()V', '    .registers 1', '    return-void', '.end method'])
+
+    def test_queries(self):
+        with ClassHierarchyIndex.open(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertEqual(len(self.CLASSES), len(index))
+            self.assertListEqual(sorted(self.CLASSES), index.classes())
+            header = index.get('LHandler;')
+            self.assertEqual('LBase;', header.super_descriptor)
+            self.assertTupleEqual(('LClickListener;',), header.interfaces)
+            self.assertEqual(ClassModifiers.PUBLIC, header.modifiers)
+            self.assertEqual(ClassModifiers.PUBLIC | ClassModifiers.FINAL, index.get('LGrandChild;').modifiers)
+            self.assertIsNone(index.get('LMissing;'))
+            self.assertTrue(index.path('LSubHandler;').endswith('SubHandler.smali'))
+
+            self.assertListEqual(['LChild;', 'LHandler;'], index.subclasses('LBase;'))
+            self.assertListEqual(['LChild;', 'LGrandChild;', 'LHandler;', 'LSubHandler;'], index.subclasses('LBase;', transitive=True))
+            self.assertListEqual(['LClickListener;'], index.implementors('LListener;'))
+            self.assertListEqual(['LClickListener;', 'LHandler;', 'LSubHandler;'], index.implementors('LListener;', transitive=True))
+            self.assertListEqual(['LHandler;', 'LBase;', 'Ljava/lang/Object;'], index.superclasses('LSubHandler;'))
+            self.assertListEqual([], index.interfaces('LSubHandler;'))
+            self.assertListEqual(['LClickListener;', 'LListener;'], index.interfaces('LSubHandler;', transitive=True))
+            self.assertTrue(index.is_subtype('LSubHandler;', 'LListener;'))
+            self.assertFalse(index.is_subtype('LChild;', 'LListener;'))
+
+    def test_incremental_refresh(self):
+        with ClassHierarchyIndex.open(self.db_path, self.root_path, max_workers=1):
+            pass
+        with ClassHierarchyIndex(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertTupleEqual((0, 0, 0, len(self.CLASSES), 0), index.refresh())
+
+            # Touched without changes is not extracted again
+            child_path = index.path('LChild;')
+            stat = os.stat(child_path)
+            os.utime(child_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.write_class('LGrandChild;', ('.class public final LGrandChild;', '.super LBase;'))
+            os.remove(index.path('LSubHandler;'))
+            self.write_class('LNew;', ('.class public LNew;', '.super LChild;'))
+            with open(os.path.join(self.root_path, 'broken.smali'), 'w') as f:
+                f.write('.super LBase;\n')
+
+            self.assertTupleEqual((2, 1, 1, len(self.CLASSES) - 2, 1), index.refresh())
+            self.assertListEqual(['LChild;', 'LGrandChild;', 'LHandler;'], index.subclasses('LBase;'))
+            self.assertListEqual(['LNew;'], index.subclasses('LChild;'))
+            self.assertIsNone(index.get('LSubHandler;'))
+            self.assertListEqual([os.path.join(self.root_path, 'broken.smali')], list(index.errors()))
+            self.assertTupleEqual((0, 0, 0, len(self.CLASSES) + 1, 0), index.refresh())
+
+    def test_parallel(self):
+        with ClassHierarchyIndex.open(self.db_path, self.root_path, max_workers=2, chunk_size=2) as index:
+            self.assertListEqual(['LClickListener;', 'LHandler;', 'LSubHandler;'], index.implementors('LListener;', transitive=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import pickle
+import unittest
+
+from smali import SmaliFile
+from smali.opcodes import FORMAT_35C, OPCODES
+from smali.statements import BodyStatement, InstructionStatement, Statement
+
+
+class TestInstructions(unittest.TestCase):
+    def parse(self, line: str) -> Statement:
+        statements = Statement.parse_line(line)
+        self.assertEqual(1, len(statements))
+        self.assertEqual(line.strip(), str(statements[0]))
+        return statements[0]
+
+    def test_operands(self):
+        statement = self.parse('    invoke-virtual {p0, p1}, Lcom/example/A;->run(I)V')
+        self.assertIsInstance(statement, InstructionStatement)
+        self.assertIs(FORMAT_35C, statement.instruction_format)
+        self.assertEqual(('invoke-virtual', ('p0', 'p1'), 'Lcom/example/A;->run(I)V'), (statement.opcode, statement.registers, statement.reference))
+
+        statement = self.parse('invoke-static/range {v0 .. v5}, Lcom/example/A;->run(IIIIII)V')
+        self.assertEqual(('v0', 'v5'), statement.registers)
+        statement = self.parse('if-ne v0, v1, :cond_0')
+        self.assertEqual((('v0', 'v1'), 'cond_0'), (statement.registers, statement.label))
+        statement = self.parse('const-wide v0, -0x8000000000000000L')
+        self.assertEqual(-0x8000000000000000, statement.literal_value)
+        self.assertEqual((0, 10, -0x1f), tuple(self.parse(line).literal_value for line in ('const/4 v0, 00', 'const/16 v0, 010s', 'const/16 v0, -0x1F')))
+        statement = self.parse('invoke-polymorphic {p1, v0}, Ljava/lang/invoke/MethodHandle;->invoke([Ljava/lang/Object;)Ljava/lang/Object;, (I)V')
+        self.assertEqual(('Ljava/lang/invoke/MethodHandle;->invoke([Ljava/lang/Object;)Ljava/lang/Object;', '(I)V'), (statement.reference, statement.prototype))
+        statement = self.parse('invoke-custom {}, call_site_0("run", ()V, "a, b")@Lcom/example/A;->bootstrap()Ljava/lang/invoke/CallSite;')
+        self.assertEqual((), statement.registers)
+        self.assertEqual('call_site_0("run", ()V, "a, b")@Lcom/example/A;->bootstrap()Ljava/lang/invoke/CallSite;', statement.reference)
+        self.assertEqual('return-void', self.parse('return-void').opcode)
+
+    def test_comments(self):
+        statement = self.parse('const-string v0, "a # b, c"    # comment')
+        self.assertEqual('"a # b, c"', statement.reference)
+        self.assertEqual('    # comment', statement.eol_comment)
+        self.assertEqual('v0', self.parse('move-result v0 # comment').registers[0])
+
+    def test_fallback(self):
+        # Lines that are not written the way they are rendered stay body statements
+        for line in ('const/4  v0, 0x1', 'const/4 v0,1', 'invoke-virtual { p0}, La;->a()V', 'return-void v0', 'goto cond_0', ':cond_0', '0x1t'):
+            statement = self.parse(line)
+            self.assertNotIsInstance(statement, InstructionStatement)
+            self.assertIsInstance(statement, BodyStatement)
+
+    def test_round_trip(self):
+        # One instruction of every opcode with the operands its format expects
+        operand_values = {'register': 'v0', 'register list': '{v0, v1}', 'register range': '{v0 .. v1}', 'label': ':label_0',
+                          'literal': '0x1', 'reference': 'La;->b:I'}
+        for opcode, instruction_format in OPCODES.items():
+            operands = ', '.join(operand_values[operand.value] for operand in instruction_format.operands)
+            statement = self.parse(f'{opcode} {operands}' if operands else opcode)
+            self.assertIsInstance(statement, InstructionStatement, opcode)
+            self.assertEqual(str(statement), str(pickle.loads(pickle.dumps(statement))))
+
+    def test_modification(self):
+        smali_file = SmaliFile('.class public LA;\n.super Ljava/lang/Object;\n\n.method public a()V\n    .registers 2\n\n'
+                               '    const/4 v0, 0x1\n\n    return-void\n.end method\n')
+        instruction = next(statement for statement in smali_file.root.iter_statements() if isinstance(statement, InstructionStatement))
+        instruction.registers = ('v1',)
+        instruction.literal = '0x2'
+        self.assertIn('    const/4 v1, 0x2\n', str(smali_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
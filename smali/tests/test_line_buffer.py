@@ -0,0 +1,73 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from smali import SmaliFile
+from smali.lib.line_buffer import LineBuffer
+
+
+class TestLineBuffer(unittest.TestCase):
+    TEXTS = [
+        '',
+        '\n',
+        '\n\n',
+        'a',
+        'a\n',
+        'a\nb',
+        'a\r\nb\rc\n',
+        'a\x0cb\x85c d',
+        '    const-string v0, "é中"\n\n',
+    ]
+
+    def assert_lines(self, text: str, line_buffer: LineBuffer):
+        expected = text.splitlines()
+        self.assertEqual(expected, list(line_buffer), repr(text))
+        self.assertEqual(len(expected), len(line_buffer))
+        self.assertEqual(expected, [line_buffer[idx] for idx in range(len(line_buffer))])
+        self.assertEqual(expected[1:-1], line_buffer[1:-1])
+
+    def test_known_texts(self):
+        for text in self.TEXTS:
+            self.assert_lines(text, LineBuffer(text))
+
+    def test_random_texts(self):
+        rng = random.Random(0)
+        alphabet = ['a', 'b', '\n', '\n', '\r', '\x0c']
+        chunk_size = LineBuffer.CHUNK_SIZE
+        try:
+            # Small chunks so the lines span chunk boundaries
+            LineBuffer.CHUNK_SIZE = 3
+            for _ in range(5_000):
+                text = ''.join(rng.choice(alphabet[:4] if rng.random() < 0.5 else alphabet) for _ in range(rng.randint(0, 20)))
+                self.assert_lines(text, LineBuffer(text))
+        finally:
+            LineBuffer.CHUNK_SIZE = chunk_size
+
+    def test_pickle(self):
+        line_buffer = LineBuffer('a\nb\n')
+        self.assertEqual(['a', 'b'], list(pickle.loads(pickle.dumps(line_buffer))))
+
+    def test_read_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'A.smali')
+            for text in self.TEXTS:
+                with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(text)
+                # Decoded like a text mode open, with universal newlines
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    expected = f.read()
+                self.assertEqual(expected, LineBuffer.read_file(file_path).text)
+                self.assert_lines(expected, LineBuffer.read_file(file_path))
+
+            with open(file_path, 'wb') as f:
+                f.write('.class public LAé;\r\n.super Ljava/lang/Object;\r\n'.encode('utf-8'))
+            smali_file = SmaliFile.parse_file(file_path)
+            self.assertEqual('LAé;', smali_file.class_descriptor)
+            self.assertEqual('.class public LAé;\n.super Ljava/lang/Object;', str(smali_file))
+            self.assertIsNone(smali_file.check_reconstruction())
+
+
+if __name__ == '__main__':
+    unittest.main()
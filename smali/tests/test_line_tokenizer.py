@@ -0,0 +1,50 @@
+import random
+import re
+import unittest
+
+from smali.lib.line_tokenizer import LineTokenizer
+
+
+class TestLineTokenizer(unittest.TestCase):
+    # The lookahead expressions the tokenizer replaces, every split has to match them exactly
+    RE_SPACE_SPLIT = re.compile(r' +(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
+    RE_ASSIGNMENT_SPLIT = re.compile(r'=(?=(?:[^"\\]*(?:\\.|"(?:[^"\\]*\\.)*[^"\\]*"))*[^"]*$)')
+
+    LINES = [
+        '',
+        ' ',
+        '.field public static final TAG:Ljava/lang/String; = "Tag"',
+        'const-string v0, "a  b = c"',
+        'const-string v0, "escaped \\" quote = here"',
+        'const-string v0, "trailing backslash \\\\"',
+        'value = "a \\"b\\" c"',
+        'value = {',
+        '.param p1, "value"',
+        'const-string v0, "unbalanced',
+        'unbalanced " quote = in middle',
+        'lone \\ backslash = outside',
+        'ends with backslash \\',
+        '"" = ""',
+        'a  b   c',
+    ]
+
+    def assert_same_splits(self, line: str):
+        self.assertListEqual(self.RE_SPACE_SPLIT.split(line), LineTokenizer.split_spaces(line), repr(line))
+        expected = None
+        if self.RE_ASSIGNMENT_SPLIT.search(line) is not None:
+            expected = tuple(self.RE_ASSIGNMENT_SPLIT.split(line, maxsplit=1))
+        self.assertEqual(expected, LineTokenizer.split_assignment(line), repr(line))
+
+    def test_known_lines(self):
+        for line in self.LINES:
+            self.assert_same_splits(line)
+
+    def test_random_lines(self):
+        rng = random.Random(0)
+        alphabet = [' ', ' ', '"', '\\', '=', 'a', 'b']
+        for _ in range(20_000):
+            self.assert_same_splits(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 16))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from smali.modifiers import AnnotationModifiers, ClassModifiers, EndModifiers, FieldModifiers, MethodModifiers, RestartModifiers
+from smali.statements import Statement
+
+
+class TestModifiers(unittest.TestCase):
+    MODIFIER_TYPES = (AnnotationModifiers, ClassModifiers, EndModifiers, FieldModifiers, MethodModifiers, RestartModifiers)
+
+    def test_find(self):
+        for modifiers_type in self.MODIFIER_TYPES:
+            for member in modifiers_type:
+                tag = member.name.lower().replace('_', '-')
+                self.assertIs(member, modifiers_type.find(tag))
+                self.assertEqual(tag, str(member))
+            self.assertIsNone(modifiers_type.find('Lcom/example/Unknown;'))
+        self.assertIs(MethodModifiers.DECLARED_SYNCHRONIZED, MethodModifiers.find('declared-synchronized'))
+
+    def test_composite(self):
+        # Rendered in the definition order of the members, not the order they were combined in
+        modifiers = MethodModifiers.CONSTRUCTOR | MethodModifiers.STATIC | MethodModifiers.PUBLIC
+        self.assertEqual('public static constructor', str(modifiers))
+        self.assertEqual('public static constructor', str(modifiers))
+        self.assertEqual('', str(FieldModifiers(0)))
+
+    def test_statement(self):
+        line = '.method public static final synthetic access$000(I)V'
+        statement = Statement.parse_line(line)[0]
+        self.assertEqual(MethodModifiers.PUBLIC | MethodModifiers.STATIC | MethodModifiers.FINAL | MethodModifiers.SYNTHETIC, statement.modifiers)
+        self.assertEqual(line, str(statement))
+        self.assertIsNone(Statement.parse_line('.method constructor_like()V')[0].modifiers)
+
+
+if __name__ == '__main__':
+    unittest.main()
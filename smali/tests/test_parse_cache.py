@@ -0,0 +1,103 @@
+import os
+import queue
+import unittest
+
+from smali import SmaliFile, SmaliProject
+from smali.parse_cache import ParseCache
+from smali.parse_options import ParseOptions
+from smali.tests.fixtures import ArchiveFixture
+from smali.validation import ValidationPolicy
+
+
+class TestParseCache(ArchiveFixture, unittest.TestCase):
+    FILE_COUNT = 8
+
+    def archive_path(self, idx: int, file_name: str) -> str:
+        return os.path.join('smali', file_name)
+
+    @property
+    def cache_dir(self) -> str:
+        return os.path.join(self.temp_dir.name, 'cache')
+
+    def test_hits_and_misses(self):
+        cache = ParseCache(self.cache_dir)
+        for lazy in (False, True):
+            for file_path in self.file_paths:
+                self.assertMultiLineEqual(str(SmaliFile.parse_file(file_path, lazy=lazy)), str(SmaliFile.parse_file(file_path, lazy=lazy, cache=cache)))
+                self.assertMultiLineEqual(str(SmaliFile.parse_file(file_path, lazy=lazy)), str(SmaliFile.parse_file(file_path, lazy=lazy, cache=cache)))
+        self.assertEqual(self.FILE_COUNT * 2, cache.hits)
+        self.assertEqual(self.FILE_COUNT * 2, cache.misses)
+
+        # A new cache on the same directory sees the stored entries
+        reopened = ParseCache(self.cache_dir)
+        self.assertEqual(cache.size, reopened.size)
+        reopened.parse_file(self.file_paths[0])
+        self.assertEqual((1, 0), (reopened.hits, reopened.misses))
+
+        with open(self.file_paths[0], 'a') as f:
+            f.write('\n# changed\n')
+        reopened.parse_file(self.file_paths[0])
+        self.assertEqual((1, 1), (reopened.hits, reopened.misses))
+
+    def test_eviction(self):
+        cache = ParseCache(self.cache_dir)
+        for idx, file_path in enumerate(self.file_paths):
+            cache.parse_file(file_path)
+            # File timestamps are too coarse to order entries that were written right after each other
+            with open(file_path, 'rb') as f:
+                os.utime(cache.entry_path(cache.cache_key(f.read())), ns=(idx, idx))
+        entry_sizes = cache.size
+
+        # Keeps the most recently used entries that fit
+        small_cache = ParseCache(self.cache_dir, max_size=entry_sizes // 2)
+        small_cache.trim()
+        self.assertLessEqual(small_cache.size, entry_sizes // 2)
+        self.assertGreater(small_cache.evictions, 0)
+        small_cache.parse_file(self.file_paths[-1])
+        self.assertEqual(1, small_cache.hits)
+        small_cache.parse_file(self.file_paths[0])
+        self.assertEqual(1, small_cache.misses)
+        self.assertLessEqual(small_cache.size, entry_sizes // 2)
+
+    def test_corrupt_entry(self):
+        cache = ParseCache(self.cache_dir)
+        with open(self.file_paths[0], 'rb') as f:
+            key = cache.cache_key(f.read())
+        cache.parse_file(self.file_paths[0])
+        with open(cache.entry_path(key), 'wb') as f:
+            f.write(b'\x80\x05truncated')
+        self.assertMultiLineEqual(str(SmaliFile.parse_file(self.file_paths[0])), str(cache.parse_file(self.file_paths[0])))
+        self.assertEqual(2, cache.misses)
+
+    def test_project(self):
+        root_path = os.path.join(self.temp_dir.name, 'smali')
+        for max_workers, expected_misses in ((1, self.FILE_COUNT), (2, 0)):
+            cache = ParseCache(self.cache_dir)
+            for _ in range(2):
+                project = SmaliProject.parse_directory(root_path, max_workers=max_workers, cache=cache)
+                self.assertEqual(self.FILE_COUNT, len(project))
+            self.assertEqual(expected_misses, cache.misses)
+            self.assertEqual(self.FILE_COUNT * 2 - expected_misses, cache.hits)
+
+    def test_validation(self):
+        # Files read from the cache are validated like parsed files, on every executor
+        root_path = os.path.join(self.temp_dir.name, 'smali')
+        cache = ParseCache(self.cache_dir)
+        for max_workers, threads in ((1, False), (2, False), (2, True)):
+            for _ in range(2):
+                policy = ValidationPolicy(failures=queue.Queue())
+                SmaliProject.parse_directory(root_path, max_workers=max_workers, threads=threads, cache=cache, options=ParseOptions(validation_policy=policy))
+                self.assertEqual(self.FILE_COUNT, policy.validated)
+        self.assertEqual(self.FILE_COUNT * 5, cache.hits)
+        # Statements are only validated while parsing
+        cache.parse_file(self.file_paths[0], options=ParseOptions(validate_statements=True))
+        self.assertEqual(self.FILE_COUNT + 1, cache.misses)
+        # The warning callback is not stored, hits use the callback of their parse
+        caught = []
+        for on_warning in (lambda warning: None, caught.append):
+            smali_file = cache.parse_file(self.file_paths[0], lazy=True, options=ParseOptions(validate_statements=True, on_warning=on_warning))
+            self.assertEqual(on_warning, smali_file.options.on_warning)
+
+
+if __name__ == '__main__':
+    unittest.main()
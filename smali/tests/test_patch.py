@@ -0,0 +1,81 @@
+import os
+import unittest
+
+from smali import SmaliFile, SmaliProject
+from smali.patch import PatchEngine, PatchRule
+from smali.statements import InstructionStatement
+from smali.tests.fixtures import ArchiveFixture
+
+
+class TestPatch(ArchiveFixture, unittest.TestCase):
+    FILE_COUNT = 24
+    SOURCE = ('.class public LA;\n.super Ljava/lang/Object;\n\n'
+              '.method public a()V\n    .registers 2\n\n    invoke-static {}, LB;->run()V\n\n    const-string v0, "LB;->run()V"\n\n'
+              '    invoke-static {}, LC;->stop()V\n\n    return-void\n.end method\n\n'
+              '.method public b()V\n    .registers 1\n\n    return-void\n.end method\n')
+
+    TRANSLATE_NEWLINES = True
+
+    def archive_path(self, idx: int, file_name: str) -> str:
+        return f'{idx}.smali'
+
+    def test_rules(self):
+        engine = PatchEngine([
+            PatchRule('trace', 'LB;->run()V', before=('const/4 v1, 0x0',), opcode_prefix='invoke-'),
+            PatchRule('after', 'LB;->run()V', after=('nop',), opcode_prefix='invoke-'),
+            PatchRule('remove', 'LC;->stop()V', replace=()),
+            PatchRule('unused', 'LD;->none()V', before=('nop',)),
+        ])
+        smali_file = SmaliFile(self.SOURCE, lazy=True)
+        result = engine.patch(smali_file)
+        self.assertEqual((1, 1, 1, 0), result.hits)
+        self.assertTrue(result.modified)
+        # Inserted lines are next to the patched statement. The string constant is no invoke, the method without a
+        #  match is not loaded.
+        self.assertIn('    const/4 v1, 0x0\n    invoke-static {}, LB;->run()V\n    nop\n\n    const-string v0, "LB;->run()V"\n\n\n    return-void\n',
+                      str(smali_file))
+        self.assertFalse(smali_file.find_method('b', '()V').loaded)
+        self.assertIsNone(SmaliFile(str(smali_file)).check_reconstruction())
+
+        with self.assertRaises(ValueError):
+            PatchEngine([PatchRule('a', 'x'), PatchRule('a', 'y')])
+
+    def test_patch_file(self):
+        engine = PatchEngine([PatchRule('trace', 'LB;->run()V', before=('nop',), opcode_prefix='invoke-')])
+        file_path = os.path.join(self.temp_dir.name, 'A.smali')
+        with open(file_path, 'wb') as f:
+            f.write(self.SOURCE.encode())
+        self.assertTrue(engine.patch_file(file_path).modified)
+        # The file is rewritten with the inserted line only, the trailing newline of the source is kept
+        with open(file_path, 'rb') as f:
+            self.assertEqual(self.SOURCE.replace('    invoke-static {}, LB;', '    nop\n    invoke-static {}, LB;').encode(),
+                             f.read())
+
+    def test_project(self):
+        engine = PatchEngine([
+            PatchRule('init', 'Ljava/lang/Object;-><init>()V', before=('nop',), opcode_prefix='invoke-direct'),
+            PatchRule('none', 'Lno/such/Class;', after=('nop',)),
+        ])
+        expected = 0
+        for file_name in os.listdir(self.temp_dir.name):
+            smali_file = SmaliFile.parse_file(os.path.join(self.temp_dir.name, file_name))
+            expected += sum(1 for statement in smali_file.root.iter_statements()
+                            if isinstance(statement, InstructionStatement) and statement.reference == 'Ljava/lang/Object;-><init>()V' and statement.opcode.startswith('invoke-direct'))
+        self.assertGreater(expected, 0)
+
+        report = engine.patch_project(SmaliProject(self.temp_dir.name, max_workers=1), dry_run=True)
+        self.assertEqual({'init': expected, 'none': 0}, report.hits)
+        self.assertEqual(self.FILE_COUNT, report.files)
+
+        report = engine.patch_project(SmaliProject(self.temp_dir.name, max_workers=2))
+        self.assertEqual(expected, report.hits['init'])
+        self.assertEqual(0, len(report.errors))
+        for file_path in report.patched:
+            with open(file_path, 'r') as f:
+                smali_code = f.read()
+            self.assertIn('    nop\n    invoke-direct', smali_code)
+            self.assertIsNone(SmaliFile(smali_code).check_reconstruction())
+
+
+if __name__ == '__main__':
+    unittest.main()
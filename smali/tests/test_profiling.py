@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+
+from smali import SmaliFile, SmaliProject
+from smali.profiling import Profiler
+from smali.statements import InstructionStatement, Statement
+
+
+class TestProfiling(unittest.TestCase):
+    SOURCE = ('.class public LA;\n.super Ljava/lang/Object;\n\n.method public a()V\n    .registers 2\n\n'
+              '    const/4 v0, 0x1\n\n    return-void\n.end method\n')
+
+    def test_counters(self):
+        events = []
+        with Profiler(hooks=[lambda name, elapsed: events.append(name)]) as profiler:
+            smali_file = SmaliFile(self.SOURCE)
+            self.assertIsNone(smali_file.check_reconstruction())
+        counters = profiler.to_dict()
+        self.assertEqual(1, counters['file.parse']['count'])
+        self.assertEqual(2, counters['InstructionStatement.parse']['count'])
+        self.assertEqual(2, counters['InstructionStatement.__str__']['count'])
+        self.assertEqual(1, counters['MethodStatement.parse']['count'])
+        # Recursive calls of `parse_line` are timed once
+        self.assertEqual(len(smali_file.lines), counters['statement.parse_line']['count'])
+        self.assertGreaterEqual(counters['file.parse']['total'], counters['file.resolve_statements']['total'])
+        self.assertEqual(sum(counter['count'] for counter in counters.values()), len(events))
+        self.assertEqual(counters, json.loads(json.dumps(counters)))
+        buffer = io.StringIO()
+        profiler.dump(buffer)
+        self.assertEqual(list(counters), list(json.loads(buffer.getvalue())))
+        self.assertIn('file.parse', profiler.report())
+
+    def test_disable(self):
+        originals = (Statement.__dict__['parse_line'], InstructionStatement.__dict__['__str__'], SmaliFile.__dict__['iter_lines'])
+        profiler = Profiler()
+        with profiler:
+            self.assertIs(profiler, Profiler.ACTIVE)
+            with self.assertRaises(RuntimeError):
+                Profiler().enable()
+        self.assertIsNone(Profiler.ACTIVE)
+        self.assertEqual(originals, (Statement.__dict__['parse_line'], InstructionStatement.__dict__['__str__'], SmaliFile.__dict__['iter_lines']))
+        # Nothing is counted while disabled
+        SmaliFile(self.SOURCE)
+        self.assertEqual({}, profiler.to_dict())
+
+    def test_lazy_blocks(self):
+        # Lazy blocks parsed while profiling do not keep a timing wrapper
+        with Profiler() as profiler:
+            smali_file = SmaliFile(self.SOURCE, lazy=True)
+            restored = pickle.loads(pickle.dumps(smali_file))
+            restored.root.items[-1].load()
+        self.assertEqual(1, profiler.to_dict()['block.load']['count'])
+        smali_file.root.items[-1].load()
+        self.assertEqual(1, profiler.to_dict()['block.load']['count'])
+
+    def test_threads(self):
+        with Profiler() as profiler:
+            threads = [threading.Thread(target=lambda: [SmaliFile(self.SOURCE) for _ in range(50)]) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(200, profiler.to_dict()['file.parse']['count'])
+
+    def test_worker_processes(self):
+        # Worker processes are not profiled
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for idx in range(2):
+                with open(os.path.join(temp_dir, f'{idx}.smali'), 'w') as f:
+                    f.write(self.SOURCE.replace('LA;', f'LA{idx};'))
+            with Profiler() as profiler:
+                with self.assertRaises(RuntimeError):
+                    SmaliProject.parse_directory(temp_dir, max_workers=2)
+                SmaliProject.parse_directory(temp_dir, max_workers=2, threads=True)
+            self.assertEqual(2, profiler.to_dict()['file.parse']['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
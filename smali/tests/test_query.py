@@ -0,0 +1,74 @@
+import os
+import tarfile
+import tempfile
+import unittest
+from typing import List
+
+from smali import SmaliFile, SmaliProject
+from smali.block import Block
+from smali.modifiers import FieldModifiers, MethodModifiers
+from smali.query import AnyOf, Equals, HasModifiers, Prefix, Query, Regex
+from smali.statements import AnnotationStatement, FieldStatement, InstructionStatement, MethodStatement, Statement
+
+
+class TestQuery(unittest.TestCase):
+    FILE_COUNT = 24
+
+    smali_files: List[SmaliFile]
+
+    def setUp(self):
+        cwd = os.path.abspath(os.path.dirname(__file__))
+        with tarfile.open(os.path.join(cwd, 'tests.tar.xz')) as archive:
+            self.smali_files = [SmaliFile(archive.extractfile(file).read().decode(), lazy=idx % 2 == 1)
+                                for idx, file in enumerate(archive.getmembers()[:self.FILE_COUNT])]
+
+    @staticmethod
+    def statement(item) -> Statement:
+        return item.head if isinstance(item, Block) else item
+
+    def test_equality(self):
+        # Plain values behave like the keyword arguments of `find`
+        for smali_file in self.smali_files:
+            self.assertEqual(smali_file.find(MethodStatement, member_name='<init>'), smali_file.query(Query(MethodStatement, member_name='<init>')))
+            self.assertEqual(smali_file.find(InstructionStatement, opcode='return-void'), smali_file.query(Query(InstructionStatement, opcode=Equals('return-void'))))
+            self.assertEqual(smali_file.find(Statement), smali_file.query(Query()))
+
+    def test_predicates(self):
+        for smali_file in self.smali_files:
+            statements = list(smali_file.root.iter_statements())
+            invokes = [item for item in statements if isinstance(item, InstructionStatement) and item.opcode.startswith('invoke-')]
+            self.assertEqual(invokes, smali_file.query(Query(InstructionStatement, opcode=Prefix('invoke-'))))
+            self.assertEqual(invokes, smali_file.query(Query(InstructionStatement, opcode=Regex(r'^invoke-'))))
+            moves = [item for item in statements if isinstance(item, InstructionStatement) and item.opcode in ('move-result', 'move-result-object')]
+            self.assertEqual(moves, smali_file.query(Query(InstructionStatement, opcode=AnyOf(['move-result', 'move-result-object']))))
+
+            static_methods = [method for method in smali_file.find(MethodStatement) if method.head.modifiers is not None and MethodModifiers.STATIC in method.head.modifiers]
+            self.assertEqual(static_methods, smali_file.query(Query(MethodStatement, modifiers=HasModifiers(MethodModifiers.STATIC))))
+            # Modifiers of another statement type never match
+            self.assertEqual([], smali_file.query(Query(FieldStatement, modifiers=HasModifiers(MethodModifiers.STATIC))))
+            self.assertEqual([], smali_file.query(Query(MethodStatement, no_such_attribute=None)))
+            self.assertEqual([item for item in smali_file.find(FieldStatement) if self.statement(item).modifiers is not None and FieldModifiers.PRIVATE | FieldModifiers.FINAL in self.statement(item).modifiers],
+                             smali_file.query(Query(FieldStatement, modifiers=HasModifiers(FieldModifiers.PRIVATE | FieldModifiers.FINAL))))
+
+    def test_containing(self):
+        query = Query(MethodStatement, containing=Query(InstructionStatement, opcode='return-void'))
+        for smali_file in self.smali_files:
+            expected = [method for method in smali_file.find(MethodStatement) if len(method.find(InstructionStatement, opcode='return-void')) > 0]
+            self.assertEqual(expected, smali_file.query(query))
+            annotated = [method for method in smali_file.find(MethodStatement) if len(method.find(AnnotationStatement)) > 0]
+            self.assertEqual(annotated, smali_file.query(Query(MethodStatement, containing=[Query(AnnotationStatement)])))
+            self.assertIsNone(Query(InstructionStatement, containing=Query()).find_first(smali_file.root))
+
+    def test_project(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for idx, smali_file in enumerate(self.smali_files):
+                smali_file.write_file(os.path.join(temp_dir, f'{idx}.smali'))
+            project = SmaliProject.parse_directory(temp_dir, max_workers=1)
+            query = Query(MethodStatement, member_name='<init>')
+            expected = [(class_descriptor, item) for class_descriptor, smali_file in project.files.items() for item in smali_file.find(MethodStatement, member_name='<init>')]
+            self.assertEqual([(class_descriptor, str(item)) for class_descriptor, item in expected],
+                             [(class_descriptor, str(item)) for class_descriptor, item in project.query(query)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import hashlib
+import random
+import re
+import unittest
+
+from smali.lib.smali_compare import SmaliCompare
+
+
+class TestSmaliCompare(unittest.TestCase):
+    # The regular expression normalization and sorting hash the comparator replaces, results have to match them
+    RE_FIND_COMMENTS = re.compile(r'(#.*)$', re.MULTILINE)
+    RE_FIND_INDENTATION = re.compile(r'((^[ \t]+)|([ \t]+$))', re.MULTILINE)
+    RE_FIND_OVERSIZED_WHITESPACE = re.compile(r'[\t ]{2,}')
+
+    TEXTS = [
+        '',
+        '\n\n',
+        '.class public LA;\n.super Ljava/lang/Object;\n',
+        '    const-string v0, "a  b"    # comment\n\n\treturn-void  \n\n  ',
+        '.method public a()V\r\n    return-void\r\n.end method\r\n',
+        '# only a comment',
+        'a\t\tb\tc \x0c\n \x0c\n',
+    ]
+
+    @classmethod
+    def reference_normalize(cls, smali: str) -> str:
+        smali = cls.RE_FIND_COMMENTS.sub('', smali)
+        smali = cls.RE_FIND_INDENTATION.sub('', smali)
+        smali = cls.RE_FIND_OVERSIZED_WHITESPACE.sub(' ', smali)
+        return smali.rstrip()
+
+    @staticmethod
+    def reference_hash(data: str) -> str:
+        return ''.join(sorted(filter(lambda x: not x.isspace(), list(data))))
+
+    def assert_same_results(self, a: str, b: str):
+        self.assertEqual(self.reference_normalize(a), SmaliCompare.normalize_smali(a), repr(a))
+        expected = self.reference_normalize(a) == self.reference_normalize(b)
+        self.assertEqual(expected, SmaliCompare.whitespace_normalized_equals(a, b), repr((a, b)))
+        self.assertEqual(expected, SmaliCompare.whitespace_normalized_equals(a.split('\n'), iter(b.split('\n'))), repr((a, b)))
+        expected = self.reference_hash(a) == self.reference_hash(b)
+        self.assertEqual(expected, SmaliCompare.order_independent_hash(a) == SmaliCompare.order_independent_hash(b), repr((a, b)))
+
+    def test_known_texts(self):
+        for a in self.TEXTS:
+            for b in self.TEXTS:
+                self.assert_same_results(a, b)
+
+    def test_random_texts(self):
+        rng = random.Random(0)
+        alphabet = [' ', ' ', '\t', '\n', '\n', '\r', '#', 'a', 'b', '"']
+        for _ in range(20_000):
+            a = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            b = ''.join(rng.sample(a, len(a))) if rng.random() < 0.5 else ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            self.assert_same_results(a, b)
+
+    def test_order_independent_hash(self):
+        self.assertEqual(SmaliCompare.order_independent_hash('ab c\nd'), SmaliCompare.order_independent_hash(['d c', 'b', 'a']))
+        self.assertNotEqual(SmaliCompare.order_independent_hash('aab'), SmaliCompare.order_independent_hash('abb'))
+        self.assertEqual(hashlib.md5().digest_size, len(SmaliCompare.order_independent_hash('')))
+
+
+if __name__ == '__main__':
+    unittest.main()
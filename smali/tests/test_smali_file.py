@@ -1,14 +1,21 @@
 import io
 import os
+import pickle
 import tarfile
+import tempfile
+import threading
 import unittest
 import warnings
 from typing import List
+from unittest import mock
 
 from smali import SmaliFile
 from smali.block import Block
-from smali.exceptions import ValidationError
-from smali.statements import Statement, MethodStatement, FieldStatement
+from smali.exceptions import ValidationError, WhitespaceWarning
+from smali.lib.intern_table import InternTable
+from smali.parse_options import ParseOptions
+from smali.attributes import StatementAttributes
+from smali.statements import Statement, ClassStatement, MethodStatement, FieldStatement
 
 
 class TestSmaliFiles(unittest.TestCase):
@@ -34,16 +41,84 @@ class TestSmaliFiles(unittest.TestCase):
             with self.subTest(name=file.name, real_path=real_path):
                 with io.TextIOWrapper(self.archive.extractfile(file)) as f:
                     file_data = f.read()
+                    caught = []
                     try:
-                        with warnings.catch_warnings(record=True) as w:
-                            SmaliFile(file_data)
-                            if w is not None and len(w) > 0:
-                                self.fail('\n'.join(map(str, w)))
+                        SmaliFile(file_data, options=ParseOptions(validate=True, validate_statements=True, on_warning=caught.append))
+                        if len(caught) > 0:
+                            self.fail('\n'.join(map(str, caught)))
                     except ValidationError as e:
                         self.fail(e)
                     except Exception as e:
                         self.fail(e)
 
+    def test_parse_options(self):
+        # Threads parsing with different options at the same time do not see each other's options
+        smali_code = '.class public LTest;\n.super Ljava/lang/Object;\n\n.method public test()V\n    .registers  1\n    return-void\n.end method\n'
+        SmaliFile.VALIDATE = False
+        Statement.VALIDATE = False
+        results = {}
+
+        def parse(name: str, options: ParseOptions):
+            for _ in range(200):
+                smali_file = SmaliFile(smali_code, lazy=True, options=options)
+                smali_file.find_method('test', '()V').items
+            results[name] = True
+
+        caught = []
+        threads = [threading.Thread(target=parse, args=('validated', ParseOptions(validate_statements=True, on_warning=caught.append))),
+                   threading.Thread(target=parse, args=('plain', ParseOptions(on_warning=self.fail)))]
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual({'validated', 'plain'}, set(results))
+        # The lazily loaded `.registers` line is validated with the options of its file
+        self.assertEqual(200, len(caught))
+        self.assertTrue(all(isinstance(warning, WhitespaceWarning) for warning in caught))
+
+        # Lazy blocks do not read the class level flags when they are loaded
+        Statement.VALIDATE = True
+        smali_file = SmaliFile(smali_code, lazy=True, options=ParseOptions(on_warning=caught.append))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            smali_file.find_method('test', '()V').items
+        self.assertEqual(200, len(caught))
+
+        # The warning callback is not pickled, the restored file loads its blocks without it
+        smali_file = SmaliFile(smali_code, lazy=True, options=ParseOptions(validate_statements=True, on_warning=lambda warning: caught.append(warning)))
+        restored = pickle.loads(pickle.dumps(smali_file))
+        self.assertIsNone(restored.options.on_warning)
+        smali_file.find_method('test', '()V').items
+        self.assertEqual(201, len(caught))
+        with self.assertWarns(WhitespaceWarning):
+            restored.find_method('test', '()V').items
+
+    def test_interning(self):
+        smali_code = '.class public LTest;\n.super Ljava/lang/Object;\n\n.field private name:Ljava/lang/String;\n\n' \
+                     '.method public test()Ljava/lang/String;\n    .registers 2\n    iget-object v0, p0, LTest;->name:Ljava/lang/String;\n' \
+                     '    return-object v0\n.end method\n'
+        first, second = SmaliFile(smali_code), SmaliFile(smali_code)
+        self.assertIs(first.find_field('name').type_descriptor, second.find_field('name').type_descriptor)
+        instructions = first.find_method('test', '()Ljava/lang/String;').items[2:4]
+        self.assertIs(instructions[0].registers[0], instructions[1].registers[0])
+        self.assertFalse(first.root.modified)
+
+        # Strings interned into a table are not shared with files parsed without it
+        table = InternTable()
+        scoped = SmaliFile(smali_code, options=ParseOptions(intern=table.intern))
+        self.assertIn('Ljava/lang/String;', table)
+        self.assertIsNot(first.find_field('name').type_descriptor, scoped.find_field('name').type_descriptor)
+
+        unpickled = pickle.loads(pickle.dumps(scoped))
+        self.assertIsNot(scoped.class_descriptor, unpickled.class_descriptor)
+        unpickled.intern(table.intern)
+        self.assertIs(scoped.class_descriptor, unpickled.class_descriptor)
+        self.assertIs(scoped.find_method('test', '()Ljava/lang/String;').items[2].reference,
+                      unpickled.find_method('test', '()Ljava/lang/String;').items[2].reference)
+        self.assertFalse(unpickled.root.modified)
+
     def test_find(self):
         target = self.files[0]
         with io.TextIOWrapper(self.archive.extractfile(target)) as f:
@@ -97,6 +172,193 @@ class TestSmaliFiles(unittest.TestCase):
             self.assertMultiLineEqual('NO_INTERNET_PERMISSION_REASON', found.member_name)
             self.assertMultiLineEqual('Ljava/lang/String;', found.type_descriptor)
 
+    def test_member_index(self):
+        target = '00af6b80387134e695624faa23efbd603e4a58985e5a8d9f4c26bd6f069ce852.smali'
+        with io.TextIOWrapper(self.archive.extractfile(target)) as f:
+            smali_file = SmaliFile(f.read())
+            for method in smali_file.find(MethodStatement):
+                method_name = method.head.member_name
+                self.assertListEqual(smali_file.root.find(MethodStatement, member_name=method_name), smali_file.find_methods(method_name))
+            for field in smali_file.find(FieldStatement):
+                field_name = field.member_name if isinstance(field, FieldStatement) else field.head.member_name
+                self.assertIs(smali_file.root.find(FieldStatement, member_name=field_name)[0], smali_file.find_field(field_name))
+
+            self.assertIsNone(smali_file.find_method('added', '()V'))
+            added = Block()
+            for statement in Statement.parse_lines('.method public added()V\n.registers 0\nreturn-void\n.end method'):
+                added.append(statement)
+            smali_file.root.append(added)
+            self.assertIs(added, smali_file.find_method('added', '()V'))
+
+            added.head.member_name = 'renamed'
+            self.assertIsNone(smali_file.find_method('added', '()V'))
+            self.assertIs(added, smali_file.find_method('renamed', '()V'))
+
+            smali_file.root.items.remove(added)
+            self.assertListEqual([], smali_file.find_methods('renamed'))
+
+    def test_iter_find(self):
+        for file in self.files[:16]:
+            with io.TextIOWrapper(self.archive.extractfile(file)) as f:
+                smali_file = SmaliFile(f.read(), lazy=True)
+            for stmt_type in (Statement, MethodStatement, FieldStatement, ClassStatement):
+                found = smali_file.find(stmt_type)
+                self.assertListEqual(found, list(smali_file.iter_find(stmt_type)))
+                self.assertIs(found[0] if len(found) > 0 else None, smali_file.find_first(stmt_type))
+            # Class level searches stop before any method body is loaded
+            smali_file.find_first(FieldStatement, member_name='')
+            smali_file.find_first(MethodStatement, member_name='')
+            self.assertFalse(any(method.loaded for method in smali_file.find(MethodStatement)))
+            # Lookups after a change are answered without rebuilding the member index
+            smali_file.root.mark_modified()
+            for field in smali_file.find(FieldStatement):
+                field_name = field.member_name if isinstance(field, FieldStatement) else field.head.member_name
+                self.assertIs(smali_file.root.find_first(FieldStatement, member_name=field_name), smali_file.find_field(field_name))
+            self.assertFalse(smali_file.member_index_current)
+
+    def test_lazy(self):
+        target = '00af6b80387134e695624faa23efbd603e4a58985e5a8d9f4c26bd6f069ce852.smali'
+        with io.TextIOWrapper(self.archive.extractfile(target)) as f:
+            file_data = f.read()
+            smali_file = SmaliFile(file_data, lazy=True)
+            methods = smali_file.find(MethodStatement)
+            self.assertGreater(len(methods), 0)
+            self.assertTrue(all(not method.loaded for method in methods))
+            self.assertIsNotNone(smali_file.find_field('NO_INTERNET_PERMISSION_REASON'))
+            self.assertMultiLineEqual(file_data.rstrip(), str(smali_file).rstrip())
+            self.assertTrue(all(not method.loaded for method in methods))
+
+            found = smali_file.find_method('checkCustomTabRedirectActivity', '(Landroid/content/Context;Z)V')
+            self.assertFalse(found.loaded)
+            self.assertMultiLineEqual('checkCustomTabRedirectActivity', found.head.member_name)
+            self.assertEqual(26, len(found.items))
+            self.assertTrue(found.loaded)
+            self.assertMultiLineEqual(str(SmaliFile(file_data)), str(smali_file))
+
+            found.items[-1:-1] = Statement.parse_lines('return-void')
+            self.assertIn('    return-void\n.end method', str(smali_file))
+
+    def test_write_to(self):
+        target = '00af6b80387134e695624faa23efbd603e4a58985e5a8d9f4c26bd6f069ce852.smali'
+        with io.TextIOWrapper(self.archive.extractfile(target)) as f:
+            file_data = f.read()
+            for lazy in (False, True):
+                smali_file = SmaliFile(file_data, lazy=lazy)
+                self.assertListEqual(file_data.rstrip().splitlines(), list(smali_file.iter_lines()))
+                self.assertListEqual(file_data.rstrip().splitlines(), list(smali_file.iter_lines(reuse_source=False)))
+                for buffer_size in (1, 256, SmaliFile.WRITE_BUFFER_SIZE):
+                    output = io.StringIO()
+                    smali_file.write_to(output, buffer_size=buffer_size)
+                    self.assertMultiLineEqual(str(smali_file), output.getvalue())
+
+        # Written as UTF-8 independent of the locale, like files are read, with the trailing newline of the source
+        smali_code = '.class public Lé;\n.super Ljava/lang/Object;\n\n.field public ü:I\n'
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'unicode.smali')
+            SmaliFile(smali_code).write_file(file_path)
+            with open(file_path, 'rb') as f:
+                self.assertEqual(smali_code.encode('utf-8'), f.read())
+            self.assertMultiLineEqual(smali_code.rstrip(), str(SmaliFile.parse_file(file_path)))
+
+    def test_dirty_tracking(self):
+        # The renderer normalizes the whitespace of the `.registers` lines, blocks that are not modified keep it
+        smali_code = '\n'.join([
+            '.class public LDirty;',
+            '.super Ljava/lang/Object;',
+            '',
+            '.method public first()V',
+            '    .registers  1',
+            '    return-void',
+            '.end method',
+            '',
+            '.method public second()V',
+            '    .registers  1',
+            '    return-void',
+            '.end method',
+        ])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            for lazy in (False, True):
+                smali_file = SmaliFile(smali_code, lazy=lazy)
+                self.assertFalse(smali_file.root.modified)
+                self.assertMultiLineEqual(smali_code, str(smali_file))
+                if not lazy:
+                    self.assertIn('    .registers 1', '\n'.join(smali_file.iter_lines(reuse_source=False)))
+
+                first = smali_file.find_method('first', '()V')
+                second = smali_file.find_method('second', '()V')
+                first.find(Statement)[1].register_count = 2
+                self.assertTrue(first.modified)
+                self.assertTrue(smali_file.root.modified)
+                self.assertFalse(second.modified)
+                self.assertMultiLineEqual(smali_code.replace('.registers  1', '.registers 2', 1), str(smali_file))
+
+                second.items.insert(-1, Statement.parse_line('nop')[0])
+                self.assertTrue(second.modified)
+                self.assertIn('    nop\n.end method', str(smali_file))
+
+                restored = pickle.loads(pickle.dumps(SmaliFile(smali_code, lazy=lazy)))
+                self.assertFalse(restored.root.modified)
+                self.assertMultiLineEqual(smali_code, str(restored))
+
+    def test_compact_statements(self):
+        target = self.files[0]
+        with io.TextIOWrapper(self.archive.extractfile(target)) as f:
+            smali_file = SmaliFile(f.read())
+            self.assertFalse(hasattr(smali_file.root, '__dict__'))
+            for statement in smali_file.root.flatten():
+                self.assertFalse(hasattr(statement, '__dict__'))
+                self.assertIsNone(statement.line_iter)
+                self.assertIsNone(statement.raw_line)
+            with self.assertRaises(ValidationError):
+                smali_file.root.flatten()[0].validate()
+
+
+class TestSmaliFileScaling(unittest.TestCase):
+    SMALL_FIELD_COUNT = 12_500
+    LARGE_FIELD_COUNT = 50_000
+
+    @staticmethod
+    def synthetic_class(field_count: int) -> str:
+        # Single line fields stay as MAYBE_BLOCK_START until the end of the first pass, every `.end` in between
+        #  has to be resolved against them
+        lines = ['.class public LSynthetic;', '.super Ljava/lang/Object;', '']
+        for idx in range(field_count):
+            lines.append(f'.field public f{idx}:I')
+        lines.extend(['.field public annotated:I', '    .annotation runtime LAnnotation;', '    .end annotation', '.end field', ''])
+        for idx in range(field_count // 10):
+            lines.extend([f'.method public m{idx}(I)V', '    .registers 2', '    .param p1, "value"    # I', '    return-void', '.end method', ''])
+        return '\n'.join(lines)
+
+    def counted_parse(self, field_count: int) -> int:
+        # Returns how often the block end of a field was compared, wall clock times are not reliable on a loaded
+        #  machine. Resolving every `.end` against all open fields compares them a quadratic number of times.
+        smali_code = self.synthetic_class(field_count)
+        block_ends_with = FieldStatement.block_ends_with
+        calls = [0]
+
+        def counted(statement):
+            calls[0] += 1
+            return block_ends_with.fget(statement)
+
+        with mock.patch.object(FieldStatement, 'block_ends_with', property(counted)):
+            smali_file = SmaliFile(smali_code)
+            compared = calls[0]
+        self.assertEqual(field_count // 10, len(smali_file.find(MethodStatement)))
+        self.assertIsInstance(smali_file.find_field('annotated'), Block)
+        field = smali_file.find_field(f'f{field_count - 1}')
+        self.assertIsInstance(field, FieldStatement)
+        self.assertTrue(bool(field.attributes & StatementAttributes.SINGLE_LINE))
+        self.assertFalse(bool(field.attributes & StatementAttributes.MAYBE_BLOCK_START))
+        return compared
+
+    def test_maybe_block_start_scaling(self):
+        small = self.counted_parse(self.SMALL_FIELD_COUNT)
+        large = self.counted_parse(self.LARGE_FIELD_COUNT)
+        # 4x the input, a quadratic resolution would compare ~16x as often
+        ratio = self.LARGE_FIELD_COUNT / self.SMALL_FIELD_COUNT
+        self.assertLessEqual(small, self.SMALL_FIELD_COUNT * 2)
+        self.assertLessEqual(large, small * ratio * 1.1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import os
+import pickle
+import queue
+import unittest
+
+from smali import SmaliFile, SmaliProject
+from smali.exceptions import ParseError
+from smali.parse_options import ParseOptions
+from smali.statements import SuperStatement
+from smali.tests.fixtures import ArchiveFixture
+from smali.validation import ValidationPolicy
+
+
+class TestSmaliProject(ArchiveFixture, unittest.TestCase):
+    FILE_COUNT = 24
+
+    def setUp(self):
+        super().setUp()
+        with open(os.path.join(self.temp_dir.name, 'broken.smali'), 'w') as f:
+            f.write('.method public broken()V\n')
+        with open(os.path.join(self.temp_dir.name, 'ignored.txt'), 'w') as f:
+            f.write('.class public LIgnored;\n')
+
+    def archive_path(self, idx: int, file_name: str) -> str:
+        return os.path.join(f'smali_classes{idx % 3}', file_name)
+
+    def test_discover(self):
+        paths = SmaliProject.discover(self.temp_dir.name)
+        self.assertEqual(self.FILE_COUNT + 1, len(paths))
+        self.assertTrue(all(path.endswith('.smali') for path in paths))
+
+    def test_parse_serial_and_parallel(self):
+        serial = SmaliProject.parse_directory(self.temp_dir.name, max_workers=1)
+        parallel = SmaliProject.parse_directory(self.temp_dir.name, max_workers=2, chunk_size=4)
+        self.assertEqual(self.FILE_COUNT, len(serial))
+        self.assertListEqual(list(serial), list(parallel))
+        # The files returned by the worker processes are interned again
+        super_descriptors = [project[class_descriptor].root.find_first(SuperStatement).class_descriptor for project in (serial, parallel) for class_descriptor in project]
+        self.assertEqual(len(set(super_descriptors)), len(set(map(id, super_descriptors))))
+        for class_descriptor in serial:
+            self.assertTrue(class_descriptor.startswith('L') and class_descriptor.endswith(';'))
+            self.assertEqual(class_descriptor, parallel[class_descriptor].class_descriptor)
+            self.assertMultiLineEqual(str(serial[class_descriptor]), str(parallel[class_descriptor]))
+            with open(parallel.paths[class_descriptor], 'r') as f:
+                self.assertMultiLineEqual(f.read().rstrip(), str(parallel[class_descriptor]).rstrip())
+
+    def test_parse_threads(self):
+        serial = SmaliProject.parse_directory(self.temp_dir.name, max_workers=1)
+        caught = []
+        threaded = SmaliProject.parse_directory(self.temp_dir.name, max_workers=4, threads=True,
+                                                options=ParseOptions(validate_statements=True, on_warning=caught.append))
+        self.assertListEqual(list(serial), list(threaded))
+        self.assertListEqual(list(serial.errors), list(threaded.errors))
+        self.assertListEqual([], caught)
+        for class_descriptor in serial:
+            self.assertMultiLineEqual(str(serial[class_descriptor]), str(threaded[class_descriptor]))
+
+    def test_class_validation_policy(self):
+        # Files parsed by worker processes are submitted to the class level policy of this process
+        try:
+            for max_workers in (1, 2):
+                policy = SmaliFile.VALIDATION_POLICY = ValidationPolicy(failures=queue.Queue())
+                with open(os.path.join(self.temp_dir.name, 'whitespace.smali'), 'w') as f:
+                    f.write('.class public  LWhitespace;\n.super Ljava/lang/Object;\n')
+                SmaliProject.parse_directory(self.temp_dir.name, max_workers=max_workers, chunk_size=4)
+                self.assertEqual((self.FILE_COUNT + 1, 1), (policy.validated, policy.failed))
+                self.assertEqual(1, policy.failures.qsize())
+        finally:
+            SmaliFile.VALIDATION_POLICY = None
+
+    def test_parse_errors(self):
+        project = SmaliProject.parse_directory(self.temp_dir.name, max_workers=2)
+        broken_path = os.path.join(project.root_path, 'broken.smali')
+        self.assertListEqual([broken_path], list(project.errors))
+        self.assertIsInstance(project.errors[broken_path], ParseError)
+
+    def test_pickle(self):
+        file_path = SmaliProject.discover(self.temp_dir.name)[-1]
+        smali_file = SmaliFile.parse_file(file_path)
+        self.assertMultiLineEqual(str(smali_file), str(pickle.loads(pickle.dumps(smali_file))))
+
+
+if __name__ == '__main__':
+    unittest.main()
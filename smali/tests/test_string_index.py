@@ -0,0 +1,77 @@
+import unittest
+
+from smali import StringConstantIndex
+from smali.literals import StringLiteral
+from smali.string_index import StringKind
+from smali.tests.fixtures import ProjectFixture
+
+
+class TestStringConstantIndex(ProjectFixture, unittest.TestCase):
+    DB_NAME = 'strings.sqlite'
+
+    CLASSES = {
+        'LA;': ('.class public LA;', '.super Ljava/lang/Object;', '',
+                '.annotation system Ldalvik/annotation/Signature;', '    value = {', '        "Ljava/util/List<",', '        "Ljava/lang/String;>;"', '    }',
+                '.end annotation', '',
+                '.method public run()V', '    .registers 2', '', '    const-string v0, "https://api.example.com/v1"', '',
+                '    const-string/jumbo v1, "key=\\"abc\\""', '', '    return-void', '.end method'),
+        'LB;': ('.class public LB;', '.super Ljava/lang/Object;', '',
+                '.method public static log(I)V', '    .registers 2', '', '    const-string v0, "https://example.com"  # url', '',
+                '    const-string v1, "\\u00e9t\\u00e9"', '', '    return-void', '.end method'),
+    }
+
+    def test_unquote(self):
+        self.assertEqual('a\nb"\\', StringLiteral.unquote(r'"a\nb\"\\"'))
+        self.assertEqual('é\U0001f600', StringLiteral.unquote(r'"é😀"'))
+        # Lone surrogates can not be stored as text
+        self.assertEqual('x\\ud800', StringLiteral.unquote(r'"x\ud800"'))
+        with self.assertRaises(ValueError):
+            StringLiteral.unquote('abc')
+
+    def test_queries(self):
+        with StringConstantIndex.open(self.db_path, self.root_path, max_workers=1) as index:
+            references = index.find('https://example.com')
+            self.assertEqual(1, len(references))
+            self.assertEqual((StringKind.CONST_STRING, 'LB;', 'log(I)V', 7), (references[0].kind, references[0].class_descriptor, references[0].method, references[0].line))
+            self.assertEqual(['key="abc"'], [reference.value for reference in index.find_substring('abc')])
+            self.assertEqual(['été'], [reference.value for reference in index.find_prefix('é')])
+            self.assertEqual(['https://api.example.com/v1', 'https://example.com'], [reference.value for reference in index.find_prefix('https://')])
+            self.assertEqual(['https://api.example.com/v1', 'https://example.com'], index.values_containing('example.com'))
+            # Shorter than a trigram
+            self.assertEqual(['https://api.example.com/v1'], index.values_containing('/v'))
+            annotations = [reference for reference in index.find_prefix('') if reference.kind == StringKind.ANNOTATION]
+            self.assertEqual([('Ljava/util/List<', 6), ('Ljava/lang/String;>;', 7)], [(reference.value, reference.line) for reference in annotations])
+            self.assertIsNone(annotations[0].method)
+            self.assertEqual(4, len(index.find_substring('/')))
+            self.assertEqual([], index.find_substring('missing'))
+
+    def test_prefix_end(self):
+        self.assertEqual('ab', StringConstantIndex.prefix_end('aa'))
+        self.assertEqual('a\ue000', StringConstantIndex.prefix_end('a\ud7ff'))
+        self.assertEqual('b', StringConstantIndex.prefix_end('a\U0010ffff\U0010ffff'))
+        self.assertIsNone(StringConstantIndex.prefix_end('\U0010ffff'))
+        self.assertIsNone(StringConstantIndex.prefix_end(''))
+
+        self.write_class('LC;', ('.class public LC;', '.super Ljava/lang/Object;', '',
+                                 '.method public run()V', '    .registers 3', '', '    const-string v0, "\\udbff\\udfffa"', '',
+                                 '    const-string v1, "\\ud7ffb"', '', '    const-string v2, "\\ue000c"', '', '    return-void', '.end method'))
+        with StringConstantIndex.open(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertEqual(['\U0010ffffa'], [reference.value for reference in index.find_prefix('\U0010ffff')])
+            self.assertEqual(['\ud7ffb'], [reference.value for reference in index.find_prefix('\ud7ff')])
+
+    def test_incremental_refresh(self):
+        with StringConstantIndex.open(self.db_path, self.root_path, max_workers=1):
+            pass
+        with StringConstantIndex(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertTupleEqual((0, 0, 0, 2, 0), index.refresh())
+            lines = list(self.CLASSES['LB;'])
+            lines[6] = '    const-string v0, "https://example.org"'
+            self.write_class('LB;', lines)
+            self.assertTupleEqual((0, 1, 0, 1, 0), index.refresh())
+            self.assertEqual([], index.find('https://example.com'))
+            self.assertEqual(['https://example.org'], index.values_containing('example.org'))
+            self.assertEqual(['https://api.example.com/v1'], index.values_containing('example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import queue
+import tarfile
+import unittest
+import warnings
+
+from smali import SmaliFile
+from smali.exceptions import WhitespaceWarning
+from smali.validation import DeferredValidation, ValidationFailure, ValidationPolicy
+
+
+class TestValidation(unittest.TestCase):
+    # Collapsing the double space is a whitespace difference of the reconstruction
+    WHITESPACE_CODE = '.class public  LA;\n.super Ljava/lang/Object;\n'
+    VALID_CODE = '.class public LA;\n.super Ljava/lang/Object;\n'
+
+    def setUp(self):
+        warnings.simplefilter('ignore', WhitespaceWarning)
+
+    def tearDown(self):
+        SmaliFile.VALIDATION_POLICY = None
+        warnings.resetwarnings()
+
+    def test_file_policy(self):
+        failures = []
+        SmaliFile.VALIDATION_POLICY = ValidationPolicy(on_failure=failures.append)
+        SmaliFile(self.VALID_CODE)
+        SmaliFile(self.WHITESPACE_CODE)
+        self.assertEqual(1, len(failures))
+        self.assertEqual('LA;', failures[0].class_descriptor)
+        self.assertIsInstance(failures[0].error, WhitespaceWarning)
+        self.assertEqual((2, 0, 1), (SmaliFile.VALIDATION_POLICY.validated, SmaliFile.VALIDATION_POLICY.skipped, SmaliFile.VALIDATION_POLICY.failed))
+
+    def test_default_policy(self):
+        # Failures are collected instead of raised or emitted during the parse, unless asked for
+        SmaliFile.VALIDATION_POLICY = ValidationPolicy()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            SmaliFile(self.WHITESPACE_CODE)
+        self.assertIsInstance(SmaliFile.VALIDATION_POLICY.failures.get_nowait().error, WhitespaceWarning)
+        SmaliFile.VALIDATION_POLICY = ValidationPolicy(raise_errors=True)
+        self.assertIsNone(SmaliFile.VALIDATION_POLICY.failures)
+        with self.assertWarns(WhitespaceWarning):
+            SmaliFile(self.WHITESPACE_CODE)
+
+    def test_sampled_policy(self):
+        failures = queue.Queue()
+        for sample_rate in (0.0, 0.25):
+            policy = ValidationPolicy(sample_rate=sample_rate, seed=0, failures=failures)
+            SmaliFile.VALIDATION_POLICY = policy
+            for _ in range(200):
+                SmaliFile(self.WHITESPACE_CODE)
+            self.assertEqual(200, policy.validated + policy.skipped)
+            self.assertEqual(policy.validated, policy.failed)
+            if sample_rate == 0.0:
+                self.assertEqual(0, policy.validated)
+            else:
+                self.assertTrue(20 < policy.validated < 80)
+        self.assertEqual(policy.failed, failures.qsize())
+        with self.assertRaises(ValueError):
+            ValidationPolicy(sample_rate=1.5)
+
+    def test_deferred_policy(self):
+        cwd = os.path.abspath(os.path.dirname(__file__))
+        with tarfile.open(os.path.join(cwd, 'tests.tar.xz')) as archive:
+            # The archive has CRLF line endings, these are translated like a text mode open does
+            sources = [archive.extractfile(file).read().decode().replace('\r\n', '\n') for file in archive.getmembers()[:8]]
+        with DeferredValidation(max_workers=2) as policy:
+            SmaliFile.VALIDATION_POLICY = policy
+            smali_files = [SmaliFile(source) for source in sources]
+            smali_file = SmaliFile(self.WHITESPACE_CODE)
+            # Changes after the parse are not seen by the background validation
+            smali_file.raw_code = ''
+            policy.wait()
+            self.assertEqual(len(smali_files) + 1, policy.validated)
+        self.assertEqual(1, policy.failed)
+        failure = policy.failures.get_nowait()
+        self.assertIsInstance(failure, ValidationFailure)
+        self.assertEqual('LA;', failure.class_descriptor)
+        self.assertIsInstance(failure.error, WhitespaceWarning)
+        self.assertIsNone(policy.executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from smali import CrossReferenceIndex
+from smali.tests.fixtures import ProjectFixture
+from smali.xref import ReferenceKind
+
+
+class TestCrossReferenceIndex(ProjectFixture, unittest.TestCase):
+    DB_NAME = 'xref.sqlite'
+
+    CLASSES = {
+        'LA;': ('.class public LA;', '.super Ljava/lang/Object;', '', '.field private count:I', '',
+                '.method public run()V', '    .registers 2', '', '    iget v0, p0, LA;->count:I', '',
+                '    invoke-static {v0}, LB;->log(I)V', '', '    return-void', '.end method'),
+        'LB;': ('.class public LB;', '.super Ljava/lang/Object;', '',
+                '.method public static log(I)V', '    .registers 2', '', '    new-instance v0, LA;', '',
+                '    invoke-direct {v0}, LA;-><init>()V', '', '    iput p0, v0, LA;->count:I', '',
+                '    const-string v1, "LB;->log(I)V"', '', '    invoke-static {p0}, LB;->log(I)V', '', '    return-void', '.end method'),
+    }
+
+    def locations(self, references):
+        return [(reference.kind, reference.class_descriptor, reference.method, reference.line) for reference in references]
+
+    def test_queries(self):
+        with CrossReferenceIndex.open(self.db_path, self.root_path, max_workers=1) as index:
+            # The string constant is not a reference
+            self.assertListEqual([(ReferenceKind.METHOD, 'LA;', 'run()V', 11), (ReferenceKind.METHOD, 'LB;', 'log(I)V', 15)],
+                                 self.locations(index.callers('LB;->log(I)V')))
+            self.assertListEqual([(ReferenceKind.FIELD_READ, 'LA;', 'run()V', 9)], self.locations(index.field_reads('LA;->count:I')))
+            self.assertListEqual([(ReferenceKind.FIELD_WRITE, 'LB;', 'log(I)V', 11)], self.locations(index.field_writes('LA;->count:I')))
+            self.assertListEqual([(ReferenceKind.TYPE, 'LB;', 'log(I)V', 7)], self.locations(index.references('LA;', ReferenceKind.TYPE)))
+            self.assertListEqual(['LA;->count:I', 'LA;', 'LA;-><init>()V', 'LA;->count:I'], [reference.target for reference in index.class_references('LA;')])
+            self.assertEqual(2, len(index.references_from('LA;')))
+            self.assertEqual(0, len(index.references_from('LA;', 'missing()V')))
+            self.assertTrue(index.callers('LB;->log(I)V')[0].path.endswith('A.smali'))
+
+    def test_array_types(self):
+        # Array types and the types of accessed fields are references of their element class
+        self.write_class('LC;', ('.class public LC;', '.super Ljava/lang/Object;', '', '.field private items:[LA;', '',
+                                 '.method public run(I)V', '    .registers 3', '', '    new-array v0, p1, [LA;', '',
+                                 '    check-cast v0, [[LA;', '', '    iput-object v0, p0, LC;->items:[LA;', '',
+                                 '    new-array v1, p1, [I', '', '    return-void', '.end method'))
+        with CrossReferenceIndex.open(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertListEqual([(ReferenceKind.TYPE, 'LB;', 'log(I)V', 7), (ReferenceKind.TYPE, 'LC;', 'run(I)V', 9),
+                                  (ReferenceKind.TYPE, 'LC;', 'run(I)V', 11), (ReferenceKind.TYPE, 'LC;', 'run(I)V', 13)],
+                                 self.locations(index.references('LA;', ReferenceKind.TYPE)))
+            self.assertEqual([(9, 'LA;'), (11, 'LA;'), (13, 'LA;'), (13, 'LC;->items:[LA;'), (15, 'I')],
+                             sorted((reference.line, reference.target) for reference in index.references_from('LC;')))
+            self.assertEqual(7, len(index.class_references('LA;')))
+
+    def test_incremental_refresh(self):
+        with CrossReferenceIndex.open(self.db_path, self.root_path, max_workers=1):
+            pass
+        with CrossReferenceIndex(self.db_path, self.root_path, max_workers=1) as index:
+            self.assertTupleEqual((0, 0, 0, 2, 0), index.refresh())
+            lines = list(self.CLASSES['LA;'])
+            lines[10] = '    invoke-static {v0}, LC;->log(I)V'
+            self.write_class('LA;', lines)
+            self.assertTupleEqual((0, 1, 0, 1, 0), index.refresh())
+            self.assertEqual(1, len(index.callers('LB;->log(I)V')))
+            self.assertListEqual([(ReferenceKind.METHOD, 'LA;', 'run()V', 11)], self.locations(index.callers('LC;->log(I)V')))
+
+    def test_parallel(self):
+        with CrossReferenceIndex.open(self.db_path, self.root_path, max_workers=2, chunk_size=1) as index:
+            self.assertEqual(2, len(index.callers('LB;->log(I)V')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import os
+import queue
+import random
+import threading
+import warnings
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Set
+
+from smali.exceptions import ParseError, ValidationError, ValidationWarning
+from smali.parse_options import ParseOptions
+from smali.smali_file import SmaliFile
+
+
+class ValidationFailure(NamedTuple):
+    class_descriptor: Optional[str]
+    # A ValidationError or ValidationWarning, or the error that prevented the validation
+    error: Exception
+
+
+def _validate_source(smali_code: str, lazy: bool, statements: bool) -> List[ValidationFailure]:
+    # Runs in a worker process, the source is parsed again without a validation policy
+    result = []
+    caught = []
+    class_descriptor = None
+    try:
+        smali_file = SmaliFile(smali_code, lazy=lazy, options=ParseOptions(validate_statements=statements, on_warning=caught.append))
+        class_descriptor = smali_file.class_descriptor
+        failure = smali_file.check_reconstruction()
+        if failure is not None:
+            result.append(ValidationFailure(class_descriptor, failure))
+    except (ParseError, ValidationError) as e:
+        result.append(ValidationFailure(class_descriptor, e))
+    for warning in caught:
+        if isinstance(warning, ValidationWarning):
+            result.append(ValidationFailure(class_descriptor, warning))
+    return result
+
+
+class ValidationPolicy:
+    # Validates the reconstruction of a sample of the parsed files, right after they were parsed. Every file is
+    #  validated by default, `ValidationPolicy(sample_rate=0.01, seed=0)` validates a reproducible sample of 1%.
+    # Failures are passed to `on_failure` when it is given, otherwise they are put into the `failures` queue, which
+    #  is created when none is given. With `raise_errors` and neither of them, validation errors are raised and
+    #  warnings are emitted during the parse like `SmaliFile.VALIDATE` does.
+    sample_rate: float
+    random: random.Random
+    on_failure: Optional[Callable[[ValidationFailure], None]]
+    failures: Optional[queue.Queue]
+    raise_errors: bool
+    validated: int
+    skipped: int
+    failed: int
+    lock: threading.Lock
+
+    def __init__(self, sample_rate: float = 1.0, seed: Optional[int] = None, on_failure: Optional[Callable[[ValidationFailure], None]] = None, failures: Optional[queue.Queue] = None,
+                 raise_errors: bool = False):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError('sample rate must be between 0 and 1')
+        if on_failure is None and failures is None and not raise_errors:
+            failures = queue.Queue()
+        self.sample_rate = sample_rate
+        self.random = random.Random(seed)
+        self.on_failure = on_failure
+        self.failures = failures
+        self.raise_errors = raise_errors
+        self.validated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def should_validate(self) -> bool:
+        return self.sample_rate >= 1.0 or self.random.random() < self.sample_rate
+
+    def submit(self, smali_file: SmaliFile):
+        # Files parsed on a thread pool are submitted concurrently
+        with self.lock:
+            selected = self.should_validate()
+            if selected:
+                self.validated += 1
+            else:
+                self.skipped += 1
+        if selected:
+            self.validate(smali_file)
+
+    def validate(self, smali_file: SmaliFile):
+        failure = smali_file.check_reconstruction()
+        if failure is not None:
+            self.report(ValidationFailure(smali_file.class_descriptor, failure))
+
+    def report(self, failure: ValidationFailure):
+        with self.lock:
+            self.failed += 1
+        if self.on_failure is not None:
+            self.on_failure(failure)
+        elif self.failures is not None:
+            self.failures.put(failure)
+        elif isinstance(failure.error, Warning):
+            warnings.warn(failure.error)
+        else:
+            raise failure.error
+
+
+class DeferredValidation(ValidationPolicy):
+    # Validation runs on a background process pool after the parse returned. The worker parses the source again,
+    #  so later changes to the parsed file do not race with the validation.
+    # Failures can not be raised, without `on_failure` they are always put into the `failures` queue.
+    statements: bool
+    max_workers: Optional[int]
+    executor: Optional[Executor]
+    pending: Set[Future]
+    owner_pid: int
+
+    def __init__(self, sample_rate: float = 1.0, seed: Optional[int] = None, on_failure: Optional[Callable[[ValidationFailure], None]] = None, failures: Optional[queue.Queue] = None,
+                 statements: bool = False, max_workers: Optional[int] = None):
+        super().__init__(sample_rate=sample_rate, seed=seed, on_failure=on_failure, failures=failures)
+        self.statements = statements
+        self.max_workers = max_workers
+        self.executor = None
+        self.pending = set()
+        self.owner_pid = os.getpid()
+
+    def submit(self, smali_file: SmaliFile):
+        # Files parsed by forked workers are submitted by the process that owns the policy
+        if os.getpid() != self.owner_pid:
+            return
+        super().submit(smali_file)
+
+    def validate(self, smali_file: SmaliFile):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        future = self.executor.submit(_validate_source, smali_file.raw_code, smali_file.lazy, self.statements)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self.finished)
+
+    def finished(self, future: Future):
+        try:
+            failures = future.result()
+        except Exception as e:
+            failures = [ValidationFailure(None, e)]
+        for failure in failures:
+            self.report(failure)
+        # Only removed once reported, `wait` returns when nothing is pending
+        with self.lock:
+            self.pending.discard(future)
+
+    def wait(self):
+        while True:
+            with self.lock:
+                pending = list(self.pending)
+            if len(pending) == 0:
+                return
+            for future in pending:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+    def close(self):
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self) -> 'DeferredValidation':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
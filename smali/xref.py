@@ -0,0 +1,159 @@
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from smali.opcodes import OPCODES
+from smali.project_index import ClassSource, ProjectIndex
+from smali.statements import InstructionStatement, Statement
+
+
+class ReferenceKind(Enum):
+    METHOD = 1
+    FIELD_READ = 2
+    FIELD_WRITE = 3
+    TYPE = 4
+
+
+def _reference_kinds() -> Dict[str, ReferenceKind]:
+    # The opcodes whose reference operand is a method, field or type. Call sites of `invoke-custom` and method
+    #  handles are not indexed.
+    kinds = {}
+    for opcode in OPCODES:
+        if opcode.startswith('invoke-') and not opcode.startswith('invoke-custom'):
+            kinds[opcode] = ReferenceKind.METHOD
+        elif opcode.startswith(('iget', 'sget')):
+            kinds[opcode] = ReferenceKind.FIELD_READ
+        elif opcode.startswith(('iput', 'sput')):
+            kinds[opcode] = ReferenceKind.FIELD_WRITE
+        elif opcode.startswith(('new-instance', 'check-cast', 'const-class', 'instance-of', 'new-array', 'filled-new-array')):
+            kinds[opcode] = ReferenceKind.TYPE
+    return kinds
+
+
+_REFERENCE_KINDS = _reference_kinds()
+
+
+class FileReferences(NamedTuple):
+    class_descriptor: str
+    # Kind value, target, referencing method and line number of every reference
+    references: List[Tuple[int, str, Optional[str], int]]
+
+
+class CrossReference(NamedTuple):
+    kind: ReferenceKind
+    # `LClass;->method(I)V`, `LClass;->field:I` or `LClass;`, array types are referenced by their element type
+    target: str
+    class_descriptor: str
+    # Name and prototype of the referencing method, e.g. `run(I)V`
+    method: Optional[str]
+    path: str
+    # Starting at 1
+    line: int
+
+
+class CrossReferenceIndex(ProjectIndex):
+    # Method, field and type references of the instructions of every class in a project, with the method and line
+    #  they are made from. Reference targets, classes and methods are stored once in `symbols` and referenced by id.
+    #  Symbols of removed files are kept, they are reused when the same names are seen again.
+    NAME = 'xref'
+    # 2: array types and the types of accessed fields are stored as type references of their element type
+    SCHEMA_VERSION = 2
+    SCHEMA = '''
+        CREATE TABLE symbols (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE xrefs (
+            file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+            kind INTEGER NOT NULL,
+            target_id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            method_id INTEGER,
+            line INTEGER NOT NULL
+        );
+        CREATE INDEX xrefs_target_id ON xrefs (target_id);
+        CREATE INDEX xrefs_class_id ON xrefs (class_id);
+        CREATE INDEX xrefs_file_id ON xrefs (file_id);
+    '''
+
+    QUERY = '''
+        SELECT kind, target.value, owner.value, method.value, path, line FROM xrefs
+        JOIN symbols AS target ON target.id = xrefs.target_id
+        JOIN symbols AS owner ON owner.id = xrefs.class_id
+        LEFT JOIN symbols AS method ON method.id = xrefs.method_id
+        JOIN files ON files.id = xrefs.file_id
+    '''
+    ORDER = 'ORDER BY path, line'
+
+    @staticmethod
+    def element_type(type_descriptor: str) -> str:
+        # `[[LClass;` is a use of `LClass;`
+        return type_descriptor.lstrip('[')
+
+    @staticmethod
+    def extract(file_path: str) -> FileReferences:
+        # Only the class, method and instruction lines with a reference are parsed. Field accesses are also type
+        #  references of the class of the field type.
+        source = ClassSource(file_path)
+        references = []
+        for line_number, line in source:
+            kind = _REFERENCE_KINDS.get(line.partition(' ')[0])
+            if kind is not None:
+                statement = Statement.parse_line(line)[0]
+                if not isinstance(statement, InstructionStatement) or statement.reference is None:
+                    continue
+                if kind is ReferenceKind.TYPE:
+                    references.append((kind.value, CrossReferenceIndex.element_type(statement.reference), source.method, line_number))
+                    continue
+                references.append((kind.value, statement.reference, source.method, line_number))
+                if kind is not ReferenceKind.METHOD:
+                    field_type = CrossReferenceIndex.element_type(statement.reference.rpartition(':')[2])
+                    if field_type.startswith('L'):
+                        references.append((ReferenceKind.TYPE.value, field_type, source.method, line_number))
+        return FileReferences(source.declared_class(), references)
+
+    def symbol_id(self, value: str) -> int:
+        return self.value_id('symbols', value)
+
+    def store(self, file_id: int, data: FileReferences):
+        class_id = self.symbol_id(data.class_descriptor)
+        self.connection.executemany(
+            'INSERT INTO xrefs (file_id, kind, target_id, class_id, method_id, line) VALUES (?, ?, ?, ?, ?, ?)',
+            [(file_id, kind, self.symbol_id(target), class_id, None if method is None else self.symbol_id(method), line)
+             for kind, target, method, line in data.references]
+        )
+
+    def to_reference(self, row: tuple) -> CrossReference:
+        kind, target, class_descriptor, method, path, line = row
+        return CrossReference(ReferenceKind(kind), target, class_descriptor, method, self.absolute_path(path), line)
+
+    def references(self, target: str, kind: Optional[ReferenceKind] = None) -> List[CrossReference]:
+        if kind is None:
+            rows = self.connection.execute(f'{self.QUERY} WHERE target.value = ? {self.ORDER}', (target,))
+        else:
+            rows = self.connection.execute(f'{self.QUERY} WHERE target.value = ? AND kind = ? {self.ORDER}', (target, kind.value))
+        return [self.to_reference(row) for row in rows]
+
+    def callers(self, method_reference: str) -> List[CrossReference]:
+        return self.references(method_reference, ReferenceKind.METHOD)
+
+    def field_reads(self, field_reference: str) -> List[CrossReference]:
+        return self.references(field_reference, ReferenceKind.FIELD_READ)
+
+    def field_writes(self, field_reference: str) -> List[CrossReference]:
+        return self.references(field_reference, ReferenceKind.FIELD_WRITE)
+
+    def class_references(self, class_descriptor: str) -> List[CrossReference]:
+        # References to the class itself and to all of its members, the member targets are a range of symbols
+        rows = self.connection.execute(
+            f'{self.QUERY} WHERE target.value = ? OR (target.value >= ? AND target.value < ?) {self.ORDER}',
+            (class_descriptor, f'{class_descriptor}->', f'{class_descriptor}-?')
+        )
+        return [self.to_reference(row) for row in rows]
+
+    def references_from(self, class_descriptor: str, method: Optional[str] = None) -> List[CrossReference]:
+        # The references made by a class, or by one of its methods given as name and prototype
+        if method is None:
+            rows = self.connection.execute(f'{self.QUERY} WHERE owner.value = ? {self.ORDER}', (class_descriptor,))
+        else:
+            rows = self.connection.execute(f'{self.QUERY} WHERE owner.value = ? AND method.value = ? {self.ORDER}', (class_descriptor, method))
+        return [self.to_reference(row) for row in rows]